@@ -8,5 +8,5 @@ Executar com: python app.py
 from app import create_app
 
 if __name__ == '__main__':
-    app = create_app()
+    app = create_app(perfil='desenvolvimento')
     app.run(debug=True, host='0.0.0.0', port=5000)
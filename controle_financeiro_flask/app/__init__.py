@@ -5,38 +5,85 @@ Desenvolvido com Flask e SQLite
 
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-import os
 
-# Inicializar a extensão SQLAlchemy
-db = SQLAlchemy()
+from app.replicas import SessaoRoteada
 
+# Inicializar a extensão SQLAlchemy (leituras podem ir para réplicas)
+db = SQLAlchemy(session_options={'class_': SessaoRoteada})
 
-def create_app():
-    """Factory function para criar a aplicação Flask"""
-    app = Flask(__name__)
+
+def create_app(config=None, replicas=None, perfil=None):
+    """Factory function para criar a aplicação Flask
+
+    config: dicionário opcional que sobrescreve a configuração padrão
+    (por exemplo, outro SQLALCHEMY_DATABASE_URI para testes e benchmarks)
+    replicas: lista opcional de URIs de réplicas somente leitura
+    perfil: 'desenvolvimento', 'teste' ou 'producao' (padrão: variável de
+    ambiente FINANCEIRO_PERFIL ou 'producao'; ver app/configuracao.py)
+    """
+    # Templates e arquivos estáticos ficam na raiz do projeto, fora do pacote
+    app = Flask(__name__, template_folder='../templates', static_folder='../static')
+    
+    # Configuração do perfil (banco, chave secreta, migração e carregamento das rotas)
+    from app.configuracao import configuracao_do_perfil
+    app.config.update(configuracao_do_perfil(perfil))
     
-    # Configuração do banco de dados
-    basedir = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(basedir, "controle_financeiro.db")}'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['SECRET_KEY'] = 'sua_chave_secreta_aqui_mude_em_producao'
+    if config:
+        app.config.update(config)
+    
+    if replicas:
+        app.config['SQLALCHEMY_REPLICAS'] = list(replicas)
+    
+    # Perfil do SQLite: pool de conexões e PRAGMAs aplicados em cada conexão
+    from app.perfil_sqlite import configurar_pool, init_perfil_sqlite
+    configurar_pool(app)
     
     # Inicializar a extensão do banco de dados com a app
     db.init_app(app)
+    init_perfil_sqlite(app)
+    
+    # Medir consultas e latência por requisição (Server-Timing e /metrics)
+    from app.instrumentacao import init_instrumentacao
+    init_instrumentacao(app)
+    
+    # Engines das réplicas de leitura (SQLALCHEMY_REPLICAS)
+    from app.replicas import init_replicas
+    init_replicas(app)
+    
+    # Pool limitado para os hashes de senha
+    from app.senhas import init_senhas
+    init_senhas(app)
+    
+    # Cache dos resumos de orçamentos e das categorias, invalidado após cada commit
+    from app.cache import init_cache
+    init_cache(app)
     
     # Registrar os modelos
-    from app.models import Usuario, Categoria, Transacao, Receita, Despesa
+    from app.models import Usuario, Categoria, Transacao, Receita, Despesa, ResumoMensal, AlertasOrcamento
+    
+    # Manter resumo_mensal atualizado a cada flush
+    from app.agregados import reconstruir_resumo_command
+    app.cli.add_command(reconstruir_resumo_command)
+    
+    # Importação de extratos pela linha de comando
+    from app.importacao import importar_transacoes_command
+    app.cli.add_command(importar_transacoes_command)
+    
+    # Alertas de orçamento pré-calculados após as escritas e pelo worker
+    from app.alertas import alertas_worker_command, init_alertas
+    init_alertas(app)
+    app.cli.add_command(alertas_worker_command)
     
-    # Registrar os blueprints
-    from app.routes import auth_bp, dashboard_bp, categorias_bp, transacoes_bp
+    # Registrar os blueprints (na primeira requisição com BLUEPRINTS_PREGUICOSOS)
+    from app.blueprints import registrar_blueprints
+    registrar_blueprints(app)
     
-    app.register_blueprint(auth_bp)
-    app.register_blueprint(dashboard_bp)
-    app.register_blueprint(categorias_bp)
-    app.register_blueprint(transacoes_bp)
+    # Comparar a versão gravada do esquema com a do código (migrando se configurado)
+    from app.migracoes import verificar_esquema, migrar_command
+    app.cli.add_command(migrar_command)
     
-    # Criar as tabelas do banco de dados
     with app.app_context():
-        db.create_all()
+        # A busca por descrição usa FTS5 quando o índice textual existe
+        app.extensions['fts_transacoes'] = verificar_esquema(db.engine, app.config.get('MIGRAR_AO_INICIAR', True))
     
     return app
@@ -0,0 +1,206 @@
+"""
+Manutenção incremental da tabela resumo_mensal
+Cada flush que cria, altera ou remove transações aplica as diferenças de soma e
+quantidade nas linhas (usuario_id, categoria_id, ano, mes, tipo) afetadas.
+As somas são em centavos inteiros, como os valores das transações.
+"""
+
+from app import db
+from app.models import Transacao, ResumoMensal
+from app.eventos import registrar_alteracao
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+import click
+
+
+# Atributos que definem a linha do agregado ou o valor somado
+CAMPOS_AGREGADOS = ('usuario_id', 'categoria_id', 'data', 'tipo', 'valor_centavos')
+
+
+# ========== CÁLCULO DAS DIFERENÇAS ==========
+def acumular(deltas, usuario_id, categoria_id, data, tipo, centavos, quantidade):
+    """Somar uma contribuição (em centavos) ao dicionário de diferenças"""
+    chave = (int(usuario_id), int(categoria_id), data.year, data.month, tipo)
+    soma_atual, quantidade_atual = deltas.get(chave, (0, 0))
+    deltas[chave] = (soma_atual + centavos, quantidade_atual + quantidade)
+
+
+def _contribuir(deltas, valores, sinal):
+    """Adicionar (sinal=1) ou retirar (sinal=-1) uma transação dos agregados"""
+    acumular(
+        deltas, valores['usuario_id'], valores['categoria_id'], valores['data'],
+        valores['tipo'], sinal * valores['valor_centavos'], sinal
+    )
+
+
+def _valores(transacao):
+    """Obter os valores atuais dos campos agregados"""
+    return {campo: getattr(transacao, campo) for campo in CAMPOS_AGREGADOS}
+
+
+def _valores_anteriores(session, transacao):
+    """Obter os valores persistidos dos campos agregados (antes do flush)"""
+    estado = inspect(transacao)
+    valores = {}
+    for campo in CAMPOS_AGREGADOS:
+        historico = estado.attrs[campo].history
+        if historico.deleted:
+            valores[campo] = historico.deleted[0]
+        elif historico.added:
+            # Valor anterior não carregado: consultar a linha ainda inalterada
+            colunas = [getattr(Transacao, c) for c in CAMPOS_AGREGADOS]
+            linha = session.connection().execute(
+                db.select(*colunas).where(Transacao.id == estado.identity[0])
+            ).one()
+            return dict(zip(CAMPOS_AGREGADOS, linha))
+        else:
+            valores[campo] = getattr(transacao, campo)
+    return valores
+
+
+def _alterou(transacao):
+    """Verificar se algum campo agregado foi modificado"""
+    estado = inspect(transacao)
+    return any(estado.attrs[campo].history.has_changes() for campo in CAMPOS_AGREGADOS)
+
+
+# ========== APLICAÇÃO NO BANCO ==========
+def aplicar_deltas(connection, deltas):
+    """Aplicar as diferenças com upsert e remover linhas que ficaram vazias"""
+    deltas = {chave: delta for chave, delta in deltas.items() if delta != (0, 0)}
+    if not deltas:
+        return
+
+    tabela = ResumoMensal.__table__
+    linhas = [
+        {
+            'usuario_id': usuario_id,
+            'categoria_id': categoria_id,
+            'ano': ano,
+            'mes': mes,
+            'tipo': tipo,
+            'soma_centavos': soma,
+            'quantidade': quantidade
+        }
+        for (usuario_id, categoria_id, ano, mes, tipo), (soma, quantidade) in deltas.items()
+    ]
+
+    stmt = sqlite_insert(tabela)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[tabela.c.usuario_id, tabela.c.categoria_id, tabela.c.ano, tabela.c.mes, tabela.c.tipo],
+        set_={
+            'soma_centavos': tabela.c.soma_centavos + stmt.excluded.soma_centavos,
+            'quantidade': tabela.c.quantidade + stmt.excluded.quantidade
+        }
+    )
+    connection.execute(stmt, linhas)
+
+    usuarios = {linha['usuario_id'] for linha in linhas}
+    connection.execute(
+        tabela.delete().where(
+            tabela.c.usuario_id.in_(usuarios),
+            tabela.c.quantidade <= 0
+        )
+    )
+
+
+def registrar_periodos(session, deltas):
+    """Anotar os meses alterados para os ouvintes de app.eventos"""
+    for usuario_id, _, ano, mes, _ in deltas:
+        registrar_alteracao(session, usuario_id, 'transacoes', ano, mes)
+
+
+# ========== EVENTOS DE SESSÃO ==========
+@event.listens_for(Session, 'before_flush')
+def _retirar_valores_anteriores(session, flush_context, instances):
+    """Retirar dos agregados as transações removidas ou alteradas
+
+    Executado antes do flush, enquanto as linhas ainda têm os valores antigos.
+    As novas contribuições são somadas em after_flush, quando os defaults das
+    colunas (como a data) já foram aplicados.
+    """
+    deltas = session.info.setdefault('resumo_deltas', {})
+    pendentes = session.info.setdefault('resumo_pendentes', set())
+
+    for obj in session.deleted:
+        if isinstance(obj, Transacao):
+            _contribuir(deltas, _valores_anteriores(session, obj), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, Transacao) and _alterou(obj):
+            _contribuir(deltas, _valores_anteriores(session, obj), -1)
+            pendentes.add(obj)
+
+    for obj in session.new:
+        if isinstance(obj, Transacao):
+            pendentes.add(obj)
+
+
+@event.listens_for(Session, 'after_flush')
+def _atualizar_resumo_mensal(session, flush_context):
+    """Somar as novas contribuições e gravar na mesma transação do flush"""
+    deltas = session.info.pop('resumo_deltas', {})
+    for obj in session.info.pop('resumo_pendentes', set()):
+        _contribuir(deltas, _valores(obj), 1)
+
+    registrar_periodos(session, deltas)
+
+    if deltas:
+        aplicar_deltas(session.connection(), deltas)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_pendentes(session):
+    """Descartar diferenças de um flush que não chegou a ser aplicado"""
+    session.info.pop('resumo_deltas', None)
+    session.info.pop('resumo_pendentes', None)
+
+
+# ========== RECONSTRUÇÃO ==========
+def comandos_reconstrucao(usuario_id=None):
+    """Montar os comandos que apagam e recalculam resumo_mensal"""
+    tabela = ResumoMensal.__table__
+
+    ano = db.cast(db.func.strftime('%Y', Transacao.data), db.Integer)
+    mes = db.cast(db.func.strftime('%m', Transacao.data), db.Integer)
+
+    consulta = db.select(
+        Transacao.usuario_id,
+        Transacao.categoria_id,
+        ano,
+        mes,
+        Transacao.tipo,
+        db.func.sum(Transacao.valor_centavos),
+        db.func.count(Transacao.id)
+    ).group_by(Transacao.usuario_id, Transacao.categoria_id, ano, mes, Transacao.tipo)
+
+    remover = tabela.delete()
+    if usuario_id is not None:
+        consulta = consulta.where(Transacao.usuario_id == usuario_id)
+        remover = remover.where(tabela.c.usuario_id == usuario_id)
+
+    inserir = tabela.insert().from_select(
+        ['usuario_id', 'categoria_id', 'ano', 'mes', 'tipo', 'soma_centavos', 'quantidade'],
+        consulta
+    )
+    return remover, inserir
+
+
+def reconstruir(usuario_id=None):
+    """Recalcular resumo_mensal a partir das transações (backfill)"""
+    remover, inserir = comandos_reconstrucao(usuario_id)
+    db.session.execute(remover)
+    resultado = db.session.execute(inserir)
+    db.session.commit()
+    return resultado.rowcount
+
+
+@click.command('reconstruir-resumo')
+@click.option('--usuario-id', type=int, default=None, help='Reconstruir apenas este usuário.')
+@with_appcontext
+def reconstruir_resumo_command(usuario_id):
+    """Recalcular a tabela resumo_mensal a partir das transações"""
+    linhas = reconstruir(usuario_id)
+    click.echo(f'resumo_mensal reconstruído: {linhas} linhas.')
@@ -0,0 +1,351 @@
+"""
+Pré-cálculo dos alertas de orçamento do mês corrente
+A tabela alertas guarda os alertas de cada usuário com a versão dos dados
+(usuarios.versao_dados) em que foram calculados e é mantida fora das
+requisições por TrabalhadorAlertas:
+
+- nas escritas: com ALERTAS_NA_ESCRITA, o ouvinte @ao_confirmar de cada
+  processo entrega ao trabalhador da app os usuários alterados no commit, e
+  uma thread em segundo plano (iniciada na primeira notificação, depois do
+  fork dos workers) os recalcula;
+- como garantia: o comando `flask alertas-worker` recalcula a cada
+  INTERVALO_COMPLETO segundos todos os usuários com orçamentos no mês,
+  cobrindo escritas de processos sem o trabalhador e a mudança de dia.
+Os usuários são avaliados em lotes de TAMANHO_LOTE com duas consultas por
+lote, distribuídos entre as threads.
+
+/api/orcamentos/alertas lê a linha do usuário com uma consulta. Se ela ainda
+não existe ou está desatualizada (recálculo pendente), os alertas são
+calculados na própria requisição, sem gravar.
+"""
+
+from app import db
+from app.eventos import ao_confirmar
+from app.models import Usuario, Orcamento, ResumoMensal, AlertasOrcamento
+from app.dinheiro import formatar_centavos
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from flask import current_app, has_app_context
+from flask.cli import with_appcontext
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+import click
+import threading
+import time
+
+
+# Segundos entre os recálculos de todos os usuários com orçamentos no mês
+INTERVALO_COMPLETO = 300
+
+# Usuários avaliados por lote (duas consultas e um upsert por lote)
+TAMANHO_LOTE = 200
+
+
+# ========== AVALIAÇÃO ==========
+def montar_alertas(orcamentos, resumos):
+    """Lista de alertas (excedido/aviso) no formato da API
+
+    orcamentos: linhas de consulta_orcamentos_do_mes (com categoria_nome).
+    """
+    alertas = []
+    for orcamento in orcamentos:
+        resumo = resumos[orcamento.id]
+        status = resumo.status
+
+        if status == 'excedido':
+            excesso = formatar_centavos(resumo.gasto_centavos - resumo.limite_centavos)
+            alertas.append({
+                'categoria': orcamento.categoria_nome,
+                'tipo': 'excedido',
+                'mensagem': f'Orçamento excedido em R$ {excesso}',
+                'valor': excesso
+            })
+        elif status == 'aviso':
+            percentual = resumo.percentual
+            alertas.append({
+                'categoria': orcamento.categoria_nome,
+                'tipo': 'aviso',
+                'mensagem': f'Atingiu {percentual:.0f}% do orçamento',
+                'valor': f"{percentual:.0f}%"
+            })
+    return alertas
+
+
+def consulta_gastos_usuarios(usuario_ids, mes, ano):
+    """SELECT (usuario_id, categoria_id, soma_centavos) das despesas do mês"""
+    return db.select(
+        ResumoMensal.usuario_id,
+        ResumoMensal.categoria_id,
+        ResumoMensal.soma_centavos
+    ).where(
+        ResumoMensal.usuario_id.in_(usuario_ids),
+        ResumoMensal.ano == ano,
+        ResumoMensal.mes == mes,
+        ResumoMensal.tipo == 'despesa'
+    )
+
+
+def alertas_das_linhas(usuario_ids, orcamentos, gastos, hoje):
+    """{usuario_id: [alertas]} a partir das linhas de orçamentos e de gastos"""
+    # Importado aqui: o módulo traz o NumPy da previsão, dispensável para a CLI
+    from app.avaliacao_orcamentos import avaliar_orcamento
+
+    gastos = {(usuario_id, categoria_id): soma for usuario_id, categoria_id, soma in gastos}
+
+    por_usuario = {usuario_id: [] for usuario_id in usuario_ids}
+    for orcamento in orcamentos:
+        por_usuario[orcamento.usuario_id].append(orcamento)
+
+    return {
+        usuario_id: montar_alertas(grupo, {
+            o.id: avaliar_orcamento(o, gastos.get((usuario_id, o.categoria_id), 0), hoje)
+            for o in grupo
+        })
+        for usuario_id, grupo in por_usuario.items()
+    }
+
+
+def avaliar_usuarios(usuario_ids, mes, ano, hoje):
+    """Alertas de vários usuários no mês, como {usuario_id: [alertas]}
+
+    Uma consulta traz os orçamentos (com o nome da categoria) e outra os
+    gastos de resumo_mensal de todo o lote.
+    """
+    from app.avaliacao_orcamentos import consulta_orcamentos_do_mes
+
+    orcamentos = db.session.execute(consulta_orcamentos_do_mes(usuario_ids, mes, ano)).all()
+    gastos = db.session.execute(consulta_gastos_usuarios(usuario_ids, mes, ano)).all()
+    return alertas_das_linhas(usuario_ids, orcamentos, gastos, hoje)
+
+
+def payload_alertas(alertas, calculado_em):
+    """Resposta de /api/orcamentos/alertas"""
+    return {
+        'sucesso': True,
+        'total_alertas': len(alertas),
+        'alertas': alertas,
+        'calculado_em': calculado_em.isoformat(timespec='seconds')
+    }
+
+
+# ========== LEITURA PELA API ==========
+def consulta_alertas_gravados(usuario_id, mes, ano):
+    """SELECT da versão dos dados do usuário e dos alertas gravados no mês (se houver)"""
+    return db.select(
+        Usuario.versao_dados,
+        AlertasOrcamento.versao_dados.label('versao_alertas'),
+        AlertasOrcamento.dados,
+        AlertasOrcamento.calculado_em
+    ).outerjoin(
+        AlertasOrcamento,
+        db.and_(
+            AlertasOrcamento.usuario_id == Usuario.id,
+            AlertasOrcamento.mes == mes,
+            AlertasOrcamento.ano == ano
+        )
+    ).where(Usuario.id == usuario_id)
+
+
+def payload_gravado(linha):
+    """Resposta a partir da linha de consulta_alertas_gravados; None se desatualizada"""
+    if linha.versao_alertas is None or linha.versao_alertas != linha.versao_dados:
+        return None
+    return payload_alertas(linha.dados, linha.calculado_em)
+
+
+def carregar_alertas(usuario_id, hoje=None):
+    """Payload de /api/orcamentos/alertas a partir da tabela alertas
+
+    Linha ausente ou com versão anterior à dos dados: calcular agora.
+    """
+    hoje = hoje or datetime.utcnow()
+    linha = db.session.execute(consulta_alertas_gravados(usuario_id, hoje.month, hoje.year)).one()
+
+    payload = payload_gravado(linha)
+    if payload is not None:
+        return payload
+
+    alertas = avaliar_usuarios([usuario_id], hoje.month, hoje.year, hoje)[usuario_id]
+    return payload_alertas(alertas, hoje)
+
+
+# ========== RECÁLCULO ==========
+def _candidatos(mes, ano):
+    """Usuários com orçamentos ou alertas gravados no mês"""
+    return db.union(
+        db.select(Orcamento.usuario_id).where(Orcamento.mes == mes, Orcamento.ano == ano),
+        db.select(AlertasOrcamento.usuario_id).where(AlertasOrcamento.mes == mes, AlertasOrcamento.ano == ano)
+    ).subquery()
+
+
+def usuarios_do_mes(mes, ano):
+    """Todos os usuários cujos alertas do mês devem ser recalculados"""
+    candidatos = _candidatos(mes, ano)
+    return list(db.session.execute(db.select(candidatos.c.usuario_id)).scalars())
+
+
+def recalcular_alertas(usuario_ids, hoje=None):
+    """Avaliar e gravar os alertas do mês de um lote de usuários
+
+    A versão dos dados é lida antes da avaliação: uma escrita concorrente
+    incrementa a versão depois e o usuário volta a ficar desatualizado.
+    """
+    hoje = hoje or datetime.utcnow()
+    usuario_ids = list(usuario_ids)
+    if not usuario_ids:
+        return 0
+
+    versoes = dict(db.session.execute(
+        db.select(Usuario.id, Usuario.versao_dados).where(Usuario.id.in_(usuario_ids))
+    ).all())
+    alertas = avaliar_usuarios(list(versoes), hoje.month, hoje.year, hoje)
+
+    calculado_em = datetime.utcnow()
+    tabela = AlertasOrcamento.__table__
+    comando = sqlite_insert(tabela).values([
+        {
+            'usuario_id': usuario_id,
+            'mes': hoje.month,
+            'ano': hoje.year,
+            'versao_dados': versoes[usuario_id],
+            'total_alertas': len(lista),
+            'dados': lista,
+            'calculado_em': calculado_em
+        }
+        for usuario_id, lista in alertas.items()
+    ])
+    db.session.execute(comando.on_conflict_do_update(
+        index_elements=['usuario_id', 'mes', 'ano'],
+        set_={
+            'versao_dados': comando.excluded.versao_dados,
+            'total_alertas': comando.excluded.total_alertas,
+            'dados': comando.excluded.dados,
+            'calculado_em': comando.excluded.calculado_em
+        }
+    ))
+    db.session.commit()
+    return len(alertas)
+
+
+# ========== WORKER ==========
+class TrabalhadorAlertas:
+    """Recalcula os alertas do mês corrente em lotes, em um pool de threads
+
+    notificar() enfileira usuários alterados; executar() os atende assim que
+    chegam e, com intervalo_completo, recalcula todos periodicamente.
+    """
+
+    def __init__(self, app, threads=1, intervalo_completo=INTERVALO_COMPLETO, tamanho_lote=TAMANHO_LOTE):
+        self.app = app
+        self.intervalo_completo = intervalo_completo
+        self.tamanho_lote = tamanho_lote
+        self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='alertas')
+        self._pendentes = set()
+        self._lock = threading.Lock()
+        self._sinal = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def notificar(self, usuario_ids, iniciar=False):
+        """Enfileirar usuários para recálculo
+
+        iniciar: atender a fila em uma thread em segundo plano, criada na
+        primeira notificação.
+        """
+        with self._lock:
+            self._pendentes.update(usuario_ids)
+            if iniciar and self._thread is None:
+                self._thread = threading.Thread(target=self.executar, name='alertas-escrita', daemon=True)
+                self._thread.start()
+        self._sinal.set()
+
+    def _retirar_pendentes(self):
+        with self._lock:
+            self._sinal.clear()
+            pendentes, self._pendentes = sorted(self._pendentes), set()
+        return pendentes
+
+    def _lote(self, usuario_ids, hoje):
+        with self.app.app_context():
+            return recalcular_alertas(usuario_ids, hoje)
+
+    def ciclo(self, completo=False):
+        """Recalcular os usuários pendentes (ou todos) e retornar quantos"""
+        hoje = datetime.utcnow()
+        usuario_ids = self._retirar_pendentes()
+        if completo:
+            with self.app.app_context():
+                usuario_ids = usuarios_do_mes(hoje.month, hoje.year)
+
+        lotes = [usuario_ids[i:i + self.tamanho_lote] for i in range(0, len(usuario_ids), self.tamanho_lote)]
+        return sum(self._executor.map(lambda lote: self._lote(lote, hoje), lotes))
+
+    def executar(self, echo=None):
+        """Atender a fila até encerrar(), com os recálculos completos periódicos"""
+        proximo_completo = time.monotonic() if self.intervalo_completo else None
+        try:
+            while not self._parar.is_set():
+                completo = proximo_completo is not None and time.monotonic() >= proximo_completo
+                inicio = time.perf_counter()
+                try:
+                    quantidade = self.ciclo(completo)
+                except Exception:
+                    # Os usuários ficam desatualizados até o próximo recálculo
+                    self.app.logger.exception('Falha no recálculo dos alertas')
+                    quantidade = 0
+                if completo:
+                    proximo_completo = time.monotonic() + self.intervalo_completo
+                if echo and (quantidade or completo):
+                    echo(f"{'Recálculo completo' if completo else 'Recálculo'}: {quantidade} usuários "
+                         f"em {(time.perf_counter() - inicio) * 1000:.0f} ms")
+
+                espera = None if proximo_completo is None else max(proximo_completo - time.monotonic(), 0)
+                self._sinal.wait(espera)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def encerrar(self):
+        """Parar executar() depois do ciclo em andamento"""
+        self._parar.set()
+        self._sinal.set()
+
+
+@ao_confirmar
+def _notificar_trabalhador(alteracoes):
+    """Entregar ao trabalhador da app os usuários alterados no commit
+
+    Qualquer alteração incrementa a versão dos dados e desatualiza a linha
+    de alertas, mesmo fora do mês corrente.
+    """
+    if not has_app_context():
+        return
+    trabalhador = current_app.extensions.get('trabalhador_alertas')
+    if trabalhador is not None:
+        trabalhador.notificar({alteracao.usuario_id for alteracao in alteracoes}, iniciar=True)
+
+
+def init_alertas(app):
+    """Com ALERTAS_NA_ESCRITA, recalcular os alertas após os commits do processo"""
+    if app.config.get('ALERTAS_NA_ESCRITA'):
+        app.extensions['trabalhador_alertas'] = TrabalhadorAlertas(
+            app, app.config.get('ALERTAS_THREADS', 1), intervalo_completo=None
+        )
+
+
+@click.command('alertas-worker')
+@click.option('--threads', type=int, default=1, show_default=True, help='Threads que avaliam os lotes.')
+@click.option('--intervalo-completo', type=float, default=INTERVALO_COMPLETO, show_default=True,
+              help='Segundos entre os recálculos de todos os usuários.')
+@click.option('--uma-vez', is_flag=True, help='Fazer um recálculo completo e sair.')
+@with_appcontext
+def alertas_worker_command(threads, intervalo_completo, uma_vez):
+    """Recalcular periodicamente os alertas de todos os usuários"""
+    trabalhador = TrabalhadorAlertas(current_app._get_current_object(), threads, intervalo_completo)
+    if uma_vez:
+        click.echo(f'Alertas recalculados: {trabalhador.ciclo(completo=True)} usuários.')
+        return
+
+    click.echo('Worker de alertas iniciado (Ctrl+C para parar).')
+    try:
+        trabalhador.executar(echo=click.echo)
+    except KeyboardInterrupt:
+        click.echo('Worker de alertas encerrado.')
@@ -0,0 +1,222 @@
+"""
+Análises vetorizadas do histórico de transações
+Os totais do período são lidos com uma única consulta já agrupada (por mês
+de resumo_mensal, ou por dia das transações) para arrays do NumPy. As séries
+por período (receitas, despesas, saldo, médias móveis, taxa de poupança) e a
+matriz de despesas por categoria são calculadas com operações vetorizadas
+(bincount, cumsum), sem criar objetos do ORM por transação.
+
+Nas granularidades mes e ano a série cobre meses inteiros e vem da tabela
+materializada resumo_mensal (algumas centenas de linhas para vários anos);
+dia e semana agrupam as transações do período por dia no SQLite.
+"""
+
+from app import db
+from app.models import Transacao, ResumoMensal
+from datetime import date, datetime, time, timedelta
+import numpy as np
+
+
+GRANULARIDADES = ('dia', 'semana', 'mes', 'ano')
+
+# Quantidade máxima de períodos em uma série (ex.: ~13 anos por dia)
+MAXIMO_PERIODOS = 5000
+
+# Janela padrão das médias móveis, em períodos
+JANELA_PADRAO = 3
+
+
+# ========== LEITURA ==========
+def _arrays(linhas, datas):
+    """(datas, centavos, receita, categoria_id) a partir das linhas agrupadas"""
+    return (
+        datas,
+        np.fromiter((linha[1] for linha in linhas), dtype=np.int64, count=len(linhas)),
+        np.fromiter((linha[2] == 'receita' for linha in linhas), dtype=bool, count=len(linhas)),
+        np.fromiter((linha[3] for linha in linhas), dtype=np.int64, count=len(linhas))
+    )
+
+
+def carregar_meses(usuario_id, inicio, fim):
+    """Totais por mês/tipo/categoria de resumo_mensal, com datas em datetime64[M]"""
+    periodo = ResumoMensal.ano * 12 + ResumoMensal.mes
+    linhas = db.session.execute(
+        db.select(
+            periodo,
+            ResumoMensal.soma_centavos,
+            ResumoMensal.tipo,
+            ResumoMensal.categoria_id
+        ).where(
+            ResumoMensal.usuario_id == usuario_id,
+            periodo.between(inicio.year * 12 + inicio.month, fim.year * 12 + fim.month)
+        )
+    ).all()
+
+    # ano * 12 + mes → meses desde 1970-01 (origem do datetime64)
+    meses = np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=len(linhas)) - (1970 * 12 + 1)
+    return _arrays(linhas, meses.astype('datetime64[M]'))
+
+
+def carregar_dias(usuario_id, inicio, fim):
+    """Totais por dia/tipo/categoria das transações, com datas em datetime64[D]"""
+    dia = db.func.date(Transacao.data)
+    linhas = db.session.execute(
+        db.select(
+            dia,
+            db.func.sum(Transacao.valor_centavos),
+            Transacao.tipo,
+            Transacao.categoria_id
+        ).where(
+            Transacao.usuario_id == usuario_id,
+            Transacao.data >= datetime.combine(inicio, time.min),
+            Transacao.data < datetime.combine(fim + timedelta(days=1), time.min)
+        ).group_by(dia, Transacao.tipo, Transacao.categoria_id)
+    ).all()
+
+    return _arrays(linhas, np.array([linha[0] for linha in linhas], dtype='datetime64[D]'))
+
+
+# ========== PERÍODOS ==========
+def indices_de_periodo(datas, granularidade):
+    """Converter datas em números de período (semanas começam na segunda-feira)"""
+    if granularidade == 'semana':
+        # 1970-01-01 foi uma quinta-feira: +3 alinha as semanas à segunda
+        return (datas.astype('datetime64[D]').astype(np.int64) + 3) // 7
+    unidade = {'dia': 'D', 'mes': 'M', 'ano': 'Y'}[granularidade]
+    return datas.astype(f'datetime64[{unidade}]').astype(np.int64)
+
+
+def rotulos_de_periodo(primeiro, quantidade, granularidade):
+    """Textos dos períodos: 2025-01-31, 2025-01-27 (segunda da semana), 2025-01 ou 2025"""
+    numeros = np.arange(primeiro, primeiro + quantidade)
+    if granularidade == 'semana':
+        return [str(d) for d in (numeros * 7 - 3).astype('datetime64[D]')]
+    unidade = {'dia': 'D', 'mes': 'M', 'ano': 'Y'}[granularidade]
+    return [str(p) for p in numeros.astype(f'datetime64[{unidade}]')]
+
+
+def contar_periodos(inicio, fim, granularidade):
+    """Quantidade de períodos entre as datas, inclusive"""
+    dias = np.array([inicio, fim], dtype='datetime64[D]')
+    primeiro, ultimo = indices_de_periodo(dias, granularidade)
+    return int(ultimo - primeiro + 1)
+
+
+# ========== CÁLCULOS ==========
+def somar_por_periodo(indices, centavos, quantidade):
+    """Somar centavos por período (bincount em float64 é exato até 2**53)"""
+    return np.rint(np.bincount(indices, weights=centavos, minlength=quantidade)).astype(np.int64)
+
+
+def media_movel(valores, janela):
+    """Média dos últimos `janela` valores; NaN enquanto a janela não está completa"""
+    medias = np.full(len(valores), np.nan)
+    if janela <= len(valores):
+        acumulado = np.cumsum(np.concatenate(([0], valores)), dtype=np.float64)
+        medias[janela - 1:] = (acumulado[janela:] - acumulado[:-janela]) / janela
+    return medias
+
+
+def taxa_poupanca(receitas, despesas):
+    """(receitas - despesas) / receitas em %, NaN nos períodos sem receita"""
+    taxa = np.full(len(receitas), np.nan)
+    np.divide((receitas - despesas) * 100.0, receitas, out=taxa, where=receitas > 0)
+    return taxa
+
+
+def _lista(valores, centavos=True):
+    """Array → lista JSON (reais com 2 casas ou percentuais), NaN vira null"""
+    divisor = 100 if centavos else 1
+    return [None if np.isnan(v) else round(float(v) / divisor, 2) for v in np.asarray(valores, dtype=np.float64)]
+
+
+def serie(usuario_id, inicio, fim, granularidade='mes', janela=JANELA_PADRAO, nomes_categorias=None):
+    """Calcular a série temporal do usuário entre as datas (inclusive)
+
+    nomes_categorias: {id: nome} para identificar as linhas da matriz de
+    despesas por categoria, ordenadas pelo total do período.
+    """
+    if granularidade not in GRANULARIDADES:
+        raise ValueError('Granularidade inválida (use dia, semana, mes ou ano)')
+    if fim < inicio:
+        raise ValueError('A data final deve ser posterior à inicial')
+
+    quantidade = contar_periodos(inicio, fim, granularidade)
+    if quantidade > MAXIMO_PERIODOS:
+        raise ValueError(f'Período longo demais para a granularidade (máximo {MAXIMO_PERIODOS} pontos)')
+
+    if granularidade in ('mes', 'ano'):
+        inicio = inicio.replace(day=1)
+        fim = date(fim.year + fim.month // 12, fim.month % 12 + 1, 1) - timedelta(days=1)
+        datas, centavos, receita, categoria_ids = carregar_meses(usuario_id, inicio, fim)
+    else:
+        datas, centavos, receita, categoria_ids = carregar_dias(usuario_id, inicio, fim)
+
+    primeiro = int(indices_de_periodo(np.array([inicio], dtype='datetime64[D]'), granularidade)[0])
+    indices = indices_de_periodo(datas, granularidade) - primeiro
+
+    receitas = somar_por_periodo(indices[receita], centavos[receita], quantidade)
+    despesas = somar_por_periodo(indices[~receita], centavos[~receita], quantidade)
+    saldo = receitas - despesas
+
+    # Matriz períodos × categorias das despesas, com uma única contagem
+    despesa_ids = categoria_ids[~receita]
+    categorias, coluna = np.unique(despesa_ids, return_inverse=True)
+    matriz = somar_por_periodo(
+        indices[~receita] * len(categorias) + coluna, centavos[~receita], quantidade * len(categorias)
+    ).reshape(quantidade, len(categorias))
+    ordem = np.argsort(-matriz.sum(axis=0), kind='stable')
+
+    nomes_categorias = nomes_categorias or {}
+    return {
+        'granularidade': granularidade,
+        'inicio': inicio.isoformat(),
+        'fim': fim.isoformat(),
+        'janela': janela,
+        'periodos': rotulos_de_periodo(primeiro, quantidade, granularidade),
+        'receitas': _lista(receitas),
+        'despesas': _lista(despesas),
+        'saldo': _lista(saldo),
+        'media_movel': {
+            'receitas': _lista(media_movel(receitas, janela)),
+            'despesas': _lista(media_movel(despesas, janela)),
+            'saldo': _lista(media_movel(saldo, janela))
+        },
+        'taxa_poupanca': _lista(taxa_poupanca(receitas, despesas), centavos=False),
+        'categorias': [
+            {
+                'id': int(categorias[i]),
+                'nome': nomes_categorias.get(int(categorias[i])),
+                'total': round(int(matriz[:, i].sum()) / 100, 2),
+                'despesas': _lista(matriz[:, i])
+            }
+            for i in ordem
+        ]
+    }
+
+
+# ========== PARÂMETROS ==========
+def ler_data(texto, fim_do_periodo=False):
+    """Aceitar AAAA-MM-DD, AAAA-MM ou AAAA; com fim_do_periodo, o último dia
+
+    Datas inexistentes (mês fora de 1 a 12, dia fora do mês) levantam ValueError.
+    """
+    partes = [int(p) for p in texto.split('-')]
+    if len(partes) == 3:
+        return date(*partes)
+    if len(partes) == 2:
+        ano, mes = partes
+        if not 1 <= mes <= 12:
+            raise ValueError(texto)
+        if not fim_do_periodo:
+            return date(ano, mes, 1)
+        return date(ano + mes // 12, mes % 12 + 1, 1) - timedelta(days=1)
+    if len(partes) == 1:
+        return date(partes[0], 12, 31) if fim_do_periodo else date(partes[0], 1, 1)
+    raise ValueError(texto)
+
+
+def periodo_padrao(hoje):
+    """Os últimos 12 meses, do primeiro dia do mês até hoje"""
+    ano, mes = (hoje.year - 1, hoje.month + 1) if hoje.month < 12 else (hoje.year, 1)
+    return date(ano, mes, 1), hoje
@@ -0,0 +1,389 @@
+"""
+API JSON assíncrona (ASGI) das rotas chamadas com mais frequência
+Busca de transações, categorias sugeridas, polling dos orçamentos e
+validações em tempo real são atendidos por uma app ASGI mínima que consulta
+o SQLite pelo driver assíncrono aiosqlite. Enquanto uma consulta espera o
+banco, o mesmo processo atende outras requisições, sem uma thread por
+conexão aberta.
+
+As consultas e os formatos de resposta são os mesmos das rotas Flask
+(app/consultas.py, app/avaliacao_orcamentos.py, app/alertas.py); só a
+execução muda. A sessão é lida do cookie assinado pelo Flask e os ETags
+seguem app/condicional.py, então as duas implementações são
+intercambiáveis para o navegador.
+
+As demais rotas (páginas, formulários, exportação, formato=ndjson) são
+repassadas à app Flask quando o asgiref está instalado; sem ele, respondem
+404 e devem ser servidas pelo servidor WSGI.
+
+Uso (ver asgi.py):
+    uvicorn asgi:app --workers 2
+"""
+
+from app.alertas import (
+    consulta_alertas_gravados, payload_gravado, consulta_gastos_usuarios,
+    alertas_das_linhas, payload_alertas
+)
+from app.avaliacao_orcamentos import (
+    consulta_orcamentos, consulta_orcamentos_do_mes, consulta_gastos_por_categoria,
+    avaliar_orcamento, payload_resumo, payload_detalhes
+)
+from app.busca_incremental import sessoes_busca
+from app.cache import cache_orcamentos
+from app.condicional import consulta_versao_dados, calcular_etag
+from app.consultas import (
+    ler_filtros, ler_limite, usa_relevancia, consulta_transacoes,
+    consulta_categorias_sugeridas, aplicar_cursor, montar_pagina
+)
+from app.models import Orcamento
+from app.perfil_sqlite import aplicar_pragmas, pragmas_configurados
+from app.previsao_gastos import consulta_gastos_diarios, matriz_de_gastos, prever_da_matriz
+from app.validacoes import validar_requisicao
+from datetime import datetime
+from http.cookies import SimpleCookie
+from itsdangerous import BadSignature
+from sqlalchemy.ext.asyncio import create_async_engine
+from urllib.parse import parse_qsl
+from werkzeug.http import parse_etags
+import json
+import logging
+import re
+
+try:
+    from asgiref.wsgi import WsgiToAsgi
+except ImportError:  # Sem o asgiref, apenas as rotas desta API são atendidas
+    WsgiToAsgi = None
+
+
+logger = logging.getLogger(__name__)
+
+
+# ========== REQUISIÇÃO ==========
+class Requisicao:
+    """Dados da requisição ASGI usados pelas rotas"""
+
+    def __init__(self, scope, corpo):
+        self.metodo = scope['method']
+        self.caminho = scope['path']
+        self.query_string = scope.get('query_string', b'').decode('latin-1')
+        self.args = dict(parse_qsl(self.query_string))
+        self.cabecalhos = {
+            nome.decode('latin-1').lower(): valor.decode('latin-1')
+            for nome, valor in scope.get('headers', ())
+        }
+        self.corpo = corpo
+        # Lida junto com o ETag (rotas condicionais)
+        self.versao_dados = None
+
+    def json(self):
+        """Corpo JSON (None se ausente ou inválido)"""
+        try:
+            return json.loads(self.corpo) if self.corpo else None
+        except ValueError:
+            return None
+
+    def cookie(self, nome):
+        cookies = SimpleCookie()
+        try:
+            cookies.load(self.cabecalhos.get('cookie', ''))
+        except Exception:
+            return None
+        return cookies[nome].value if nome in cookies else None
+
+
+def ler_sessao(flask_app, requisicao):
+    """Conteúdo da sessão assinada pelo Flask ({} se ausente ou inválida)"""
+    valor = requisicao.cookie(flask_app.config['SESSION_COOKIE_NAME'])
+    serializador = flask_app.session_interface.get_signing_serializer(flask_app)
+    if not valor or serializador is None:
+        return {}
+    try:
+        return serializador.loads(valor, max_age=int(flask_app.permanent_session_lifetime.total_seconds()))
+    except BadSignature:
+        return {}
+
+
+# ========== ROTAS ==========
+async def _versao_dados(requisicao, conexao, usuario_id):
+    """Versão dos dados lida junto com o ETag, ou consultada agora"""
+    if requisicao.versao_dados is None:
+        requisicao.versao_dados = (await conexao.execute(consulta_versao_dados(usuario_id))).scalar() or 0
+    return requisicao.versao_dados
+
+
+async def buscar_transacoes(requisicao, conexao, usuario_id):
+    """Mesma resposta de /api/transacoes/buscar (formato=ndjson fica com o Flask)"""
+    dados = (requisicao.json() if requisicao.metodo == 'POST' else None) or requisicao.args
+    if dados.get('formato') == 'ndjson':
+        return None
+
+    filtros = ler_filtros(dados)
+    stmt = consulta_transacoes(usuario_id, filtros)
+    limite = ler_limite(dados)
+
+    cursor = None
+    if dados.get('cursor') and not usa_relevancia(filtros):
+        cursor = dados.get('cursor')
+        try:
+            stmt = aplicar_cursor(stmt, cursor)
+        except ValueError:
+            return 400, {'sucesso': False, 'erro': 'Cursor inválido'}
+
+    # Mesmas sessões de busca da rota Flask (app/busca_incremental.py)
+    sessoes = sessoes_busca()
+    versao = await _versao_dados(requisicao, conexao, usuario_id)
+
+    linhas = sessoes.refinar(usuario_id, versao, filtros, limite, cursor)
+    if linhas is None:
+        linhas = (await conexao.execute(stmt.limit(limite + 1))).all()
+        sessoes.abrir(usuario_id, versao, filtros, linhas, limite, cursor)
+    return 200, montar_pagina(linhas, limite, filtros)
+
+
+async def categorias_sugeridas(requisicao, conexao, usuario_id):
+    """Mesma resposta de /api/categorias/sugeridas"""
+    linhas = (await conexao.execute(consulta_categorias_sugeridas(usuario_id))).all()
+    return 200, {
+        'sucesso': True,
+        'categorias': [{'id': c[0], 'nome': c[1], 'uso': c[2]} for c in linhas]
+    }
+
+
+async def resumo_orcamentos(requisicao, conexao, usuario_id):
+    """Mesma resposta de /api/orcamentos/resumo (projeção linear, como no Flask)
+
+    Usa o mesmo cache de orçamentos da rota Flask.
+    """
+    hoje = datetime.utcnow()
+    cache = cache_orcamentos()
+    versao = await _versao_dados(requisicao, conexao, usuario_id)
+    payload = cache.obter('resumo_orcamentos', usuario_id, hoje.month, hoje.year, versao)
+    if payload is not None:
+        return 200, payload
+
+    orcamentos = (await conexao.execute(consulta_orcamentos_do_mes([usuario_id], hoje.month, hoje.year))).all()
+    gastos = dict((await conexao.execute(consulta_gastos_por_categoria(
+        usuario_id, hoje.month, hoje.year, [o.categoria_id for o in orcamentos]
+    ))).all()) if orcamentos else {}
+
+    payload = payload_resumo(
+        avaliar_orcamento(o, gastos.get(o.categoria_id, 0), hoje) for o in orcamentos
+    )
+    cache.gravar('resumo_orcamentos', usuario_id, hoje.month, hoje.year, versao, payload)
+    return 200, payload
+
+
+async def detalhes_orcamento(requisicao, conexao, usuario_id, orcamento_id):
+    """Mesma resposta de /api/orcamentos/<id>/detalhes"""
+    orcamento = (await conexao.execute(consulta_orcamentos(Orcamento.id == orcamento_id))).first()
+    if orcamento is None:
+        return 404, {'sucesso': False, 'erro': 'Orçamento não encontrado'}
+    if orcamento.usuario_id != usuario_id:
+        return 403, {'sucesso': False, 'erro': 'Não autorizado'}
+
+    hoje = datetime.utcnow()
+    mes, ano, categoria_ids = orcamento.mes, orcamento.ano, [orcamento.categoria_id]
+
+    gastos = dict((await conexao.execute(
+        consulta_gastos_por_categoria(usuario_id, mes, ano, categoria_ids)
+    )).all())
+
+    projecao = None
+    if (hoje.month, hoje.year) == (mes, ano):
+        linhas = (await conexao.execute(consulta_gastos_diarios(usuario_id, mes, ano, categoria_ids))).all()
+        matriz = matriz_de_gastos(linhas, mes, ano, categoria_ids)
+        projecao = prever_da_matriz(matriz, mes, ano, categoria_ids, hoje)[orcamento.categoria_id]
+
+    resumo = avaliar_orcamento(orcamento, gastos.get(orcamento.categoria_id, 0), hoje, projecao)
+    return 200, payload_detalhes(orcamento.categoria_nome, resumo)
+
+
+async def alertas_orcamentos(requisicao, conexao, usuario_id):
+    """Mesma resposta de /api/orcamentos/alertas: tabela alertas ou cálculo na hora
+
+    Usa o mesmo cache de orçamentos da rota Flask.
+    """
+    hoje = datetime.utcnow()
+    cache = cache_orcamentos()
+    versao = await _versao_dados(requisicao, conexao, usuario_id)
+    payload = cache.obter('alertas_orcamentos', usuario_id, hoje.month, hoje.year, versao)
+    if payload is not None:
+        return 200, payload
+
+    linha = (await conexao.execute(consulta_alertas_gravados(usuario_id, hoje.month, hoje.year))).one()
+    payload = payload_gravado(linha)
+    if payload is None:
+        orcamentos = (await conexao.execute(consulta_orcamentos_do_mes([usuario_id], hoje.month, hoje.year))).all()
+        gastos = (await conexao.execute(consulta_gastos_usuarios([usuario_id], hoje.month, hoje.year))).all()
+        alertas = alertas_das_linhas([usuario_id], orcamentos, gastos, hoje)[usuario_id]
+        payload = payload_alertas(alertas, hoje)
+
+    cache.gravar('alertas_orcamentos', usuario_id, hoje.month, hoje.year, versao, payload)
+    return 200, payload
+
+
+async def validar_formulario(requisicao, conexao, usuario_id):
+    """Mesma resposta de /api/validar"""
+    try:
+        return 200, validar_requisicao(requisicao.json())
+    except ValueError as erro:
+        return 400, {'sucesso': False, 'erro': str(erro)}
+
+
+# (métodos, padrão do caminho, função, condicional por ETag, usa o banco)
+ROTAS = [
+    (('GET', 'POST'), r'/api/transacoes/buscar', buscar_transacoes, True, True),
+    (('GET',), r'/api/categorias/sugeridas', categorias_sugeridas, True, True),
+    (('GET',), r'/api/orcamentos/resumo', resumo_orcamentos, True, True),
+    (('GET',), r'/api/orcamentos/alertas', alertas_orcamentos, True, True),
+    (('GET',), r'/api/orcamentos/(?P<orcamento_id>\d+)/detalhes', detalhes_orcamento, False, True),
+    (('POST',), r'/api/validar', validar_formulario, False, False),
+]
+ROTAS = [(metodos, re.compile(padrao + r'\Z'), *resto) for metodos, padrao, *resto in ROTAS]
+
+
+def encontrar_rota(metodo, caminho):
+    """(rota, parâmetros) da tabela ROTAS, ou (None, None)"""
+    for metodos, padrao, funcao, condicional, usa_banco in ROTAS:
+        encontrado = padrao.match(caminho)
+        if encontrado and metodo in metodos:
+            parametros = {nome: int(valor) for nome, valor in encontrado.groupdict().items()}
+            return (funcao, condicional, usa_banco), parametros
+    return None, None
+
+
+# ========== BANCO ==========
+def criar_engine_assincrono(flask_app):
+    """Engine aiosqlite para o mesmo banco, pool e PRAGMAs da app Flask"""
+    uri = flask_app.config['SQLALCHEMY_DATABASE_URI']
+    if not uri.startswith('sqlite:///') or uri == 'sqlite:///:memory:':
+        raise ValueError('A API assíncrona requer um banco SQLite em arquivo')
+
+    engine = create_async_engine(
+        'sqlite+aiosqlite:///' + uri[len('sqlite:///'):],
+        **(flask_app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    )
+    aplicar_pragmas(engine.sync_engine, pragmas_configurados(flask_app))
+    return engine
+
+
+# ========== APP ASGI ==========
+class ApiAssincrona:
+    """App ASGI com as rotas de ROTAS; o restante vai para a app Flask"""
+
+    def __init__(self, flask_app, engine=None):
+        self.flask_app = flask_app
+        self.engine = engine or criar_engine_assincrono(flask_app)
+        self.wsgi = WsgiToAsgi(flask_app) if WsgiToAsgi is not None else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        rota, parametros = encontrar_rota(scope['method'], scope['path'])
+        if rota is None:
+            return await self._repassar(scope, receive, send)
+
+        corpo = await self._ler_corpo(receive)
+        requisicao = Requisicao(scope, corpo)
+        try:
+            resposta = await self._atender(requisicao, rota, parametros)
+        except Exception:
+            logger.exception('Erro em %s %s', requisicao.metodo, requisicao.caminho)
+            resposta = (500, {'sucesso': False, 'erro': 'Erro interno'}, [])
+
+        if resposta is None:
+            return await self._repassar(scope, self._reenviar(corpo), send)
+        await self._responder(send, *resposta)
+
+    async def _atender(self, requisicao, rota, parametros):
+        """(status, payload, cabeçalhos) ou None para repassar ao Flask"""
+        funcao, condicional, usa_banco = rota
+
+        sessao = ler_sessao(self.flask_app, requisicao)
+        usuario_id = sessao.get('usuario_id')
+        if usuario_id is None:
+            return 401, {'sucesso': False, 'erro': 'Faça login primeiro'}, []
+
+        # consultas.fts_disponivel e o provedor JSON leem a configuração da app
+        with self.flask_app.app_context():
+            if not usa_banco:
+                status, payload = await funcao(requisicao, None, usuario_id, **parametros)
+                return status, payload, []
+
+            async with self.engine.connect() as conexao:
+                cabecalhos = []
+                if condicional and not sessao.get('_flashes'):
+                    versao = (await conexao.execute(consulta_versao_dados(usuario_id))).scalar() or 0
+                    requisicao.versao_dados = versao
+                    etag = calcular_etag(
+                        usuario_id, versao, requisicao.caminho, requisicao.query_string,
+                        requisicao.corpo.decode('utf-8', 'replace') if requisicao.metodo == 'POST' else None
+                    )
+                    # Revalidar sempre: o ETag muda assim que os dados mudam
+                    cabecalhos = [('ETag', f'W/"{etag}"'), ('Cache-Control', 'private, no-cache')]
+                    if parse_etags(requisicao.cabecalhos.get('if-none-match')).contains_weak(etag):
+                        return 304, None, cabecalhos
+
+                resultado = await funcao(requisicao, conexao, usuario_id, **parametros)
+                if resultado is None:
+                    return None
+                status, payload = resultado
+                return status, payload, cabecalhos if status == 200 else []
+
+    async def _responder(self, send, status, payload, cabecalhos):
+        # Mesmo corpo do jsonify (separadores e quebra de linha final), pois
+        # as duas implementações compartilham os ETags
+        resposta = None if payload is None else self.flask_app.json.response(payload)
+        corpo = b'' if resposta is None else resposta.get_data()
+        cabecalhos = [(nome.lower().encode('latin-1'), valor.encode('latin-1')) for nome, valor in cabecalhos]
+        if resposta is not None:
+            cabecalhos.append((b'content-type', resposta.content_type.encode('latin-1')))
+        cabecalhos.append((b'content-length', str(len(corpo)).encode('latin-1')))
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': cabecalhos})
+        await send({'type': 'http.response.body', 'body': corpo})
+
+    async def _repassar(self, scope, receive, send):
+        if self.wsgi is not None:
+            return await self.wsgi(scope, receive, send)
+        await self._responder(send, 404, {'sucesso': False, 'erro': 'Rota não encontrada'}, [])
+
+    @staticmethod
+    async def _ler_corpo(receive):
+        partes = []
+        while True:
+            mensagem = await receive()
+            partes.append(mensagem.get('body', b''))
+            if not mensagem.get('more_body'):
+                return b''.join(partes)
+
+    @staticmethod
+    def _reenviar(corpo):
+        """receive que devolve o corpo já lido (ao repassar para o Flask)"""
+        enviado = False
+
+        async def receive():
+            nonlocal enviado
+            if enviado:
+                return {'type': 'http.disconnect'}
+            enviado = True
+            return {'type': 'http.request', 'body': corpo, 'more_body': False}
+        return receive
+
+    async def _lifespan(self, receive, send):
+        while True:
+            mensagem = await receive()
+            if mensagem['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif mensagem['type'] == 'lifespan.shutdown':
+                await self.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+def criar_api_assincrona(flask_app):
+    """App ASGI que atende a API JSON de forma assíncrona sobre flask_app"""
+    return ApiAssincrona(flask_app)
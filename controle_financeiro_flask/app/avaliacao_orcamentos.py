@@ -0,0 +1,291 @@
+"""
+Avaliação em lote de Orçamentos
+Calcula gasto, percentual, restante, status e projeção de todos os orçamentos
+de um usuário/mês com uma única consulta à tabela resumo_mensal (mais uma,
+no mês corrente, para a previsão de app.previsao_gastos). Os valores são
+calculados em centavos inteiros; as propriedades em reais servem aos
+templates e às APIs.
+"""
+
+from app import db
+from app.models import ResumoMensal, Orcamento, Categoria
+from app.dinheiro import de_centavos, formatar_centavos
+from app.previsao_gastos import prever_gastos
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+
+# ========== RESULTADO IMUTÁVEL ==========
+@dataclass(frozen=True)
+class ResumoOrcamento:
+    """Fotografia dos indicadores de um orçamento em um instante"""
+    orcamento_id: int
+    categoria_id: int
+    limite_centavos: int
+    alerta_percentual: float
+    gasto_centavos: int
+    percentual: float
+    restante_centavos: int
+    status: str
+    projecao_centavos: int
+    dias_restantes: int
+
+    @property
+    def limite(self):
+        return de_centavos(self.limite_centavos)
+
+    @property
+    def gasto(self):
+        return de_centavos(self.gasto_centavos)
+
+    @property
+    def restante(self):
+        return de_centavos(self.restante_centavos)
+
+    @property
+    def projecao(self):
+        return de_centavos(self.projecao_centavos)
+
+    @property
+    def status_badge(self):
+        """Badge de status para exibição"""
+        if self.status == 'excedido':
+            return {'classe': 'danger', 'texto': 'Excedido', 'icone': 'fa-exclamation-circle'}
+        elif self.status == 'aviso':
+            return {'classe': 'warning', 'texto': 'Aviso', 'icone': 'fa-exclamation-triangle'}
+        else:
+            return {'classe': 'success', 'texto': 'Ok', 'icone': 'fa-check-circle'}
+
+    @property
+    def alerta_projecao(self):
+        """Alerta indicando se a projeção ultrapassa o limite"""
+        if self.projecao_centavos > self.limite_centavos:
+            excesso = self.projecao - self.limite
+            return {
+                'alerta': True,
+                'mensagem': f'Projeção: R$ {self.projecao:.2f} (Excesso: R$ {excesso:.2f})',
+                'classe': 'warning'
+            }
+        else:
+            margem = self.limite - self.projecao
+            return {
+                'alerta': False,
+                'mensagem': f'Projeção: R$ {self.projecao:.2f} (Margem: R$ {margem:.2f})',
+                'classe': 'info'
+            }
+
+
+# ========== CONSULTA AGRUPADA ==========
+def intervalo_mes(mes, ano):
+    """Retornar o primeiro dia do mês e o primeiro dia do mês seguinte"""
+    primeiro_dia = datetime(ano, mes, 1)
+    if mes == 12:
+        proximo_mes = datetime(ano + 1, 1, 1)
+    else:
+        proximo_mes = datetime(ano, mes + 1, 1)
+    return primeiro_dia, proximo_mes
+
+
+def consulta_gastos_por_categoria(usuario_id, mes, ano, categoria_ids=None):
+    """SELECT (categoria_id, soma_centavos) das despesas do mês em resumo_mensal"""
+    stmt = db.select(
+        ResumoMensal.categoria_id,
+        ResumoMensal.soma_centavos
+    ).where(
+        ResumoMensal.usuario_id == usuario_id,
+        ResumoMensal.ano == ano,
+        ResumoMensal.mes == mes,
+        ResumoMensal.tipo == 'despesa'
+    )
+
+    if categoria_ids is not None:
+        stmt = stmt.where(ResumoMensal.categoria_id.in_(categoria_ids))
+
+    return stmt
+
+
+def consulta_orcamentos(*condicoes):
+    """SELECT das colunas usadas por avaliar_orcamento, com o nome da categoria
+
+    As linhas servem no lugar dos objetos Orcamento quando não é preciso
+    carregar o ORM (API assíncrona, alertas em lote).
+    """
+    return db.select(
+        Orcamento.id,
+        Orcamento.usuario_id,
+        Orcamento.categoria_id,
+        Orcamento.mes,
+        Orcamento.ano,
+        Orcamento.limite_centavos,
+        Orcamento.alerta_percentual,
+        Categoria.nome.label('categoria_nome')
+    ).join(Categoria, Categoria.id == Orcamento.categoria_id).where(*condicoes).order_by(Orcamento.id)
+
+
+def consulta_orcamentos_do_mes(usuario_ids, mes, ano):
+    """consulta_orcamentos dos usuários em um mês"""
+    return consulta_orcamentos(
+        Orcamento.usuario_id.in_(usuario_ids),
+        Orcamento.mes == mes,
+        Orcamento.ano == ano
+    )
+
+
+def calcular_gastos_por_categoria(usuario_id, mes, ano, categoria_ids=None):
+    """Obter as despesas do mês por categoria (em centavos) a partir de resumo_mensal"""
+    return dict(db.session.execute(consulta_gastos_por_categoria(usuario_id, mes, ano, categoria_ids)).all())
+
+
+# ========== CÁLCULOS ==========
+def calcular_dias_restantes(mes, ano, hoje):
+    """Calcular os dias restantes do mês (0 se não for o mês corrente)"""
+    if hoje.year != ano or hoje.month != mes:
+        return 0
+
+    _, proximo_mes = intervalo_mes(mes, ano)
+    ultimo_dia_mes = proximo_mes - timedelta(days=1)
+
+    dias_restantes = (ultimo_dia_mes.date() - hoje.date()).days + 1
+    return max(dias_restantes, 0)
+
+
+def calcular_projecao(gasto_centavos, mes, ano, hoje, dias_restantes):
+    """Projetar linearmente o gasto (em centavos) até o final do mês"""
+    # Se não é o mês atual, a projeção é o próprio gasto
+    if hoje.year != ano or hoje.month != mes:
+        return gasto_centavos
+
+    dias_passados = hoje.day
+    if dias_passados == 0:
+        return 0
+
+    # Média diária × dias restantes, arredondada para o centavo mais próximo
+    return gasto_centavos + (2 * gasto_centavos * dias_restantes + dias_passados) // (2 * dias_passados)
+
+
+def avaliar_orcamento(orcamento, gasto_centavos, hoje=None, projecao_centavos=None):
+    """Montar o resumo de um orçamento a partir do gasto (em centavos) já calculado
+
+    Sem projecao_centavos (da previsão em lote), a projeção é linear.
+    """
+    hoje = hoje or datetime.utcnow()
+    limite_centavos = orcamento.limite_centavos
+
+    if limite_centavos <= 0:
+        percentual = 0.0
+    else:
+        # Máximo 100% para visualização
+        percentual = min(gasto_centavos * 100 / limite_centavos, 100.0)
+
+    if percentual >= 100:
+        status = 'excedido'
+    elif percentual >= orcamento.alerta_percentual:
+        status = 'aviso'
+    else:
+        status = 'ok'
+
+    dias_restantes = calcular_dias_restantes(orcamento.mes, orcamento.ano, hoje)
+    if projecao_centavos is None:
+        projecao_centavos = calcular_projecao(gasto_centavos, orcamento.mes, orcamento.ano, hoje, dias_restantes)
+
+    return ResumoOrcamento(
+        orcamento_id=orcamento.id,
+        categoria_id=orcamento.categoria_id,
+        limite_centavos=limite_centavos,
+        alerta_percentual=orcamento.alerta_percentual,
+        gasto_centavos=gasto_centavos,
+        percentual=percentual,
+        restante_centavos=max(limite_centavos - gasto_centavos, 0),
+        status=status,
+        projecao_centavos=max(projecao_centavos, gasto_centavos),
+        dias_restantes=dias_restantes
+    )
+
+
+def avaliar_orcamentos(orcamentos, hoje=None, projetar=True):
+    """Avaliar vários orçamentos com uma consulta por usuário/mês
+
+    No mês corrente, as projeções de todas as categorias vêm de uma única
+    consulta da previsão em lote; com projetar=False (quem só usa gasto e
+    status), a projeção é linear e essa consulta não é feita.
+
+    Retorna um dicionário {orcamento_id: ResumoOrcamento}
+    """
+    hoje = hoje or datetime.utcnow()
+
+    # Agrupar por usuário/mês para que cada período gere uma única consulta
+    periodos = {}
+    for orcamento in orcamentos:
+        chave = (orcamento.usuario_id, orcamento.mes, orcamento.ano)
+        periodos.setdefault(chave, []).append(orcamento)
+
+    resumos = {}
+    for (usuario_id, mes, ano), grupo in periodos.items():
+        categoria_ids = [o.categoria_id for o in grupo]
+        gastos = calcular_gastos_por_categoria(usuario_id, mes, ano, categoria_ids=categoria_ids)
+
+        # Meses passados ou futuros: a projeção é o próprio gasto
+        projecoes = {}
+        if projetar and hoje.year == ano and hoje.month == mes:
+            projecoes = prever_gastos(usuario_id, mes, ano, categoria_ids, hoje)
+
+        for orcamento in grupo:
+            gasto = gastos.get(orcamento.categoria_id, 0)
+            resumos[orcamento.id] = avaliar_orcamento(
+                orcamento, gasto, hoje, projecoes.get(orcamento.categoria_id) if projetar else None
+            )
+
+    return resumos
+
+
+def totalizar(resumos):
+    """Consolidar limite, gasto e contagem de status de um conjunto de resumos"""
+    resumos = list(resumos)
+    total_limite_centavos = sum(r.limite_centavos for r in resumos)
+    total_gasto_centavos = sum(r.gasto_centavos for r in resumos)
+    return {
+        'total_limite': de_centavos(total_limite_centavos),
+        'total_gasto': de_centavos(total_gasto_centavos),
+        'total_limite_centavos': total_limite_centavos,
+        'total_gasto_centavos': total_gasto_centavos,
+        'status_ok': len([r for r in resumos if r.status == 'ok']),
+        'status_aviso': len([r for r in resumos if r.status == 'aviso']),
+        'status_excedido': len([r for r in resumos if r.status == 'excedido']),
+    }
+
+
+# ========== RESPOSTAS DAS APIS ==========
+def payload_resumo(resumos):
+    """Resposta de /api/orcamentos/resumo a partir dos resumos do mês"""
+    resumos = list(resumos)
+    totais = totalizar(resumos)
+    total_limite = totais['total_limite_centavos']
+    total_gasto = totais['total_gasto_centavos']
+    total_restante = total_limite - total_gasto
+
+    return {
+        'sucesso': True,
+        'total_limite': formatar_centavos(total_limite),
+        'total_gasto': formatar_centavos(total_gasto),
+        'total_restante': formatar_centavos(total_restante),
+        'percentual_usado': f"{(total_gasto / total_limite * 100) if total_limite > 0 else 0:.1f}",
+        'status_ok': totais['status_ok'],
+        'status_aviso': totais['status_aviso'],
+        'status_excedido': totais['status_excedido'],
+        'total_orcamentos': len(resumos)
+    }
+
+
+def payload_detalhes(categoria, resumo):
+    """Resposta de /api/orcamentos/<id>/detalhes"""
+    return {
+        'sucesso': True,
+        'categoria': categoria,
+        'limite': formatar_centavos(resumo.limite_centavos),
+        'gasto': formatar_centavos(resumo.gasto_centavos),
+        'restante': formatar_centavos(resumo.restante_centavos),
+        'percentual': f"{resumo.percentual:.1f}",
+        'status': resumo.status,
+        'projecao': formatar_centavos(resumo.projecao_centavos),
+        'dias_restantes': resumo.dias_restantes
+    }
@@ -0,0 +1,74 @@
+"""
+Registro preguiçoso dos blueprints
+Os módulos de rotas (e o que eles importam, como o NumPy das análises) só são
+importados quando a app recebe a primeira requisição, e não em create_app.
+Processos que nunca atendem requisições (comandos da CLI, workers de
+alertas, scripts) não pagam por essas importações.
+
+O registro acontece no wsgi_app antes de o Flask marcar a primeira
+requisição (depois dela não é possível registrar blueprints). Um url_for
+fora de requisições também carrega os blueprints antes de montar a URL.
+"""
+
+from werkzeug.utils import import_string
+import threading
+
+
+# Blueprints da aplicação, na ordem de registro ('modulo:atributo')
+BLUEPRINTS = (
+    'app.routes:auth_bp',
+    'app.routes:dashboard_bp',
+    'app.routes:categorias_bp',
+    'app.routes:transacoes_bp',
+    'app.routes_orcamentos:orcamentos_bp',
+    'app.routes_analises:analises_bp',
+)
+
+
+class BlueprintsPreguicosos:
+    """Importa e registra os blueprints de uma app uma única vez"""
+
+    def __init__(self, app, caminhos=BLUEPRINTS):
+        self.app = app
+        self.caminhos = caminhos
+        self.carregados = False
+        self._lock = threading.Lock()
+        self._wsgi_app = app.wsgi_app
+
+    def carregar(self):
+        """Importar e registrar os blueprints (idempotente e seguro entre threads)"""
+        if self.carregados:
+            return
+        with self._lock:
+            if self.carregados:
+                return
+            for caminho in self.caminhos:
+                blueprint = import_string(caminho)
+                # Já registrado diretamente (ex.: por um script antes da primeira requisição)
+                if self.app.blueprints.get(blueprint.name) is not blueprint:
+                    self.app.register_blueprint(blueprint)
+            self.carregados = True
+
+    def __call__(self, environ, start_response):
+        self.carregar()
+        return self._wsgi_app(environ, start_response)
+
+    def ao_falhar_url(self, erro, endpoint, valores):
+        """url_for de um endpoint ainda não registrado: carregar e tentar de novo"""
+        if self.carregados:
+            raise erro
+        self.carregar()
+        return self.app.url_for(endpoint, **valores)
+
+
+def registrar_blueprints(app):
+    """Registrar os blueprints agora ou na primeira requisição (BLUEPRINTS_PREGUICOSOS)"""
+    preguicosos = BlueprintsPreguicosos(app)
+    app.extensions['blueprints'] = preguicosos
+
+    if not app.config.get('BLUEPRINTS_PREGUICOSOS', True):
+        preguicosos.carregar()
+        return
+
+    app.wsgi_app = preguicosos
+    app.url_build_error_handlers.append(preguicosos.ao_falhar_url)
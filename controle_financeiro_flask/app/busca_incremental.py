@@ -0,0 +1,255 @@
+"""
+Refinamento incremental da busca de transações (busca enquanto se digita)
+O painel chama /api/transacoes/buscar a cada tecla (com debounce), e cada
+letra a mais normalmente só estreita o filtro anterior. Quando uma busca com
+descrição cabe inteira em uma página, o resultado fica guardado, por
+usuário, em forma compacta (data, id, valor, tipo, id da categoria e a
+descrição normalizada para comparação). Enquanto os filtros seguintes forem
+um subconjunto dos guardados (descrição mais longa, intervalo de datas
+menor, categoria ou tipo fixados), a página sai dessa sessão, filtrada em
+memória, na mesma ordem e com o mesmo cursor da consulta.
+
+A sessão só é aberta com resultados que a própria consulta da página já
+trouxe completos: buscar mais linhas só para preenchê-la custa mais do que
+as consultas que ela evitaria. Assim ela tem no máximo LIMITE_MAXIMO linhas.
+
+Cada usuário tem uma sessão, guardada no backend de app.cache por
+TTL_SESSAO segundos. Ela vale apenas para a versão dos dados
+(usuarios.versao_dados) em que foi lida, então qualquer commit do usuário,
+em qualquer processo, a descarta.
+
+A comparação em memória reproduz a do banco:
+- sem FTS5, o LIKE do SQLite, que ignora maiúsculas apenas em ASCII;
+- com FTS5, o tokenizador unicode61 remove_diacritics 2, com termos por
+  prefixo. A emulação foi conferida contra o SQLite caractere a caractere
+  no Latin-1 e no Latin Extended-A (exceto µ e ſ); descrições com outros
+  caracteres não abrem sessão.
+A ordenação por relevância não é refinada, pois depende do rank do FTS5.
+"""
+
+from app import db
+from app.condicional import versao_da_requisicao
+from app.consultas import decodificar_cursor, fts_disponivel, termos_fts, usa_relevancia
+from collections import namedtuple
+from flask import current_app
+import itertools
+import re
+import string
+import threading
+import unicodedata
+
+
+# Segundos que a sessão de busca de um usuário permanece no cache
+TTL_SESSAO = 120
+
+# Linha guardada na sessão; 'chave' é a descrição normalizada do modo da busca
+LinhaSessao = namedtuple('LinhaSessao', 'data id valor_centavos tipo categoria_id descricao chave')
+
+# Linha devolvida, com os mesmos campos de consultas.consulta_transacoes
+LinhaBusca = namedtuple('LinhaBusca', 'id descricao valor_centavos tipo data categoria_id categoria')
+
+Sessao = namedtuple('Sessao', 'versao modo filtros termos categorias linhas')
+
+# Caracteres em que tokens_fts coincide com o unicode61 do SQLite
+_SUPORTADOS_FTS = re.compile('^[\x00-\xb4\xb6-\u017e]*$')
+
+_MINUSCULAS_ASCII = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _dobrar(caractere):
+    decomposto = unicodedata.normalize('NFD', caractere.lower())
+    return ''.join(c for c in decomposto if unicodedata.category(c) != 'Mn')
+
+
+# Minúsculas sem acentos de cada caractere suportado, para str.translate
+_DOBRAR_FTS = str.maketrans({chr(c): _dobrar(chr(c)) for c in range(0x180) if _SUPORTADOS_FTS.match(chr(c))})
+
+_TOKEN = re.compile(r'[^\W_]+')
+
+
+# ========== NORMALIZAÇÃO ==========
+def tokens_fts(texto):
+    """Tokens do texto como o unicode61 remove_diacritics 2 os indexa
+
+    Apenas para texto com os caracteres de _SUPORTADOS_FTS.
+    """
+    return _TOKEN.findall(texto.translate(_DOBRAR_FTS))
+
+
+def modo_da_busca(filtros):
+    """'fts' ou 'like', o mesmo caminho escolhido por consulta_transacoes"""
+    return 'fts' if termos_fts(filtros['descricao']) and fts_disponivel() else 'like'
+
+
+def termos_da_busca(modo, descricao):
+    """Descrição normalizada para comparação em memória
+
+    No modo 'fts', a tupla de prefixos (um por palavra, como em termos_fts);
+    no 'like', o texto em minúsculas ASCII. None se a comparação não puder
+    ser reproduzida (curingas do LIKE, palavras que o FTS5 trataria como
+    frase ou caracteres fora dos suportados).
+    """
+    if modo == 'like':
+        if '%' in descricao or '_' in descricao:
+            return None
+        return descricao.translate(_MINUSCULAS_ASCII)
+
+    termos = []
+    for palavra in re.findall(r'\w+', descricao.lower()):
+        tokens = tokens_fts(palavra) if _SUPORTADOS_FTS.match(palavra) else []
+        if len(tokens) != 1:
+            return None
+        termos.append(tokens[0])
+    return tuple(termos)
+
+
+def chave_da_linha(modo, descricao):
+    """Descrição da linha normalizada para o modo (None se não suportada)"""
+    if modo == 'like':
+        return descricao.translate(_MINUSCULAS_ASCII)
+    if not _SUPORTADOS_FTS.match(descricao):
+        return None
+    return tuple(tokens_fts(descricao))
+
+
+# ========== FILTRAGEM EM MEMÓRIA ==========
+def _texto_contem(modo, termos, chave):
+    if modo == 'like':
+        return termos in chave
+    return all(any(token.startswith(termo) for token in chave) for termo in termos)
+
+
+def contem(sessao, filtros, termos):
+    """Verificar se os filtros selecionam um subconjunto das linhas da sessão"""
+    base = sessao.filtros
+    for campo in ('categoria_id', 'tipo'):
+        if base[campo] and base[campo] != filtros[campo]:
+            return False
+    if base['data_inicio'] and not (filtros['data_inicio'] and filtros['data_inicio'] >= base['data_inicio']):
+        return False
+    if base['data_fim'] and not (filtros['data_fim'] and filtros['data_fim'] <= base['data_fim']):
+        return False
+
+    # Quem contém o texto (ou os prefixos) novo também contém o antigo
+    if sessao.modo == 'like':
+        return sessao.termos in termos
+    return _texto_contem('fts', sessao.termos, termos)
+
+
+def corresponde(linha, filtros, modo, termos):
+    """Mesmos critérios do WHERE de consulta_transacoes, sobre uma LinhaSessao"""
+    if filtros['categoria_id'] and linha.categoria_id != filtros['categoria_id']:
+        return False
+    if filtros['tipo'] and linha.tipo != filtros['tipo']:
+        return False
+    if filtros['data_inicio'] and linha.data < filtros['data_inicio']:
+        return False
+    if filtros['data_fim'] and linha.data >= filtros['data_fim']:
+        return False
+    return _texto_contem(modo, termos, linha.chave)
+
+
+# ========== SESSÕES ==========
+class SessoesBusca:
+    """Sessão de busca de cada usuário, com contadores de refinamentos
+
+    Sem banco: quem chama lê a versão dos dados e executa a consulta (a rota
+    Flask e a API assíncrona usam a mesma instância).
+    """
+
+    def __init__(self, backend, ttl=TTL_SESSAO, ativo=True):
+        self.backend = backend
+        self.ttl = ttl
+        self.ativo = ativo
+        self.refinadas = 0
+        self.abertas = 0
+        self._lock = threading.Lock()
+
+    def refinar(self, usuario_id, versao, filtros, limite, cursor=None):
+        """Até limite + 1 LinhaBusca da sessão do usuário, ou None se ela não atende
+
+        O cursor já deve ter sido validado (consultas.aplicar_cursor).
+        """
+        if not self.ativo or usa_relevancia(filtros):
+            return None
+        sessao = self.backend.obter(('sessao_busca', usuario_id))
+        if sessao is None or sessao.versao != versao:
+            return None
+
+        modo = modo_da_busca(filtros)
+        termos = termos_da_busca(modo, filtros['descricao'])
+        if modo != sessao.modo or termos is None or not contem(sessao, filtros, termos):
+            return None
+
+        linhas = (linha for linha in sessao.linhas if corresponde(linha, filtros, modo, termos))
+        if cursor:
+            posicao = decodificar_cursor(cursor)
+            linhas = (linha for linha in linhas if (linha.data, linha.id) < posicao)
+
+        with self._lock:
+            self.refinadas += 1
+        return [
+            LinhaBusca(linha.id, linha.descricao, linha.valor_centavos, linha.tipo, linha.data,
+                       linha.categoria_id, sessao.categorias[linha.categoria_id])
+            for linha in itertools.islice(linhas, limite + 1)
+        ]
+
+    def abrir(self, usuario_id, versao, filtros, linhas, limite, cursor=None):
+        """Guardar as até limite + 1 linhas de uma consulta que não passou da página
+
+        Só a primeira página de uma busca com descrição, ordenada por data.
+        """
+        if not self.ativo or len(linhas) > limite or cursor or not filtros['descricao'] or usa_relevancia(filtros):
+            return
+
+        modo = modo_da_busca(filtros)
+        termos = termos_da_busca(modo, filtros['descricao'])
+        if termos is None:
+            return
+
+        compactas, categorias = [], {}
+        for linha in linhas:
+            chave = chave_da_linha(modo, linha.descricao or '')
+            if chave is None:
+                return
+            compactas.append(LinhaSessao(
+                linha.data, linha.id, linha.valor_centavos, linha.tipo,
+                linha.categoria_id, linha.descricao, chave
+            ))
+            categorias[linha.categoria_id] = linha.categoria
+
+        sessao = Sessao(versao, modo, dict(filtros), termos, categorias, tuple(compactas))
+        self.backend.gravar(('sessao_busca', usuario_id), sessao, self.ttl)
+        with self._lock:
+            self.abertas += 1
+
+    def exportar_metricas(self):
+        """Linhas no formato do Prometheus para /metrics"""
+        return [
+            '# HELP financeiro_busca_refinada_total Buscas atendidas filtrando a sessão em memória.',
+            '# TYPE financeiro_busca_refinada_total counter',
+            f'financeiro_busca_refinada_total {self.refinadas}',
+            '# HELP financeiro_busca_sessoes_total Sessões de busca abertas a partir do banco.',
+            '# TYPE financeiro_busca_sessoes_total counter',
+            f'financeiro_busca_sessoes_total {self.abertas}'
+        ]
+
+
+def sessoes_busca():
+    """Sessões de busca da app atual"""
+    return current_app.extensions['sessoes_busca']
+
+
+def buscar_pagina(usuario_id, filtros, stmt, limite, cursor=None):
+    """Até limite + 1 linhas da busca: da sessão quando possível, senão do banco
+
+    stmt é a consulta de consulta_transacoes já com o cursor aplicado.
+    """
+    sessoes = sessoes_busca()
+    versao = versao_da_requisicao(usuario_id)
+
+    linhas = sessoes.refinar(usuario_id, versao, filtros, limite, cursor)
+    if linhas is None:
+        linhas = db.session.execute(stmt.limit(limite + 1)).all()
+        sessoes.abrir(usuario_id, versao, filtros, linhas, limite, cursor)
+    return linhas
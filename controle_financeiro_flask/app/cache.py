@@ -0,0 +1,297 @@
+"""
+Cache por usuário dos resumos de orçamentos e da lista de categorias
+As respostas de /api/orcamentos/resumo e /api/orcamentos/alertas ficam
+guardadas por (usuario_id, mes, ano) com TTL. A chave inclui a versão dos
+dados do usuário (usuarios.versao_dados, ver app.condicional), incrementada
+no commit de qualquer alteração dele, então uma escrita feita em qualquer
+processo invalida a entrada em todos. No processo que recebeu a escrita, a
+entrada também é descartada após o commit das alterações daquele mês (ou de
+qualquer categoria do usuário, que invalida todos os meses dele).
+As categorias de cada usuário (id e nome) ficam no mesmo backend e atendem
+os formulários e as verificações de posse sem consultar o banco, assim como
+as sessões da busca incremental (app/busca_incremental.py).
+
+O backend é plugável: CACHE_BACKEND aceita 'memoria' (padrão, LRU no próprio
+processo), 'nulo' (desativa o cache) ou um objeto com os métodos obter e
+gravar. Com vários workers e o backend em memória, cada processo tem suas
+entradas, mas nenhum devolve uma entrada de uma versão anterior dos dados.
+"""
+
+from app import db
+from app.condicional import versao_da_requisicao
+from app.eventos import ao_confirmar
+from app.models import Categoria
+from app.busca_incremental import SessoesBusca, TTL_SESSAO
+from collections import OrderedDict, namedtuple
+from flask import current_app, has_app_context
+import threading
+import time
+
+
+# Segundos que uma entrada permanece válida sem alterações
+TTL_PADRAO = 60
+
+# Entradas mantidas pelo backend em memória antes de descartar as mais antigas
+MAXIMO_ENTRADAS = 4096
+
+# Payloads guardados por usuário/mês
+PAYLOADS = ('resumo_orcamentos', 'alertas_orcamentos')
+
+_AUSENTE = object()
+
+# Forma compacta das categorias (os templates usam apenas id e nome)
+CategoriaResumida = namedtuple('CategoriaResumida', 'id nome')
+
+
+# ========== BACKENDS ==========
+class CacheMemoria:
+    """LRU com TTL no próprio processo, seguro entre threads"""
+
+    def __init__(self, maximo=MAXIMO_ENTRADAS):
+        self.maximo = maximo
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obter(self, chave, padrao=None):
+        with self._lock:
+            item = self._dados.get(chave, _AUSENTE)
+            if item is _AUSENTE:
+                return padrao
+            valor, expira_em = item
+            if expira_em is not None and expira_em <= time.monotonic():
+                del self._dados[chave]
+                return padrao
+            self._dados.move_to_end(chave)
+            return valor
+
+    def gravar(self, chave, valor, ttl=None):
+        expira_em = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._dados[chave] = (valor, expira_em)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maximo:
+                self._dados.popitem(last=False)
+
+    def __len__(self):
+        return len(self._dados)
+
+
+class CacheNulo:
+    """Backend que não guarda nada (cache desativado)"""
+
+    def obter(self, chave, padrao=None):
+        return padrao
+
+    def gravar(self, chave, valor, ttl=None):
+        pass
+
+
+BACKENDS = {'memoria': CacheMemoria, 'nulo': CacheNulo}
+
+
+# ========== CACHE DE ORÇAMENTOS ==========
+class CacheOrcamentos:
+    """Payloads por (usuario_id, mes, ano) com contadores de acertos e falhas
+
+    Invalidar não apaga entradas: incrementa a versão do mês (ou a geração
+    do usuário, para todos os meses), que faz parte da chave junto com a
+    versão dos dados do usuário. Assim, um cálculo iniciado antes de um
+    commit grava o resultado com a versão antiga e nunca é lido; as chaves
+    antigas expiram pelo TTL ou pelo LRU.
+    """
+
+    def __init__(self, backend, ttl=TTL_PADRAO):
+        self.backend = backend
+        self.ttl = ttl
+        self.acertos = {nome: 0 for nome in PAYLOADS}
+        self.falhas = {nome: 0 for nome in PAYLOADS}
+        self._lock = threading.Lock()
+
+    def _incrementar(self, chave):
+        self.backend.gravar(chave, self.backend.obter(chave, 0) + 1)
+
+    def _chave(self, nome, usuario_id, mes, ano, versao_dados):
+        return (
+            nome, usuario_id, mes, ano, versao_dados,
+            self.backend.obter(('geracao', usuario_id), 0),
+            self.backend.obter(('versao', usuario_id, mes, ano), 0)
+        )
+
+    def obter(self, nome, usuario_id, mes, ano, versao_dados):
+        """Payload guardado para a versão dos dados, ou None (contando acerto ou falha)"""
+        valor = self.backend.obter(self._chave(nome, usuario_id, mes, ano, versao_dados), _AUSENTE)
+        with self._lock:
+            if valor is _AUSENTE:
+                self.falhas[nome] += 1
+                return None
+            self.acertos[nome] += 1
+        return valor
+
+    def gravar(self, nome, usuario_id, mes, ano, versao_dados, valor):
+        self.backend.gravar(self._chave(nome, usuario_id, mes, ano, versao_dados), valor, self.ttl)
+
+    def obter_ou_calcular(self, nome, usuario_id, mes, ano, calcular, versao_dados=None):
+        """Retornar o payload guardado ou calcular, guardar e retornar
+
+        versao_dados: usuarios.versao_dados já lida (padrão: a da requisição).
+        A API assíncrona usa obter/gravar, pois calcula com await.
+        """
+        if versao_dados is None:
+            versao_dados = versao_da_requisicao(usuario_id)
+        valor = self.obter(nome, usuario_id, mes, ano, versao_dados)
+        if valor is None:
+            valor = calcular()
+            self.gravar(nome, usuario_id, mes, ano, versao_dados, valor)
+        return valor
+
+    def invalidar_mes(self, usuario_id, mes, ano):
+        self._incrementar(('versao', usuario_id, mes, ano))
+
+    def invalidar_usuario(self, usuario_id):
+        self._incrementar(('geracao', usuario_id))
+
+    def exportar_metricas(self):
+        """Linhas no formato do Prometheus para /metrics"""
+        linhas = [
+            '# HELP financeiro_cache_acertos_total Leituras atendidas pelo cache de orçamentos.',
+            '# TYPE financeiro_cache_acertos_total counter'
+        ]
+        linhas += [f'financeiro_cache_acertos_total{{payload="{nome}"}} {n}' for nome, n in sorted(self.acertos.items())]
+        linhas += [
+            '# HELP financeiro_cache_falhas_total Leituras que precisaram recalcular o payload.',
+            '# TYPE financeiro_cache_falhas_total counter'
+        ]
+        linhas += [f'financeiro_cache_falhas_total{{payload="{nome}"}} {n}' for nome, n in sorted(self.falhas.items())]
+        return linhas
+
+
+# ========== CACHE DE CATEGORIAS ==========
+class CacheCategorias:
+    """Categorias de cada usuário como tuplas (id, nome), ordenadas por id
+
+    A chave inclui a versão dos dados do usuário: uma categoria criada,
+    renomeada ou excluída em outro worker já muda a chave na requisição
+    seguinte. Para uma alteração confirmada depois da leitura da versão,
+    pertence() ainda confirma no banco antes de recusar.
+    """
+
+    def __init__(self, backend, ttl=TTL_PADRAO):
+        self.backend = backend
+        self.ttl = ttl
+        self.acertos = 0
+        self.falhas = 0
+        self._lock = threading.Lock()
+
+    def _chave(self, usuario_id):
+        return (
+            'categorias', usuario_id, versao_da_requisicao(usuario_id),
+            self.backend.obter(('geracao_categorias', usuario_id), 0)
+        )
+
+    def _carregar(self, usuario_id):
+        chave = self._chave(usuario_id)
+        categorias = self.backend.obter(chave, _AUSENTE)
+        if categorias is not _AUSENTE:
+            with self._lock:
+                self.acertos += 1
+            return categorias
+
+        with self._lock:
+            self.falhas += 1
+        categorias = tuple(db.session.query(Categoria.id, Categoria.nome).filter_by(
+            usuario_id=usuario_id
+        ).order_by(Categoria.id))
+        self.backend.gravar(chave, categorias, self.ttl)
+        return categorias
+
+    def listar(self, usuario_id):
+        """Categorias do usuário para os templates (atributos id e nome)"""
+        return [CategoriaResumida(*categoria) for categoria in self._carregar(usuario_id)]
+
+    def mapa(self, usuario_id):
+        """Categorias do usuário como {id: nome}"""
+        return dict(self._carregar(usuario_id))
+
+    def nome(self, usuario_id, categoria_id):
+        """Nome da categoria se ela pertence ao usuário, senão None"""
+        try:
+            categoria_id = int(categoria_id)
+        except (TypeError, ValueError):
+            return None
+
+        nome = self.mapa(usuario_id).get(categoria_id)
+        if nome is None and db.session.query(Categoria.id).filter_by(
+            id=categoria_id, usuario_id=usuario_id
+        ).first() is not None:
+            # Criada por outro processo depois do carregamento
+            self.invalidar(usuario_id)
+            nome = self.mapa(usuario_id).get(categoria_id)
+        return nome
+
+    def pertence(self, usuario_id, categoria_id):
+        return self.nome(usuario_id, categoria_id) is not None
+
+    def invalidar(self, usuario_id):
+        chave = ('geracao_categorias', usuario_id)
+        self.backend.gravar(chave, self.backend.obter(chave, 0) + 1)
+
+    def exportar_metricas(self):
+        """Linhas no formato do Prometheus para /metrics"""
+        return [
+            '# HELP financeiro_cache_categorias_acertos_total Listas de categorias atendidas pelo cache.',
+            '# TYPE financeiro_cache_categorias_acertos_total counter',
+            f'financeiro_cache_categorias_acertos_total {self.acertos}',
+            '# HELP financeiro_cache_categorias_falhas_total Listas de categorias lidas do banco.',
+            '# TYPE financeiro_cache_categorias_falhas_total counter',
+            f'financeiro_cache_categorias_falhas_total {self.falhas}'
+        ]
+
+
+@ao_confirmar
+def _invalidar(alteracoes):
+    """Descartar os payloads afetados pelas alterações confirmadas"""
+    if not has_app_context() or 'cache_orcamentos' not in current_app.extensions:
+        return
+
+    cache = current_app.extensions['cache_orcamentos']
+    for alteracao in alteracoes:
+        if alteracao.tabela == 'categorias':
+            # Nomes de categoria aparecem nos alertas de qualquer mês
+            cache.invalidar_usuario(alteracao.usuario_id)
+            current_app.extensions['cache_categorias'].invalidar(alteracao.usuario_id)
+        elif alteracao.ano is not None:
+            cache.invalidar_mes(alteracao.usuario_id, alteracao.mes, alteracao.ano)
+
+
+def cache_orcamentos():
+    """Cache de orçamentos da app atual"""
+    return current_app.extensions['cache_orcamentos']
+
+
+def cache_categorias():
+    """Cache de categorias da app atual"""
+    return current_app.extensions['cache_categorias']
+
+
+def init_cache(app):
+    """Criar os caches com o backend de CACHE_BACKEND e ligar às métricas
+
+    BUSCA_INCREMENTAL = False desativa as sessões de busca.
+    """
+    backend = app.config.get('CACHE_BACKEND', 'memoria')
+    if isinstance(backend, str):
+        backend = BACKENDS[backend]()
+
+    ttl = app.config.get('CACHE_TTL', TTL_PADRAO)
+    app.extensions['cache_orcamentos'] = CacheOrcamentos(backend, ttl)
+    app.extensions['cache_categorias'] = CacheCategorias(backend, ttl)
+    app.extensions['sessoes_busca'] = SessoesBusca(
+        backend,
+        app.config.get('BUSCA_INCREMENTAL_TTL', TTL_SESSAO),
+        app.config.get('BUSCA_INCREMENTAL', True) and not isinstance(backend, CacheNulo)
+    )
+
+    if 'metricas' in app.extensions:
+        app.extensions['metricas'].adicionar_coletor(app.extensions['cache_orcamentos'].exportar_metricas)
+        app.extensions['metricas'].adicionar_coletor(app.extensions['cache_categorias'].exportar_metricas)
+        app.extensions['metricas'].adicionar_coletor(app.extensions['sessoes_busca'].exportar_metricas)
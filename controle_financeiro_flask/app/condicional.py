@@ -0,0 +1,125 @@
+"""
+Requisições condicionais (ETag / If-None-Match) pela versão dos dados
+Cada usuário tem um contador, usuarios.versao_dados, incrementado na mesma
+transação de qualquer commit que altere as transações, categorias ou
+orçamentos dele. As views marcadas com @condicional respondem com um ETag
+fraco derivado dessa versão e dos parâmetros da requisição; se o cliente
+reenviar o mesmo valor em If-None-Match, a resposta é 304 sem corpo, depois
+de uma única consulta pela chave primária e antes de qualquer agregação.
+
+A versão lida em uma requisição também compõe as chaves dos caches por
+usuário (app.cache, app.busca_incremental): como ela vem do banco, um commit
+feito em qualquer processo muda a chave em todos os outros.
+"""
+
+from app import db
+from app.models import Usuario
+from flask import g, has_request_context, request, session, make_response
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from datetime import datetime
+from functools import wraps
+import hashlib
+
+
+# ========== VERSÃO DOS DADOS ==========
+@event.listens_for(Session, 'before_commit')
+def _incrementar_versoes(session):
+    """Incrementar a versão dos usuários com alterações neste commit
+
+    As alterações são anotadas por app.eventos durante os flushes (e pelas
+    gravações em massa); o flush pendente é feito antes para incluí-las.
+    """
+    session.flush()
+    usuarios = {alteracao.usuario_id for alteracao in session.info.get('alteracoes', ())}
+    if usuarios:
+        session.execute(
+            Usuario.__table__.update()
+            .where(Usuario.__table__.c.id.in_(sorted(usuarios)))
+            .values(versao_dados=Usuario.__table__.c.versao_dados + 1)
+        )
+        if has_request_context():
+            # A versão guardada na requisição deixou de valer
+            for usuario_id in usuarios:
+                g.get('versoes_dados', {}).pop(usuario_id, None)
+
+
+def consulta_versao_dados(usuario_id):
+    """SELECT da versão atual dos dados do usuário"""
+    return select(Usuario.versao_dados).where(Usuario.id == usuario_id)
+
+
+def versao_dados(usuario_id):
+    """Versão atual dos dados do usuário"""
+    return db.session.execute(consulta_versao_dados(usuario_id)).scalar() or 0
+
+
+def versao_da_requisicao(usuario_id):
+    """Versão dos dados do usuário, lida uma vez por requisição
+
+    Compartilhada pelo ETag e pelas chaves dos caches. Fora de requisições
+    (comandos, workers) a versão é sempre lida do banco.
+    """
+    if not has_request_context():
+        return versao_dados(usuario_id)
+    versoes = g.setdefault('versoes_dados', {})
+    if usuario_id not in versoes:
+        versoes[usuario_id] = versao_dados(usuario_id)
+    return versoes[usuario_id]
+
+
+# ========== ETAG ==========
+def calcular_etag(usuario_id, versao, caminho, query_string, corpo=None):
+    """ETag a partir da versão dos dados e dos parâmetros da requisição
+
+    A data entra no cálculo porque as páginas mostram o mês corrente e os
+    alertas dependem do dia.
+    """
+    partes = [
+        str(usuario_id),
+        datetime.utcnow().strftime('%Y-%m-%d'),
+        caminho,
+        query_string,
+    ]
+    if corpo is not None:
+        partes.append(corpo)
+
+    resumo = hashlib.sha1('\n'.join(partes).encode('utf-8')).hexdigest()[:16]
+    return f'{versao}-{resumo}'
+
+
+def etag_da_requisicao(usuario_id):
+    """ETag da requisição atual: versão dos dados + parâmetros"""
+    return calcular_etag(
+        usuario_id,
+        versao_da_requisicao(usuario_id),
+        request.path,
+        request.query_string.decode('latin-1'),
+        request.get_data(as_text=True) if request.method == 'POST' else None
+    )
+
+
+def condicional(f):
+    """Responder 304 quando o If-None-Match corresponde à versão atual
+
+    Aplicar depois de login_required. Respostas com mensagens flash
+    pendentes não são condicionais, pois o conteúdo muda sem alterar dados.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if session.get('_flashes'):
+            return f(*args, **kwargs)
+
+        etag = etag_da_requisicao(session['usuario_id'])
+        if request.if_none_match.contains_weak(etag):
+            resposta = make_response('', 304)
+        else:
+            resposta = make_response(f(*args, **kwargs))
+            if resposta.status_code != 200:
+                return resposta
+
+        resposta.set_etag(etag, weak=True)
+        # Revalidar sempre: o ETag muda assim que os dados mudam
+        resposta.headers['Cache-Control'] = 'private, no-cache'
+        return resposta
+    return decorated_function
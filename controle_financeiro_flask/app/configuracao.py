@@ -0,0 +1,63 @@
+"""
+Perfis de configuração da aplicação
+create_app aplica o perfil escolhido (parâmetro perfil ou a variável de
+ambiente FINANCEIRO_PERFIL; padrão 'producao') e depois o dicionário config,
+que continua sobrescrevendo qualquer chave.
+
+Chaves próprias dos perfis:
+- MIGRAR_AO_INICIAR: aplicar as migrações pendentes na inicialização. Sem
+  ela, um banco em versão anterior à do código impede a inicialização (rode
+  `flask migrar` antes de iniciar os workers).
+- BLUEPRINTS_PREGUICOSOS: importar os módulos de rotas na primeira
+  requisição em vez de na criação da app (ver app/blueprints.py).
+- ALERTAS_NA_ESCRITA: recalcular os alertas de orçamento em segundo plano
+  após cada commit com alterações (ver app/alertas.py).
+"""
+
+import os
+
+
+# Banco padrão na raiz do projeto, fora do pacote
+BASEDIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+
+BASE = {
+    'SQLALCHEMY_DATABASE_URI': f'sqlite:///{os.path.join(BASEDIR, "controle_financeiro.db")}',
+    'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+    'SECRET_KEY': 'sua_chave_secreta_aqui_mude_em_producao',
+    'PERFIL_SQLITE': 'producao',  # ver app/perfil_sqlite.py
+    'MIGRAR_AO_INICIAR': True,
+    'BLUEPRINTS_PREGUICOSOS': True,
+    'ALERTAS_NA_ESCRITA': True
+}
+
+PERFIS_CONFIG = {
+    # python app.py: rotas importadas na inicialização para que erros apareçam logo
+    'desenvolvimento': {
+        'DEBUG': True,
+        'TEMPLATES_AUTO_RELOAD': True,
+        'BLUEPRINTS_PREGUICOSOS': False
+    },
+    # Testes e scripts de curta duração: banco em memória e hashes baratos
+    'teste': {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': 'sqlite://',
+        'PERFIL_SQLITE': 'padrao',
+        'SENHA_METODO': 'pbkdf2:sha256:1000',
+        'SQL_LIMITE_CONSULTA_LENTA_MS': None,
+        'ALERTAS_NA_ESCRITA': False
+    },
+    # Workers pré-fork: SECRET_KEY do ambiente
+    'producao': {
+        'SECRET_KEY': os.environ.get('SECRET_KEY', BASE['SECRET_KEY'])
+    }
+}
+
+PERFIL_PADRAO = 'producao'
+
+
+def configuracao_do_perfil(nome=None):
+    """Configuração base mais as chaves do perfil"""
+    nome = nome or os.environ.get('FINANCEIRO_PERFIL', PERFIL_PADRAO)
+    if nome not in PERFIS_CONFIG:
+        raise ValueError(f'Perfil de configuração desconhecido: {nome}')
+    return dict(BASE, PERFIL=nome, **PERFIS_CONFIG[nome])
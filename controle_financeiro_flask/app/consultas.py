@@ -0,0 +1,204 @@
+"""
+Consultas compartilhadas da busca de transações
+Monta o SELECT filtrado com o nome da categoria no mesmo JOIN e a paginação
+por cursor (keyset em data, id), sem carregar objetos ORM. A descrição é
+buscada no índice FTS5 transacoes_fts quando disponível, com LIKE como
+alternativa.
+"""
+
+from app import db
+from app.models import Transacao, Categoria
+from app.dinheiro import formatar_centavos
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import or_, and_
+import base64
+import re
+
+
+# Tamanho de página da busca
+LIMITE_PADRAO = 50
+LIMITE_MAXIMO = 200
+
+# Tabela virtual FTS5 sincronizada por gatilhos (ver migração 4)
+transacoes_fts = db.table('transacoes_fts', db.column('rowid'), db.column('rank'))
+
+
+# ========== FILTROS ==========
+def ler_filtros(dados):
+    """Normalizar os filtros recebidos (JSON ou query string)"""
+    filtros = {
+        'descricao': (dados.get('descricao') or '').strip(),
+        'categoria_id': None,
+        'tipo': dados.get('tipo') or '',  # 'receita', 'despesa' ou vazio
+        'data_inicio': None,
+        'data_fim': None,
+        'ordem': 'relevancia' if dados.get('ordem') == 'relevancia' else 'data'
+    }
+
+    try:
+        if dados.get('categoria_id'):
+            filtros['categoria_id'] = int(dados.get('categoria_id'))
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        if dados.get('data_inicio'):
+            filtros['data_inicio'] = datetime.strptime(dados.get('data_inicio'), '%Y-%m-%d')
+    except (TypeError, ValueError):
+        pass
+
+    try:
+        if dados.get('data_fim'):
+            # Adicionar 1 dia para incluir todo o dia
+            filtros['data_fim'] = datetime.strptime(dados.get('data_fim'), '%Y-%m-%d') + timedelta(days=1)
+    except (TypeError, ValueError):
+        pass
+
+    return filtros
+
+
+def ler_limite(dados):
+    """Obter o tamanho de página limitado a LIMITE_MAXIMO"""
+    try:
+        limite = int(dados.get('limite') or LIMITE_PADRAO)
+    except (TypeError, ValueError):
+        limite = LIMITE_PADRAO
+    return max(1, min(limite, LIMITE_MAXIMO))
+
+
+# ========== BUSCA TEXTUAL ==========
+def fts_disponivel():
+    """Verificar se o banco da aplicação possui o índice transacoes_fts"""
+    return current_app.extensions.get('fts_transacoes', False)
+
+
+def termos_fts(descricao):
+    """Converter o texto digitado em uma consulta FTS5 por prefixo
+
+    Cada palavra vira um termo com prefixo ("merc"*) e todos precisam
+    aparecer na descrição.
+    """
+    palavras = re.findall(r'\w+', descricao.lower())
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+
+def usa_relevancia(filtros):
+    """A ordenação por relevância só vale para buscas textuais via FTS5"""
+    return filtros['ordem'] == 'relevancia' and bool(termos_fts(filtros['descricao'])) and fts_disponivel()
+
+
+# ========== CONSULTA ==========
+def consulta_transacoes(usuario_id, filtros):
+    """SELECT das transações filtradas, mais recentes (ou mais relevantes) primeiro"""
+    stmt = db.select(
+        Transacao.id,
+        Transacao.descricao,
+        Transacao.valor_centavos,
+        Transacao.tipo,
+        Transacao.data,
+        Transacao.categoria_id,
+        Categoria.nome.label('categoria')
+    ).join(Categoria, Categoria.id == Transacao.categoria_id)
+
+    termos = termos_fts(filtros['descricao'])
+    if termos and fts_disponivel():
+        # Partir do índice textual e buscar as transações pelo rowid. O "+ 0"
+        # impede o planejador de preferir varrer todas as linhas do usuário
+        # pelo índice (usuario_id, data) e testar o MATCH linha a linha.
+        stmt = stmt.join(transacoes_fts, transacoes_fts.c.rowid == Transacao.id).where(
+            db.literal_column('transacoes_fts').op('MATCH')(termos),
+            Transacao.usuario_id + 0 == usuario_id
+        )
+    else:
+        stmt = stmt.where(Transacao.usuario_id == usuario_id)
+        if filtros['descricao']:
+            stmt = stmt.where(Transacao.descricao.ilike(f"%{filtros['descricao']}%"))
+
+    if filtros['categoria_id']:
+        stmt = stmt.where(Transacao.categoria_id == filtros['categoria_id'])
+
+    if filtros['tipo']:
+        stmt = stmt.where(Transacao.tipo == filtros['tipo'])
+
+    if filtros['data_inicio']:
+        stmt = stmt.where(Transacao.data >= filtros['data_inicio'])
+
+    if filtros['data_fim']:
+        stmt = stmt.where(Transacao.data < filtros['data_fim'])
+
+    if usa_relevancia(filtros):
+        return stmt.order_by(transacoes_fts.c.rank, Transacao.data.desc())
+
+    return stmt.order_by(Transacao.data.desc(), Transacao.id.desc())
+
+
+def consulta_categorias_sugeridas(usuario_id, limite=5):
+    """SELECT das categorias mais usadas nas transações do usuário"""
+    return db.select(
+        Categoria.id,
+        Categoria.nome,
+        db.func.count(Transacao.id).label('uso')
+    ).join(Transacao).where(
+        Categoria.usuario_id == usuario_id
+    ).group_by(Categoria.id).order_by(
+        db.func.count(Transacao.id).desc()
+    ).limit(limite)
+
+
+def aplicar_cursor(stmt, cursor):
+    """Continuar a busca após a última linha da página anterior"""
+    data, transacao_id = decodificar_cursor(cursor)
+    return stmt.where(or_(
+        Transacao.data < data,
+        and_(Transacao.data == data, Transacao.id < transacao_id)
+    ))
+
+
+# ========== CURSOR ==========
+def codificar_cursor(data, transacao_id):
+    """Gerar o cursor opaco a partir da última linha retornada"""
+    bruto = f'{data.isoformat()}|{transacao_id}'
+    return base64.urlsafe_b64encode(bruto.encode()).decode()
+
+
+def decodificar_cursor(cursor):
+    """Ler o cursor; levanta ValueError se estiver malformado"""
+    try:
+        data, transacao_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(data), int(transacao_id)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError('Cursor inválido')
+
+
+# ========== SERIALIZAÇÃO ==========
+def montar_pagina(linhas, limite, filtros):
+    """Resposta da busca a partir de até limite + 1 linhas da consulta"""
+    proximo_cursor = None
+    if usa_relevancia(filtros):
+        linhas = linhas[:limite]
+    elif len(linhas) > limite:
+        linhas = linhas[:limite]
+        proximo_cursor = codificar_cursor(linhas[-1].data, linhas[-1].id)
+
+    resultado = [serializar(linha) for linha in linhas]
+    return {
+        'sucesso': True,
+        'total': len(resultado),
+        'transacoes': resultado,
+        'proximo_cursor': proximo_cursor
+    }
+
+
+
+def serializar(linha):
+    """Converter uma linha da consulta no formato JSON da API"""
+    return {
+        'id': linha.id,
+        'descricao': linha.descricao,
+        'valor': formatar_centavos(linha.valor_centavos),
+        'categoria': linha.categoria,
+        'tipo': linha.tipo,
+        'data': linha.data.strftime('%d/%m/%Y'),
+        'data_iso': linha.data.strftime('%Y-%m-%d')
+    }
@@ -0,0 +1,26 @@
+"""
+Valores monetários em centavos inteiros
+Transações, limites de orçamento e somas de resumo_mensal são gravados em
+centavos (INTEGER), para que os totais sejam somados no SQL sem erro de
+arredondamento. Os modelos expõem os valores em reais por propriedades
+híbridas; estas funções fazem as conversões nos dois sentidos.
+"""
+
+from decimal import Decimal, ROUND_HALF_UP
+
+
+def para_centavos(valor):
+    """Converter reais (float, str ou Decimal) em centavos, arredondando 0,005 para cima"""
+    return int((Decimal(str(valor)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def de_centavos(centavos):
+    """Converter centavos em reais (float), para cálculos e templates"""
+    return centavos / 100
+
+
+def formatar_centavos(centavos):
+    """Texto com duas casas decimais ("1234.50") sem passar por float"""
+    sinal = '-' if centavos < 0 else ''
+    centavos = abs(centavos)
+    return f'{sinal}{centavos // 100}.{centavos % 100:02d}'
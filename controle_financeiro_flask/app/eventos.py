@@ -0,0 +1,79 @@
+"""
+Notificação das alterações confirmadas no banco
+Durante os flushes, as transações, categorias e orçamentos alterados são
+anotados na sessão como Alteracao(usuario_id, tabela, ano, mes). Depois do
+commit, os ouvintes registrados com @ao_confirmar recebem o conjunto de
+alterações (usado para invalidar caches); um rollback descarta as anotações.
+
+Gravações em massa que não passam pelo ORM (importação, lote) devem chamar
+registrar_alteracao diretamente.
+"""
+
+from app.models import Transacao, Categoria, Orcamento
+from collections import namedtuple
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+
+# ano/mes None: a alteração não se limita a um mês (ex.: renomear categoria)
+Alteracao = namedtuple('Alteracao', 'usuario_id tabela ano mes')
+
+_ouvintes = []
+
+
+def ao_confirmar(f):
+    """Registrar uma função chamada com o conjunto de alterações após cada commit"""
+    _ouvintes.append(f)
+    return f
+
+
+def registrar_alteracao(session, usuario_id, tabela, ano=None, mes=None):
+    """Anotar uma alteração a ser notificada no próximo commit da sessão"""
+    session.info.setdefault('alteracoes', set()).add(Alteracao(int(usuario_id), tabela, ano, mes))
+
+
+def _valores_anteriores(obj, campos):
+    """Valores antes da alteração, quando o histórico do atributo os conhece"""
+    estado = inspect(obj)
+    valores = []
+    for campo in campos:
+        historico = estado.attrs[campo].history
+        valores.append(historico.deleted[0] if historico.deleted else getattr(obj, campo))
+    return valores
+
+
+# ========== EVENTOS DE SESSÃO ==========
+@event.listens_for(Session, 'before_flush')
+def _anotar_alteracoes(session, flush_context, instances):
+    """Anotar os donos e períodos dos objetos que serão gravados
+
+    Os meses afetados das transações (antes e depois da alteração) são
+    anotados por app.agregados, que já calcula esses períodos.
+    """
+    alterados = list(session.new) + list(session.deleted) + [
+        obj for obj in session.dirty if session.is_modified(obj)
+    ]
+
+    for obj in alterados:
+        if isinstance(obj, Transacao):
+            registrar_alteracao(session, obj.usuario_id, 'transacoes')
+        elif isinstance(obj, Categoria):
+            registrar_alteracao(session, obj.usuario_id, 'categorias')
+        elif isinstance(obj, Orcamento):
+            registrar_alteracao(session, obj.usuario_id, 'orcamentos', obj.ano, obj.mes)
+            ano, mes = _valores_anteriores(obj, ('ano', 'mes'))
+            registrar_alteracao(session, obj.usuario_id, 'orcamentos', ano, mes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _notificar_ouvintes(session):
+    alteracoes = session.info.pop('alteracoes', None)
+    if not alteracoes:
+        return
+    for ouvinte in _ouvintes:
+        ouvinte(frozenset(alteracoes))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _descartar_alteracoes(session):
+    session.info.pop('alteracoes', None)
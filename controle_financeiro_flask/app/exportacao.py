@@ -0,0 +1,82 @@
+"""
+Exportação em streaming do histórico de transações (CSV e JSONL)
+As linhas vêm da mesma consulta da busca (consultas.consulta_transacoes),
+lidas do banco em blocos com yield_per, e o texto é enviado em pedaços de
+~64 KB: a memória não cresce com o tamanho do histórico e os primeiros bytes
+saem antes do fim da consulta.
+"""
+
+from app import db
+from app.consultas import serializar
+from app.dinheiro import formatar_centavos
+import csv
+import io
+import json
+
+
+# Linhas lidas do banco por vez
+LINHAS_POR_BLOCO = 1000
+
+# Tamanho aproximado de cada pedaço enviado ao cliente
+TAMANHO_PEDACO = 64 * 1024
+
+# Mesmas colunas aceitas pela importação de CSV (app/importacao.py)
+COLUNAS_CSV = ('data', 'descricao', 'valor', 'categoria', 'tipo', 'id')
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8'
+}
+
+
+def ler_em_blocos(stmt):
+    """Executar o SELECT lendo o resultado em blocos de LINHAS_POR_BLOCO"""
+    return db.session.execute(stmt.execution_options(yield_per=LINHAS_POR_BLOCO))
+
+
+def gerar_csv(linhas):
+    """Gerar o CSV (com cabeçalho) em pedaços de texto"""
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUNAS_CSV)
+
+    for linha in linhas:
+        escritor.writerow((
+            linha.data.strftime('%Y-%m-%d'),
+            linha.descricao,
+            formatar_centavos(linha.valor_centavos),
+            linha.categoria,
+            linha.tipo,
+            linha.id
+        ))
+        if buffer.tell() >= TAMANHO_PEDACO:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def gerar_jsonl(linhas):
+    """Gerar uma transação JSON por linha, no formato da API de busca"""
+    pedaco = []
+    tamanho = 0
+    for linha in linhas:
+        texto = json.dumps(serializar(linha), ensure_ascii=False) + '\n'
+        pedaco.append(texto)
+        tamanho += len(texto)
+        if tamanho >= TAMANHO_PEDACO:
+            yield ''.join(pedaco)
+            pedaco = []
+            tamanho = 0
+
+    if pedaco:
+        yield ''.join(pedaco)
+
+
+GERADORES = {'csv': gerar_csv, 'jsonl': gerar_jsonl}
+
+
+def exportar(stmt, formato):
+    """Gerador com o conteúdo exportado no formato pedido"""
+    return GERADORES[formato](ler_em_blocos(stmt))
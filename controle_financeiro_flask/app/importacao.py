@@ -0,0 +1,305 @@
+"""
+Importação em massa de extratos bancários (CSV e OFX)
+Os arquivos são lidos linha a linha (sem carregar o arquivo inteiro), as
+categorias do usuário ficam em um dicionário em memória e as transações
+válidas são gravadas com INSERTs em lote, com commit a cada bloco. As regras
+de validação são as mesmas dos formulários de nova receita/despesa
+(app/validacoes.py).
+"""
+
+from app import db
+from app.models import Transacao, Usuario
+from app.agregados import acumular, aplicar_deltas, registrar_periodos
+from app.cache import cache_categorias
+from app.dinheiro import para_centavos
+from app.validacoes import CAMPOS, validar_campo
+from datetime import datetime
+from flask.cli import with_appcontext
+import click
+import csv
+import html
+import io
+import re
+
+
+# Linhas gravadas por INSERT/commit
+TAMANHO_BLOCO = 5000
+
+# Erros detalhados devolvidos no resumo (os demais são apenas contados)
+MAXIMO_ERROS_DETALHADOS = 100
+
+# Datas aceitas: 2025-01-31, 31/01/2025, 31/01/25 e 20250131[hhmmss...] (OFX)
+DATA_ISO = re.compile(r'^(\d{4})-(\d{2})-(\d{2})')
+DATA_BR = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4}|\d{2})$')
+DATA_OFX = re.compile(r'^(\d{4})(\d{2})(\d{2})')
+
+
+class ErroLinha(ValueError):
+    """Linha do extrato rejeitada pela validação"""
+
+
+# ========== CONVERSÕES ==========
+def converter_valor(texto):
+    """Converter "1.234,56", "1,234.56", "-45.90" ou "R$ 10,00" em float"""
+    texto = (texto or '').strip().replace('R$', '').replace(' ', '')
+    if ',' in texto and '.' in texto:
+        # O último separador é o decimal
+        if texto.rfind(',') > texto.rfind('.'):
+            texto = texto.replace('.', '').replace(',', '.')
+        else:
+            texto = texto.replace(',', '')
+    else:
+        texto = texto.replace(',', '.')
+    return float(texto)
+
+
+def converter_data(texto):
+    """Converter a data do extrato; datas OFX (AAAAMMDD[hhmmss]) também são aceitas
+
+    Expressões regulares em vez de strptime: a conversão roda uma vez por
+    linha e strptime é o passo mais caro da validação.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return None
+
+    iso = DATA_ISO.match(texto) or DATA_OFX.match(texto)
+    if iso:
+        ano, mes, dia = iso.groups()
+    else:
+        brasileira = DATA_BR.match(texto)
+        if not brasileira:
+            raise ErroLinha(f'Data inválida: {texto}')
+        dia, mes, ano = brasileira.groups()
+        if len(ano) == 2:
+            ano = '20' + ano
+
+    try:
+        return datetime(int(ano), int(mes), int(dia))
+    except ValueError:
+        raise ErroLinha(f'Data inválida: {texto}')
+
+
+# ========== LEITORES ==========
+def ler_csv(arquivo):
+    """Gerar (numero_linha, campos) de um CSV com cabeçalho
+
+    Colunas reconhecidas: data, descricao, valor, categoria e tipo
+    (receita/despesa). Sem a coluna tipo, valores negativos são despesas.
+    O separador (vírgula ou ponto e vírgula) é detectado no cabeçalho.
+    """
+    cabecalho = arquivo.readline()
+    separador = ';' if cabecalho.count(';') > cabecalho.count(',') else ','
+    colunas = [c.strip().lower() for c in next(csv.reader([cabecalho], delimiter=separador))]
+
+    leitor = csv.DictReader(arquivo, fieldnames=colunas, delimiter=separador)
+    for numero, linha in enumerate(leitor, start=2):
+        yield numero, {
+            'descricao': linha.get('descricao') or linha.get('descrição') or '',
+            'valor': linha.get('valor') or '',
+            'data': linha.get('data') or '',
+            'categoria': linha.get('categoria') or '',
+            'tipo': (linha.get('tipo') or '').strip().lower()
+        }
+
+
+def _tokens_ofx(arquivo, tamanho=65536):
+    """Gerar (tag, texto) do OFX lido em blocos; funciona em SGML e XML"""
+    resto = ''
+    while True:
+        bloco = arquivo.read(tamanho)
+        resto += bloco
+        partes = resto.split('<')
+        # A última parte pode estar incompleta, exceto no fim do arquivo
+        resto = partes.pop() if bloco else ''
+        for parte in partes:
+            if '>' in parte:
+                tag, texto = parte.split('>', 1)
+                yield tag.strip().upper(), html.unescape(texto.strip())
+        if not bloco:
+            if '>' in resto:
+                tag, texto = resto.split('>', 1)
+                yield tag.strip().upper(), html.unescape(texto.strip())
+            return
+
+
+def ler_ofx(arquivo):
+    """Gerar (numero_transacao, campos) de cada <STMTTRN> de um OFX"""
+    numero = 0
+    atual = None
+    for tag, texto in _tokens_ofx(arquivo):
+        if tag == 'STMTTRN':
+            atual = {}
+        elif tag == '/STMTTRN' and atual is not None:
+            numero += 1
+            valor = atual.get('TRNAMT', '')
+            yield numero, {
+                'descricao': atual.get('MEMO') or atual.get('NAME') or '',
+                'valor': valor,
+                'data': atual.get('DTPOSTED', ''),
+                'categoria': '',
+                'tipo': 'despesa' if valor.strip().startswith('-') or atual.get('TRNTYPE') == 'DEBIT' else 'receita'
+            }
+            atual = None
+        elif atual is not None and not tag.startswith('/'):
+            atual[tag] = texto
+
+
+LEITORES = {'csv': ler_csv, 'ofx': ler_ofx}
+
+
+def detectar_formato(nome_arquivo):
+    """Formato pelo nome do arquivo (csv como padrão)"""
+    return 'ofx' if (nome_arquivo or '').lower().endswith(('.ofx', '.qfx')) else 'csv'
+
+
+# ========== VALIDAÇÃO ==========
+def validar_linha(campos, categorias, categoria_padrao_id, hoje):
+    """Aplicar as regras dos formulários e montar a linha de transacoes
+
+    Descrição e valor passam pelo esquema de app/validacoes.py depois de o
+    valor do extrato ser convertido e de o sinal definir o tipo.
+    categorias: {nome em minúsculas: id} das categorias do usuário
+    """
+    descricao, erros = validar_campo('descricao', campos['descricao'])
+    if erros:
+        raise ErroLinha(erros[0] + '.')
+
+    texto_valor = campos['valor'].strip()
+    valor = 0.0
+    if texto_valor:
+        try:
+            valor = converter_valor(texto_valor)
+        except ValueError:
+            raise ErroLinha(CAMPOS['valor']['mensagem_tipo'] + '.')
+
+    tipo = campos['tipo']
+    if tipo not in ('receita', 'despesa'):
+        tipo = 'despesa' if valor < 0 else 'receita'
+
+    valor, erros = validar_campo('valor', repr(abs(valor)) if texto_valor else '')
+    if erros:
+        raise ErroLinha(erros[0] + '.')
+
+    nome_categoria = campos['categoria'].strip().lower()
+    if nome_categoria:
+        categoria_id = categorias.get(nome_categoria)
+    else:
+        categoria_id = categoria_padrao_id
+    if categoria_id is None:
+        raise ErroLinha('Categoria inválida.')
+
+    return {
+        'descricao': descricao,
+        'valor_centavos': para_centavos(valor),
+        'data': converter_data(campos['data']) or hoje,
+        'tipo': tipo,
+        'categoria_id': categoria_id
+    }
+
+
+# ========== IMPORTAÇÃO ==========
+def _gravar_bloco(usuario_id, linhas):
+    """Inserir um bloco, atualizar resumo_mensal e confirmar"""
+    for linha in linhas:
+        linha['usuario_id'] = usuario_id
+
+    # INSERT em lote não passa pelos eventos do ORM: somar os agregados aqui
+    deltas = {}
+    for linha in linhas:
+        acumular(deltas, usuario_id, linha['categoria_id'], linha['data'], linha['tipo'], linha['valor_centavos'], 1)
+
+    conexao = db.session.connection()
+    conexao.execute(Transacao.__table__.insert(), linhas)
+    aplicar_deltas(conexao, deltas)
+    registrar_periodos(db.session, deltas)
+    db.session.commit()
+
+
+def mapa_categorias(usuario_id):
+    """Categorias do usuário como {nome em minúsculas: id}"""
+    return {
+        nome.strip().lower(): categoria_id
+        for categoria_id, nome in cache_categorias().mapa(usuario_id).items()
+    }
+
+
+def importar(usuario_id, arquivo, formato='csv', categoria_padrao_id=None, tamanho_bloco=TAMANHO_BLOCO):
+    """Importar um extrato (arquivo de texto) para o usuário
+
+    Linhas inválidas são ignoradas e relatadas. Retorna um dicionário com
+    as quantidades importadas e rejeitadas, os primeiros erros e, se a
+    leitura parou no meio (codificação errada), a mensagem em 'interrompida'.
+    Os blocos gravados antes da interrupção permanecem no banco.
+    """
+    if formato not in LEITORES:
+        raise ValueError(f'Formato não suportado: {formato}')
+
+    categorias = mapa_categorias(usuario_id)
+    if categoria_padrao_id is not None and categoria_padrao_id not in categorias.values():
+        raise ValueError('Categoria inválida.')
+
+    hoje = datetime.utcnow()
+    importadas = 0
+    rejeitadas = 0
+    erros = []
+    interrompida = None
+    bloco = []
+
+    try:
+        for numero, campos in LEITORES[formato](arquivo):
+            try:
+                bloco.append(validar_linha(campos, categorias, categoria_padrao_id, hoje))
+            except ErroLinha as erro:
+                rejeitadas += 1
+                if len(erros) < MAXIMO_ERROS_DETALHADOS:
+                    erros.append({'linha': numero, 'erro': str(erro)})
+                continue
+
+            if len(bloco) >= tamanho_bloco:
+                _gravar_bloco(usuario_id, bloco)
+                importadas += len(bloco)
+                bloco = []
+    except UnicodeDecodeError:
+        interrompida = f'O arquivo não está na codificação {arquivo.encoding}.'
+
+    if bloco:
+        _gravar_bloco(usuario_id, bloco)
+        importadas += len(bloco)
+
+    return {'importadas': importadas, 'rejeitadas': rejeitadas, 'erros': erros, 'interrompida': interrompida}
+
+
+def abrir_texto(binario, codificacao='utf-8-sig'):
+    """Envolver um arquivo binário para leitura de texto em streaming"""
+    return io.TextIOWrapper(binario, encoding=codificacao, newline='')
+
+
+# ========== COMANDO FLASK ==========
+@click.command('importar-transacoes')
+@click.argument('caminho', type=click.Path(exists=True, dir_okay=False))
+@click.option('--email', required=True, help='Email do usuário dono das transações.')
+@click.option('--formato', type=click.Choice(['csv', 'ofx']), default=None, help='Padrão: pela extensão do arquivo.')
+@click.option('--categoria', default=None, help='Categoria para linhas sem categoria (obrigatória para OFX).')
+@click.option('--codificacao', default='utf-8-sig', show_default=True)
+@with_appcontext
+def importar_transacoes_command(caminho, email, formato, categoria, codificacao):
+    """Importar receitas e despesas de um extrato CSV ou OFX"""
+    usuario = Usuario.query.filter_by(email=email.strip().lower()).first()
+    if not usuario:
+        raise click.ClickException(f'Usuário não encontrado: {email}')
+
+    categoria_padrao_id = None
+    if categoria:
+        categoria_padrao_id = mapa_categorias(usuario.id).get(categoria.strip().lower())
+        if categoria_padrao_id is None:
+            raise click.ClickException(f'Categoria não encontrada: {categoria}')
+
+    with open(caminho, encoding=codificacao, newline='') as arquivo:
+        resultado = importar(usuario.id, arquivo, formato or detectar_formato(caminho), categoria_padrao_id)
+
+    click.echo(f"{resultado['importadas']} transações importadas, {resultado['rejeitadas']} rejeitadas.")
+    for erro in resultado['erros']:
+        click.echo(f"  linha {erro['linha']}: {erro['erro']}")
+    if resultado['interrompida']:
+        raise click.ClickException(resultado['interrompida'])
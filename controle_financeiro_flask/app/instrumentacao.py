@@ -0,0 +1,185 @@
+"""
+Instrumentação de requisições e consultas SQL
+Conta as consultas e o tempo de banco de cada requisição pelos eventos do
+engine, devolve os valores no cabeçalho Server-Timing, registra no log as
+consultas lentas com o endpoint de origem e expõe histogramas de latência e
+contadores por endpoint em /metrics, no formato texto do Prometheus.
+
+As métricas ficam na memória do processo: com vários workers, cada um expõe
+os próprios valores.
+"""
+
+from app import db
+from flask import current_app, g, has_request_context, request, Response
+from sqlalchemy import event
+import threading
+import time
+
+
+# Limites (em segundos) dos baldes do histograma de latência
+BALDES_LATENCIA = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Consultas mais lentas que isto (ms) são registradas no log
+LIMITE_CONSULTA_LENTA_MS = 100
+
+
+# ========== MÉTRICAS ==========
+class Metricas:
+    """Histogramas e contadores por endpoint, protegidos por lock"""
+
+    def __init__(self, baldes=BALDES_LATENCIA):
+        self.baldes = baldes
+        self._lock = threading.Lock()
+        self._latencias = {}  # endpoint -> [contagens por balde, soma, total]
+        self._requisicoes = {}  # (endpoint, metodo, status) -> total
+        self._consultas = {}  # endpoint -> [consultas, segundos de banco]
+        self._coletores = []  # funções que retornam linhas extras
+
+    def adicionar_coletor(self, coletor):
+        """Incluir na exportação as linhas geradas por coletor()"""
+        self._coletores.append(coletor)
+
+    def registrar(self, endpoint, metodo, status, duracao, consultas, tempo_db):
+        """Registrar uma requisição concluída"""
+        with self._lock:
+            histograma = self._latencias.setdefault(endpoint, [[0] * len(self.baldes), 0.0, 0])
+            for i, limite in enumerate(self.baldes):
+                if duracao <= limite:
+                    histograma[0][i] += 1
+            histograma[1] += duracao
+            histograma[2] += 1
+
+            chave = (endpoint, metodo, status)
+            self._requisicoes[chave] = self._requisicoes.get(chave, 0) + 1
+
+            totais = self._consultas.setdefault(endpoint, [0, 0.0])
+            totais[0] += consultas
+            totais[1] += tempo_db
+
+    def exportar(self):
+        """Gerar o texto no formato de exposição do Prometheus"""
+        with self._lock:
+            linhas = [
+                '# HELP financeiro_requisicao_duracao_segundos Latência das requisições por endpoint.',
+                '# TYPE financeiro_requisicao_duracao_segundos histogram'
+            ]
+            for endpoint, (contagens, soma, total) in sorted(self._latencias.items()):
+                rotulo = f'endpoint="{_escapar(endpoint)}"'
+                for limite, contagem in zip(self.baldes, contagens):
+                    linhas.append(f'financeiro_requisicao_duracao_segundos_bucket{{{rotulo},le="{limite}"}} {contagem}')
+                linhas.append(f'financeiro_requisicao_duracao_segundos_bucket{{{rotulo},le="+Inf"}} {total}')
+                linhas.append(f'financeiro_requisicao_duracao_segundos_sum{{{rotulo}}} {soma:.6f}')
+                linhas.append(f'financeiro_requisicao_duracao_segundos_count{{{rotulo}}} {total}')
+
+            linhas += [
+                '# HELP financeiro_requisicoes_total Requisições atendidas por endpoint, método e status.',
+                '# TYPE financeiro_requisicoes_total counter'
+            ]
+            for (endpoint, metodo, status), total in sorted(self._requisicoes.items()):
+                linhas.append(
+                    f'financeiro_requisicoes_total{{endpoint="{_escapar(endpoint)}",metodo="{metodo}",status="{status}"}} {total}'
+                )
+
+            linhas += [
+                '# HELP financeiro_sql_consultas_total Consultas SQL executadas por endpoint.',
+                '# TYPE financeiro_sql_consultas_total counter'
+            ]
+            for endpoint, (consultas, _) in sorted(self._consultas.items()):
+                linhas.append(f'financeiro_sql_consultas_total{{endpoint="{_escapar(endpoint)}"}} {consultas}')
+
+            linhas += [
+                '# HELP financeiro_sql_duracao_segundos_total Tempo gasto em consultas SQL por endpoint.',
+                '# TYPE financeiro_sql_duracao_segundos_total counter'
+            ]
+            for endpoint, (_, tempo_db) in sorted(self._consultas.items()):
+                linhas.append(f'financeiro_sql_duracao_segundos_total{{endpoint="{_escapar(endpoint)}"}} {tempo_db:.6f}')
+
+        for coletor in self._coletores:
+            linhas += coletor()
+
+        return '\n'.join(linhas) + '\n'
+
+
+def _escapar(valor):
+    """Escapar um valor de rótulo do Prometheus"""
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# ========== EVENTOS DO ENGINE ==========
+def instrumentar_engine(engine):
+    """Medir cada consulta executada pelo engine"""
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('inicio_consultas', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _depois(conn, cursor, statement, parameters, context, executemany):
+        inicios = conn.info.get('inicio_consultas')
+        if not inicios:
+            return
+        duracao = time.perf_counter() - inicios.pop()
+
+        if not has_request_context():
+            return
+
+        g.sql_consultas = g.get('sql_consultas', 0) + 1
+        g.sql_tempo = g.get('sql_tempo', 0.0) + duracao
+
+        limite = current_app.config.get('SQL_LIMITE_CONSULTA_LENTA_MS', LIMITE_CONSULTA_LENTA_MS)
+        if limite is not None and duracao * 1000 >= limite:
+            current_app.logger.warning(
+                'Consulta lenta (%.1f ms) em %s: %s',
+                duracao * 1000, request.endpoint, ' '.join(statement.split())[:500]
+            )
+
+
+# ========== REQUISIÇÕES ==========
+def _iniciar_requisicao():
+    g.inicio_requisicao = time.perf_counter()
+    g.sql_consultas = 0
+    g.sql_tempo = 0.0
+
+
+def _finalizar_requisicao(resposta):
+    inicio = g.get('inicio_requisicao')
+    if inicio is None:
+        return resposta
+
+    duracao = time.perf_counter() - inicio
+    consultas = g.get('sql_consultas', 0)
+    tempo_db = g.get('sql_tempo', 0.0)
+
+    resposta.headers.add(
+        'Server-Timing',
+        f'db;dur={tempo_db * 1000:.2f};desc="{consultas} consultas", app;dur={duracao * 1000:.2f}'
+    )
+
+    endpoint = request.endpoint or 'desconhecido'
+    if endpoint != 'metricas':
+        current_app.extensions['metricas'].registrar(
+            endpoint, request.method, resposta.status_code, duracao, consultas, tempo_db
+        )
+    return resposta
+
+
+def metricas():
+    """Expor as métricas no formato texto do Prometheus"""
+    return Response(
+        current_app.extensions['metricas'].exportar(),
+        mimetype='text/plain; version=0.0.4'
+    )
+
+
+def init_instrumentacao(app):
+    """Ligar a instrumentação aos eventos do engine e às requisições da app"""
+    app.extensions['metricas'] = Metricas()
+
+    with app.app_context():
+        instrumentar_engine(db.engine)
+
+    app.before_request(_iniciar_requisicao)
+    app.after_request(_finalizar_requisicao)
+
+    if app.config.get('METRICAS_HABILITADAS', True):
+        app.add_url_rule('/metrics', 'metricas', metricas)
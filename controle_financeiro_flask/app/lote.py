@@ -0,0 +1,242 @@
+"""
+Gravação de transações em lote (sincronização do app e lançamentos por script)
+Um lote é uma lista de operações de criação, alteração e exclusão. Todas são
+validadas em uma passagem (regras de app/validacoes.py); as categorias vêm do cache de categorias (com uma
+consulta IN para as que ele ainda não conhece) e as transações alteradas ou
+excluídas são carregadas com uma única consulta IN, que também verifica o
+dono. As operações válidas são gravadas com um INSERT, um UPDATE e um DELETE
+em lote, resumo_mensal é ajustado pelas diferenças e tudo é confirmado em
+um único commit.
+
+Formato de cada operação:
+    {"op": "criar", "tipo": "despesa", "descricao": "...", "valor": "12.50",
+     "categoria_id": 3, "data": "2025-01-31"}
+    {"op": "alterar", "id": 10, ...campos a alterar (descricao, valor, categoria_id, data)}
+    {"op": "excluir", "id": 10}
+"""
+
+from app import db
+from app.models import Transacao, Categoria
+from app.agregados import acumular, aplicar_deltas, registrar_periodos
+from app.cache import cache_categorias
+from app.dinheiro import para_centavos
+from app.validacoes import validar_campo
+from datetime import datetime
+from sqlalchemy import bindparam
+
+
+# Operações aceitas por requisição
+MAXIMO_OPERACOES = 500
+
+OPERACOES = ('criar', 'alterar', 'excluir')
+
+# Campos gravados por criar/alterar (além de usuario_id e tipo)
+CAMPOS_EDITAVEIS = ('descricao', 'valor_centavos', 'categoria_id', 'data')
+
+
+class ErroOperacao(ValueError):
+    """Operação do lote rejeitada pela validação"""
+
+
+# ========== VALIDAÇÃO ==========
+def _inteiro(valor, mensagem):
+    if isinstance(valor, bool):
+        raise ErroOperacao(mensagem)
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        raise ErroOperacao(mensagem)
+
+
+def validar_operacao(operacao, hoje):
+    """Normalizar uma operação (sem consultar o banco)
+
+    Retorna {'op', 'id', 'tipo', 'campos'}, com campos em centavos e datas
+    já convertidas; na alteração, apenas os campos enviados.
+    """
+    if not isinstance(operacao, dict):
+        raise ErroOperacao('Operação inválida.')
+
+    op = operacao.get('op')
+    if op not in OPERACOES:
+        raise ErroOperacao('Operação inválida (use criar, alterar ou excluir).')
+
+    normalizada = {'op': op, 'id': None, 'tipo': None, 'campos': {}}
+    if op != 'criar':
+        normalizada['id'] = _inteiro(operacao.get('id'), 'Informe o id da transação.')
+    if op == 'excluir':
+        return normalizada
+
+    if op == 'criar':
+        faltando = [campo for campo in ('descricao', 'valor', 'categoria_id') if not operacao.get(campo)]
+        if faltando:
+            raise ErroOperacao('Todos os campos são obrigatórios.')
+        if operacao.get('tipo') not in ('receita', 'despesa'):
+            raise ErroOperacao('Tipo inválido (use receita ou despesa).')
+        normalizada['tipo'] = operacao['tipo']
+
+    campos = normalizada['campos']
+    if 'descricao' in operacao:
+        if not isinstance(operacao['descricao'], str):
+            raise ErroOperacao('Descrição inválida.')
+        descricao, erros = validar_campo('descricao', operacao['descricao'])
+        if erros:
+            raise ErroOperacao(erros[0] + '.')
+        campos['descricao'] = descricao
+
+    if 'valor' in operacao:
+        valor, erros = validar_campo('valor', operacao['valor'])
+        if erros:
+            raise ErroOperacao(erros[0] + '.')
+        campos['valor_centavos'] = para_centavos(valor)
+
+    if 'categoria_id' in operacao:
+        campos['categoria_id'] = _inteiro(operacao['categoria_id'], 'Categoria inválida.')
+
+    if 'data' in operacao:
+        data, erros = validar_campo('data', operacao['data'])
+        if erros:
+            raise ErroOperacao(erros[0] + '.')
+        campos['data'] = data or hoje
+    elif op == 'criar':
+        campos['data'] = hoje
+
+    if op == 'alterar' and not campos:
+        raise ErroOperacao('Nenhum campo para alterar.')
+    return normalizada
+
+
+# ========== CONSULTAS EM LOTE ==========
+def categorias_do_usuario(usuario_id, categoria_ids):
+    """Subconjunto de categoria_ids que pertence ao usuário
+
+    As que o cache não conhece (criadas por outro processo) são conferidas
+    com uma consulta IN.
+    """
+    conhecidas = cache_categorias().mapa(usuario_id)
+    validas = {categoria_id for categoria_id in categoria_ids if categoria_id in conhecidas}
+
+    desconhecidas = set(categoria_ids) - validas
+    if desconhecidas:
+        novas = set(db.session.execute(
+            db.select(Categoria.id).where(Categoria.usuario_id == usuario_id, Categoria.id.in_(desconhecidas))
+        ).scalars())
+        if novas:
+            cache_categorias().invalidar(usuario_id)
+            validas |= novas
+    return validas
+
+
+def transacoes_do_usuario(usuario_id, transacao_ids):
+    """{id: linha} das transações do usuário, com os campos agregados atuais"""
+    if not transacao_ids:
+        return {}
+    tabela = Transacao.__table__
+    linhas = db.session.execute(
+        db.select(tabela.c.id, tabela.c.tipo, *(tabela.c[campo] for campo in CAMPOS_EDITAVEIS))
+        .where(tabela.c.usuario_id == usuario_id, tabela.c.id.in_(transacao_ids))
+    ).all()
+    return {linha.id: linha for linha in linhas}
+
+
+# ========== GRAVAÇÃO ==========
+def gravar_lote(usuario_id, operacoes, atomico=False, hoje=None):
+    """Validar e aplicar as operações com um commit
+
+    Retorna {'aplicadas', 'rejeitadas', 'resultados'}; cada resultado traz o
+    índice da operação, 'sucesso' e o 'id' da transação ou o 'erro'. Com
+    atomico=True, nada é gravado se alguma operação for rejeitada.
+    """
+    if len(operacoes) > MAXIMO_OPERACOES:
+        raise ValueError(f'No máximo {MAXIMO_OPERACOES} operações por lote.')
+
+    hoje = hoje or datetime.utcnow()
+    resultados = [None] * len(operacoes)
+    validas = {}
+
+    def rejeitar(indice, erro):
+        resultados[indice] = {'indice': indice, 'sucesso': False, 'erro': erro}
+
+    for indice, operacao in enumerate(operacoes):
+        try:
+            validas[indice] = validar_operacao(operacao, hoje)
+        except ErroOperacao as erro:
+            rejeitar(indice, str(erro))
+
+    # Uma verificação para todas as categorias e uma consulta para todas as transações
+    categorias = categorias_do_usuario(usuario_id, {
+        v['campos']['categoria_id'] for v in validas.values() if 'categoria_id' in v['campos']
+    })
+    existentes = transacoes_do_usuario(usuario_id, {v['id'] for v in validas.values() if v['id'] is not None})
+
+    alteradas = set()
+    for indice, validada in list(validas.items()):
+        erro = None
+        if validada['id'] is not None:
+            if validada['id'] not in existentes:
+                erro = 'Transação não encontrada.'
+            elif validada['id'] in alteradas:
+                erro = 'A transação aparece mais de uma vez no lote.'
+            alteradas.add(validada['id'])
+        categoria_id = validada['campos'].get('categoria_id')
+        if erro is None and categoria_id is not None and categoria_id not in categorias:
+            erro = 'Categoria inválida.'
+        if erro:
+            rejeitar(indice, erro)
+            del validas[indice]
+
+    rejeitadas = len(operacoes) - len(validas)
+    if not validas or (atomico and rejeitadas):
+        for indice in validas:
+            resultados[indice] = {'indice': indice, 'sucesso': False, 'erro': 'Lote não aplicado.'}
+        return {'aplicadas': 0, 'rejeitadas': len(operacoes), 'resultados': resultados}
+
+    # Gravação em massa sem os eventos do ORM: somar os agregados aqui
+    deltas = {}
+    novas, alteracoes, exclusoes = [], [], []
+    for indice, validada in validas.items():
+        if validada['op'] == 'criar':
+            linha = dict(validada['campos'], usuario_id=usuario_id, tipo=validada['tipo'])
+            acumular(deltas, usuario_id, linha['categoria_id'], linha['data'], linha['tipo'], linha['valor_centavos'], 1)
+            novas.append((indice, linha))
+            continue
+
+        anterior = existentes[validada['id']]
+        acumular(deltas, usuario_id, anterior.categoria_id, anterior.data, anterior.tipo, -anterior.valor_centavos, -1)
+        if validada['op'] == 'excluir':
+            exclusoes.append(validada['id'])
+        else:
+            linha = {campo: validada['campos'].get(campo, getattr(anterior, campo)) for campo in CAMPOS_EDITAVEIS}
+            acumular(deltas, usuario_id, linha['categoria_id'], linha['data'], anterior.tipo, linha['valor_centavos'], 1)
+            alteracoes.append(dict(linha, id_alterado=validada['id']))
+        resultados[indice] = {'indice': indice, 'sucesso': True, 'id': validada['id']}
+
+    tabela = Transacao.__table__
+    conexao = db.session.connection()
+    if novas:
+        # Um único INSERT; o SQLite não garante a ordem do RETURNING, então os
+        # ids voltam às operações pelo conteúdo (linhas iguais são intercambiáveis)
+        colunas = ('tipo',) + CAMPOS_EDITAVEIS
+        pendentes = {}
+        for indice, linha in novas:
+            pendentes.setdefault(tuple(linha[c] for c in colunas), []).append(indice)
+        inseridas = conexao.execute(
+            tabela.insert().returning(tabela.c.id, *(tabela.c[c] for c in colunas)),
+            [linha for _, linha in novas]
+        ).all()
+        for transacao_id, *valores in inseridas:
+            indice = pendentes[tuple(valores)].pop()
+            resultados[indice] = {'indice': indice, 'sucesso': True, 'id': transacao_id}
+    if alteracoes:
+        conexao.execute(
+            tabela.update().where(tabela.c.id == bindparam('id_alterado')),
+            alteracoes
+        )
+    if exclusoes:
+        conexao.execute(tabela.delete().where(tabela.c.id.in_(exclusoes)))
+
+    aplicar_deltas(conexao, deltas)
+    registrar_periodos(db.session, deltas)
+    db.session.commit()
+
+    return {'aplicadas': len(validas), 'rejeitadas': rejeitadas, 'resultados': resultados}
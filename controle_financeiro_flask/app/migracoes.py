@@ -0,0 +1,236 @@
+"""
+Versionamento e migração do esquema do banco de dados
+A versão aplicada fica gravada em PRAGMA user_version do arquivo SQLite.
+Na inicialização, apenas as migrações com versão maior que a gravada são
+executadas, em ordem. Cada migração deve ser idempotente, pois bancos novos e
+bancos antigos (versão 0) passam pelas mesmas etapas.
+"""
+
+from app import db
+from flask.cli import with_appcontext
+from sqlalchemy.exc import OperationalError
+import click
+
+
+# Lista ordenada de (versao, descricao, funcao)
+MIGRACOES = []
+
+
+def migracao(versao, descricao):
+    """Registrar uma função como migração do esquema"""
+    def decorator(f):
+        MIGRACOES.append((versao, descricao, f))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return f
+    return decorator
+
+
+def colunas_da_tabela(conn, tabela):
+    """Nomes das colunas de uma tabela no banco"""
+    return {linha[1] for linha in conn.exec_driver_sql(f'PRAGMA table_info({tabela})')}
+
+
+# ========== MIGRAÇÕES ==========
+@migracao(1, 'Esquema inicial')
+def _esquema_inicial(conn):
+    """Criar as tabelas que ainda não existem"""
+    db.metadata.create_all(conn, checkfirst=True)
+
+
+@migracao(2, 'Preencher resumo_mensal a partir das transações')
+def _preencher_resumo_mensal(conn):
+    """Recalcular os agregados mensais de bancos anteriores à tabela"""
+    from app.agregados import comandos_reconstrucao
+
+    # Bancos com valores em reais: a migração 6 converte e recalcula
+    if 'valor_centavos' not in colunas_da_tabela(conn, 'transacoes'):
+        return
+
+    remover, inserir = comandos_reconstrucao()
+    conn.execute(remover)
+    conn.execute(inserir)
+
+
+@migracao(3, 'Índices compostos de transacoes, orcamentos e resumo_mensal')
+def _indices_compostos(conn):
+    """Criar os índices declarados nos modelos que ainda não existem"""
+    from app.models import Transacao, Orcamento, ResumoMensal
+
+    for tabela in (Transacao.__table__, Orcamento.__table__, ResumoMensal.__table__):
+        colunas = colunas_da_tabela(conn, tabela.name)
+        for indice in tabela.indexes:
+            # Índices sobre colunas ainda não migradas são criados pela migração 6
+            if all(coluna.name in colunas for coluna in indice.columns):
+                indice.create(conn, checkfirst=True)
+
+
+@migracao(4, 'Índice textual FTS5 das descrições de transações')
+def _indice_textual(conn):
+    """Criar transacoes_fts e os gatilhos que a mantêm sincronizada
+
+    Se o SQLite não tiver FTS5, a migração não faz nada e a busca continua
+    usando LIKE.
+    """
+    try:
+        conn.exec_driver_sql(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS transacoes_fts USING fts5("
+            "descricao, content='transacoes', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')"
+        )
+    except OperationalError:
+        return
+
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS transacoes_fts_ai AFTER INSERT ON transacoes BEGIN "
+        "INSERT INTO transacoes_fts(rowid, descricao) VALUES (new.id, new.descricao); "
+        "END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS transacoes_fts_ad AFTER DELETE ON transacoes BEGIN "
+        "INSERT INTO transacoes_fts(transacoes_fts, rowid, descricao) VALUES ('delete', old.id, old.descricao); "
+        "END"
+    )
+    conn.exec_driver_sql(
+        "CREATE TRIGGER IF NOT EXISTS transacoes_fts_au AFTER UPDATE OF descricao ON transacoes BEGIN "
+        "INSERT INTO transacoes_fts(transacoes_fts, rowid, descricao) VALUES ('delete', old.id, old.descricao); "
+        "INSERT INTO transacoes_fts(rowid, descricao) VALUES (new.id, new.descricao); "
+        "END"
+    )
+
+    # Indexar as transações já existentes
+    conn.exec_driver_sql("INSERT INTO transacoes_fts(transacoes_fts) VALUES ('rebuild')")
+
+
+@migracao(5, 'Versão dos dados de cada usuário (ETags)')
+def _versao_dados(conn):
+    """Adicionar usuarios.versao_dados aos bancos criados antes da coluna"""
+    if 'versao_dados' not in colunas_da_tabela(conn, 'usuarios'):
+        conn.exec_driver_sql('ALTER TABLE usuarios ADD COLUMN versao_dados INTEGER NOT NULL DEFAULT 0')
+
+
+@migracao(6, 'Valores monetários em centavos inteiros')
+def _valores_em_centavos(conn):
+    """Converter transacoes.valor, orcamentos.limite e resumo_mensal.soma em centavos
+
+    A coluna em reais é substituída pela coluna inteira (DROP COLUMN exige
+    SQLite 3.35+); os índices que a usavam são recriados pelos modelos e
+    resumo_mensal é recalculado com somas exatas.
+    """
+    from app.agregados import comandos_reconstrucao
+    from app.models import Transacao
+
+    for tabela, antiga, nova in (
+        ('transacoes', 'valor', 'valor_centavos'),
+        ('orcamentos', 'limite', 'limite_centavos'),
+        ('resumo_mensal', 'soma', 'soma_centavos'),
+    ):
+        colunas = colunas_da_tabela(conn, tabela)
+        if antiga not in colunas:
+            continue
+        if nova not in colunas:
+            conn.exec_driver_sql(f'ALTER TABLE {tabela} ADD COLUMN {nova} INTEGER NOT NULL DEFAULT 0')
+        conn.exec_driver_sql(f'UPDATE {tabela} SET {nova} = CAST(ROUND({antiga} * 100) AS INTEGER)')
+
+        for indice in conn.exec_driver_sql(f'PRAGMA index_list({tabela})').all():
+            nome = indice[1]
+            if nome.startswith('sqlite_autoindex_'):
+                continue
+            if antiga in {linha[2] for linha in conn.exec_driver_sql(f'PRAGMA index_info({nome})')}:
+                conn.exec_driver_sql(f'DROP INDEX {nome}')
+        conn.exec_driver_sql(f'ALTER TABLE {tabela} DROP COLUMN {antiga}')
+
+    for indice in Transacao.__table__.indexes:
+        indice.create(conn, checkfirst=True)
+
+    remover, inserir = comandos_reconstrucao()
+    conn.execute(remover)
+    conn.execute(inserir)
+
+
+@migracao(7, 'Tabela alertas (alertas de orçamento pré-calculados)')
+def _tabela_alertas(conn):
+    """Criar a tabela alertas em bancos existentes"""
+    from app.models import AlertasOrcamento
+
+    AlertasOrcamento.__table__.create(conn, checkfirst=True)
+
+
+def possui_indice_textual(conn):
+    """Verificar se a tabela transacoes_fts existe no banco"""
+    return conn.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'transacoes_fts'"
+    ).first() is not None
+
+
+# ========== APLICAÇÃO ==========
+def versao_mais_recente():
+    """Versão do esquema esperada pelo código"""
+    return MIGRACOES[-1][0] if MIGRACOES else 0
+
+
+def obter_versao(conn):
+    """Ler a versão gravada no banco"""
+    return conn.exec_driver_sql('PRAGMA user_version').scalar() or 0
+
+
+def aplicar_migracoes(engine, echo=None):
+    """Aplicar em ordem as migrações pendentes e retornar as versões aplicadas"""
+    with engine.connect() as conn:
+        versao = obter_versao(conn)
+
+    aplicadas = []
+    for numero, descricao, funcao in MIGRACOES:
+        if numero <= versao:
+            continue
+
+        with engine.begin() as conn:
+            funcao(conn)
+            conn.exec_driver_sql(f'PRAGMA user_version = {int(numero)}')
+
+        aplicadas.append(numero)
+        if echo:
+            echo(f'Migração {numero} aplicada: {descricao}')
+
+    return aplicadas
+
+
+class EsquemaDesatualizado(RuntimeError):
+    """Versão do banco diferente da esperada pelo código"""
+
+
+def verificar_esquema(engine, migrar=True):
+    """Comparar PRAGMA user_version com a versão do código na inicialização
+
+    Na versão esperada, apenas uma conexão lê a versão e a presença do
+    índice textual (sem create_all nem leitura do esquema das tabelas).
+    Versão anterior: aplica as migrações pendentes com migrar, senão
+    EsquemaDesatualizado; versão posterior (código antigo em um banco já
+    migrado) sempre é recusada. Retorna possui_indice_textual.
+    """
+    esperada = versao_mais_recente()
+    with engine.connect() as conn:
+        versao = obter_versao(conn)
+        if versao == esperada:
+            return possui_indice_textual(conn)
+
+    if versao > esperada:
+        raise EsquemaDesatualizado(
+            f'O banco está na versão {versao} do esquema, posterior à deste código ({esperada}).'
+        )
+    if not migrar:
+        raise EsquemaDesatualizado(
+            f'O banco está na versão {versao} do esquema e o código espera a {esperada}: execute `flask migrar`.'
+        )
+
+    aplicar_migracoes(engine)
+    with engine.connect() as conn:
+        return possui_indice_textual(conn)
+
+
+@click.command('migrar')
+@with_appcontext
+def migrar_command():
+    """Aplicar as migrações pendentes do esquema"""
+    aplicadas = aplicar_migracoes(db.engine, echo=click.echo)
+    if not aplicadas:
+        click.echo(f'Esquema já está na versão {versao_mais_recente()}.')
@@ -5,7 +5,9 @@ Implementa: Usuario, Transacao (base), Receita, Despesa, Categoria, Orcamento
 
 from app import db
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from app.senhas import gerar_hash, verificar_hash, precisa_rehash
+from app.dinheiro import para_centavos, de_centavos
+from sqlalchemy.ext.hybrid import hybrid_property
 
 
 class Usuario(db.Model):
@@ -17,6 +19,8 @@ class Usuario(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     senha_hash = db.Column(db.String(255), nullable=False)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    # Incrementada a cada commit que altera transações, categorias ou orçamentos (ETags)
+    versao_dados = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     
     # Relacionamentos
     categorias = db.relationship('Categoria', backref='usuario', lazy=True, cascade='all, delete-orphan')
@@ -24,12 +28,16 @@ class Usuario(db.Model):
     orcamentos = db.relationship('Orcamento', backref='usuario', lazy=True, cascade='all, delete-orphan')
     
     def set_password(self, password):
-        """Definir a senha com hash"""
-        self.senha_hash = generate_password_hash(password)
+        """Definir a senha com hash (no pool de app.senhas)"""
+        self.senha_hash = gerar_hash(password)
     
     def check_password(self, password):
         """Verificar se a senha está correta"""
-        return check_password_hash(self.senha_hash, password)
+        return verificar_hash(self.senha_hash, password)
+    
+    def hash_desatualizado(self):
+        """O hash foi gerado com parâmetros diferentes de SENHA_METODO?"""
+        return precisa_rehash(self.senha_hash)
     
     def __repr__(self):
         return f'<Usuario {self.nome}>'
@@ -58,18 +66,39 @@ class Transacao(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     descricao = db.Column(db.String(255), nullable=False)
-    valor = db.Column(db.Float, nullable=False)
+    valor_centavos = db.Column(db.Integer, nullable=False)
     data = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     tipo = db.Column(db.String(50), nullable=False)  # 'receita' ou 'despesa'
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False)
     
+    # Índices compostos para as consultas por período e por categoria/tipo
+    __table_args__ = (
+        db.Index('ix_transacoes_usuario_data', 'usuario_id', 'data'),
+        db.Index('ix_transacoes_usuario_categoria_tipo_data', 'usuario_id', 'categoria_id', 'tipo', 'data', 'valor_centavos'),
+    )
+    
     # Discriminador para herança de tabela única
     __mapper_args__ = {
         'polymorphic_on': tipo,
         'polymorphic_identity': 'transacao'
     }
     
+    @hybrid_property
+    def valor(self):
+        """Valor em reais (gravado em centavos)"""
+        if self.valor_centavos is None:
+            return None
+        return de_centavos(self.valor_centavos)
+    
+    @valor.setter
+    def valor(self, valor):
+        self.valor_centavos = para_centavos(valor)
+    
+    @valor.expression
+    def valor(cls):
+        return cls.valor_centavos / 100.0
+    
     def __repr__(self):
         return f'<Transacao {self.descricao}: R$ {self.valor}>'
 
@@ -94,6 +123,39 @@ class Despesa(Transacao):
         return f'<Despesa {self.descricao}: R$ {self.valor}>'
 
 
+class ResumoMensal(db.Model):
+    """Agregado materializado das transações por usuário/categoria/mês/tipo
+    
+    Mantido incrementalmente pelos eventos de sessão em app/agregados.py
+    """
+    __tablename__ = 'resumo_mensal'
+    
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), primary_key=True)
+    ano = db.Column(db.Integer, primary_key=True)
+    mes = db.Column(db.Integer, primary_key=True)  # 1-12
+    tipo = db.Column(db.String(50), primary_key=True)  # 'receita' ou 'despesa'
+    soma_centavos = db.Column(db.Integer, nullable=False, default=0)
+    quantidade = db.Column(db.Integer, nullable=False, default=0)
+    
+    # Índice para a leitura de todas as categorias de um usuário/mês
+    __table_args__ = (
+        db.Index('ix_resumo_mensal_usuario_periodo', 'usuario_id', 'ano', 'mes', 'tipo'),
+    )
+    
+    @hybrid_property
+    def soma(self):
+        """Soma em reais (gravada em centavos)"""
+        return de_centavos(self.soma_centavos)
+    
+    @soma.expression
+    def soma(cls):
+        return cls.soma_centavos / 100.0
+    
+    def __repr__(self):
+        return f'<ResumoMensal {self.tipo} {self.mes}/{self.ano}: R$ {self.soma}>'
+
+
 class Orcamento(db.Model):
     """Modelo de orçamento para definir metas de gastos"""
     __tablename__ = 'orcamentos'
@@ -103,7 +165,7 @@ class Orcamento(db.Model):
     categoria_id = db.Column(db.Integer, db.ForeignKey('categorias.id'), nullable=False)
     mes = db.Column(db.Integer, nullable=False)  # 1-12
     ano = db.Column(db.Integer, nullable=False)
-    limite = db.Column(db.Float, nullable=False)  # Limite de gastos
+    limite_centavos = db.Column(db.Integer, nullable=False)  # Limite de gastos
     alerta_percentual = db.Column(db.Float, default=80.0)  # Percentual para alerta (ex: 80%)
     data_criacao = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
     data_atualizacao = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
@@ -111,125 +173,94 @@ class Orcamento(db.Model):
     # Índice composto para garantir um orçamento por categoria/mês/ano
     __table_args__ = (
         db.UniqueConstraint('usuario_id', 'categoria_id', 'mes', 'ano', name='uq_orcamento_mes_ano'),
+        db.Index('ix_orcamentos_usuario_mes_ano', 'usuario_id', 'mes', 'ano'),
     )
     
-    def get_gasto_atual(self):
-        """Calcular o gasto atual do mês para esta categoria"""
-        from datetime import datetime as dt
-        
-        primeiro_dia = dt(self.ano, self.mes, 1)
-        if self.mes == 12:
-            ultimo_dia = dt(self.ano + 1, 1, 1)
-        else:
-            ultimo_dia = dt(self.ano, self.mes + 1, 1)
+    @hybrid_property
+    def limite(self):
+        """Limite em reais (gravado em centavos)"""
+        if self.limite_centavos is None:
+            return None
+        return de_centavos(self.limite_centavos)
+    
+    @limite.setter
+    def limite(self, limite):
+        self.limite_centavos = para_centavos(limite)
+    
+    @limite.expression
+    def limite(cls):
+        return cls.limite_centavos / 100.0
+    
+    def avaliar(self, hoje=None):
+        """Calcular todos os indicadores do orçamento (gasto e previsão em lote)"""
+        from app.avaliacao_orcamentos import avaliar_orcamentos
         
-        gasto = db.session.query(db.func.sum(Transacao.valor)).filter(
-            Transacao.usuario_id == self.usuario_id,
-            Transacao.categoria_id == self.categoria_id,
-            Transacao.tipo == 'despesa',
-            Transacao.data >= primeiro_dia,
-            Transacao.data < ultimo_dia
-        ).scalar() or 0.0
+        return avaliar_orcamentos([self], hoje)[self.id]
+    
+    def get_gasto_atual_centavos(self):
+        """Calcular o gasto atual do mês para esta categoria, em centavos"""
+        from app.avaliacao_orcamentos import calcular_gastos_por_categoria
         
-        return float(gasto)
+        gastos = calcular_gastos_por_categoria(
+            self.usuario_id, self.mes, self.ano,
+            categoria_ids=[self.categoria_id]
+        )
+        return gastos.get(self.categoria_id, 0)
+    
+    def get_gasto_atual(self):
+        """Calcular o gasto atual do mês para esta categoria"""
+        return de_centavos(self.get_gasto_atual_centavos())
     
     def get_percentual_usado(self):
         """Calcular o percentual do orçamento utilizado"""
-        if self.limite <= 0:
-            return 0.0
-        
-        gasto = self.get_gasto_atual()
-        percentual = (gasto / self.limite) * 100
-        return min(percentual, 100.0)  # Máximo 100% para visualização
+        return self.avaliar().percentual
     
     def get_restante(self):
         """Calcular o valor restante do orçamento"""
-        gasto = self.get_gasto_atual()
-        restante = self.limite - gasto
-        return max(restante, 0.0)
+        return self.avaliar().restante
     
     def get_status(self):
         """Retornar o status do orçamento"""
-        percentual = self.get_percentual_usado()
-        
-        if percentual >= 100:
-            return 'excedido'
-        elif percentual >= self.alerta_percentual:
-            return 'aviso'
-        else:
-            return 'ok'
+        return self.avaliar().status
     
     def get_status_badge(self):
         """Retornar o badge de status para exibição"""
-        status = self.get_status()
-        
-        if status == 'excedido':
-            return {'classe': 'danger', 'texto': 'Excedido', 'icone': 'fa-exclamation-circle'}
-        elif status == 'aviso':
-            return {'classe': 'warning', 'texto': 'Aviso', 'icone': 'fa-exclamation-triangle'}
-        else:
-            return {'classe': 'success', 'texto': 'Ok', 'icone': 'fa-check-circle'}
+        return self.avaliar().status_badge
     
     def get_dias_restantes_mes(self):
         """Calcular os dias restantes do mês"""
-        from datetime import datetime as dt, timedelta
-        
-        hoje = dt.utcnow()
-        
-        # Se não é o mês atual, retornar 0
-        if hoje.year != self.ano or hoje.month != self.mes:
-            return 0
+        from app.avaliacao_orcamentos import calcular_dias_restantes
         
-        # Calcular o último dia do mês
-        if self.mes == 12:
-            ultimo_dia_mes = dt(self.ano + 1, 1, 1) - timedelta(days=1)
-        else:
-            ultimo_dia_mes = dt(self.ano, self.mes + 1, 1) - timedelta(days=1)
-        
-        dias_restantes = (ultimo_dia_mes.date() - hoje.date()).days + 1
-        return max(dias_restantes, 0)
+        return calcular_dias_restantes(self.mes, self.ano, datetime.utcnow())
     
     def get_projecao_gasto(self):
         """Calcular a projeção de gasto até o final do mês"""
-        from datetime import datetime as dt
-        
-        hoje = dt.utcnow()
-        
-        # Se não é o mês atual, retornar o gasto atual
-        if hoje.year != self.ano or hoje.month != self.mes:
-            return self.get_gasto_atual()
-        
-        # Calcular dias passados
-        dias_passados = hoje.day
-        dias_restantes = self.get_dias_restantes_mes()
-        
-        if dias_passados == 0:
-            return 0.0
-        
-        gasto_atual = self.get_gasto_atual()
-        media_diaria = gasto_atual / dias_passados
-        projecao = gasto_atual + (media_diaria * dias_restantes)
-        
-        return projecao
+        return self.avaliar().projecao
     
     def get_alerta_projecao(self):
         """Retornar alerta se a projeção ultrapassar o limite"""
-        projecao = self.get_projecao_gasto()
-        
-        if projecao > self.limite:
-            excesso = projecao - self.limite
-            return {
-                'alerta': True,
-                'mensagem': f'Projeção: R$ {projecao:.2f} (Excesso: R$ {excesso:.2f})',
-                'classe': 'warning'
-            }
-        else:
-            margem = self.limite - projecao
-            return {
-                'alerta': False,
-                'mensagem': f'Projeção: R$ {projecao:.2f} (Margem: R$ {margem:.2f})',
-                'classe': 'info'
-            }
+        return self.avaliar().alerta_projecao
     
     def __repr__(self):
         return f'<Orcamento {self.categoria.nome} {self.mes}/{self.ano}: R$ {self.limite}>'
+
+
+class AlertasOrcamento(db.Model):
+    """Alertas de orçamento pré-calculados de um usuário/mês (ver app/alertas.py)"""
+    __tablename__ = 'alertas'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+    mes = db.Column(db.Integer, nullable=False)
+    ano = db.Column(db.Integer, nullable=False)
+    versao_dados = db.Column(db.Integer, nullable=False)  # usuarios.versao_dados usada no cálculo
+    total_alertas = db.Column(db.Integer, nullable=False, default=0)
+    dados = db.Column(db.JSON, nullable=False)  # Lista de alertas no formato da API
+    calculado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        db.UniqueConstraint('usuario_id', 'mes', 'ano', name='uq_alertas_usuario_mes_ano'),
+    )
+    
+    def __repr__(self):
+        return f'<AlertasOrcamento {self.usuario_id} {self.mes}/{self.ano}: {self.total_alertas}>'
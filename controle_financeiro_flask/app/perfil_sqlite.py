@@ -0,0 +1,95 @@
+"""
+Perfis de configuração do SQLite
+Cada perfil define os PRAGMAs aplicados em toda nova conexão (pelo evento
+connect do engine) e as opções do pool de conexões. O perfil é escolhido por
+PERFIL_SQLITE na configuração da app; SQLITE_PRAGMAS sobrescreve PRAGMAs
+individuais do perfil escolhido.
+"""
+
+from app import db
+from sqlalchemy import event
+
+
+PERFIS_SQLITE = {
+    # Configuração padrão do SQLite: journal de rollback e sincronização total
+    'padrao': {
+        'pragmas': {},
+        'pool': {}
+    },
+    # Vários workers lendo e um escritor por vez sem "database is locked"
+    'producao': {
+        'pragmas': {
+            'journal_mode': 'WAL',  # leitores não bloqueiam o escritor
+            'synchronous': 'NORMAL',  # seguro com WAL; fsync só nos checkpoints
+            'cache_size': -64000,  # em KiB quando negativo (64 MB)
+            'mmap_size': 268435456,  # 256 MB lidos por mmap
+            'busy_timeout': 5000,  # ms aguardando o lock de escrita
+            'temp_store': 'MEMORY'
+        },
+        'pool': {
+            'pool_size': 10,
+            'max_overflow': 10,
+            'pool_timeout': 30
+        }
+    }
+}
+
+PERFIL_PADRAO = 'producao'
+
+
+def _perfil(app):
+    nome = app.config.get('PERFIL_SQLITE', PERFIL_PADRAO)
+    if nome not in PERFIS_SQLITE:
+        raise ValueError(f'Perfil SQLite desconhecido: {nome}')
+    return PERFIS_SQLITE[nome]
+
+
+def _banco_em_arquivo(uri):
+    """O pool e os PRAGMAs só fazem sentido para bancos SQLite em arquivo"""
+    return uri.startswith('sqlite:///') and uri != 'sqlite:///:memory:' and 'mode=memory' not in uri
+
+
+def pragmas_configurados(app):
+    """PRAGMAs do perfil escolhido com as sobrescritas de SQLITE_PRAGMAS"""
+    pragmas = dict(_perfil(app)['pragmas'])
+    pragmas.update(app.config.get('SQLITE_PRAGMAS') or {})
+    return pragmas
+
+
+def configurar_pool(app):
+    """Preencher SQLALCHEMY_ENGINE_OPTIONS antes de db.init_app
+
+    Opções definidas explicitamente na configuração têm precedência.
+    """
+    if not _banco_em_arquivo(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+
+    opcoes = dict(_perfil(app)['pool'])
+    opcoes.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = opcoes
+
+
+def aplicar_pragmas(engine, pragmas):
+    """Executar os PRAGMAs em cada conexão aberta pelo engine"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    comandos = [f'PRAGMA {nome} = {valor}' for nome, valor in pragmas.items()]
+
+    @event.listens_for(engine, 'connect')
+    def _configurar_conexao(conexao_dbapi, registro):
+        cursor = conexao_dbapi.cursor()
+        try:
+            for comando in comandos:
+                cursor.execute(comando)
+        finally:
+            cursor.close()
+
+
+def init_perfil_sqlite(app):
+    """Ligar os PRAGMAs do perfil ao engine da app (após db.init_app)"""
+    if not _banco_em_arquivo(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+
+    with app.app_context():
+        aplicar_pragmas(db.engine, pragmas_configurados(app))
@@ -0,0 +1,177 @@
+"""
+Previsão em lote do gasto de fim de mês por categoria
+Uma única consulta agrupada traz as despesas diárias das categorias
+orçadas no mês corrente e nos MESES_HISTORICO meses anteriores, em uma
+matriz categorias × meses × dias do NumPy. Dela saem, para todas as
+categorias de uma vez:
+
+- o perfil do mês: a fração do gasto mensal que costuma estar feita até o
+  dia de hoje (da própria categoria, aproximada do perfil geral do usuário
+  quando há poucos meses de histórico; sem histórico, a fração linear);
+- o total mensal esperado pela suavização exponencial dos meses anteriores.
+
+A projeção combina duas estimativas, pesando a primeira pela fração já
+percorrida: o ritmo atual (gasto / fração) e o gasto atual mais a parte
+ainda não percorrida do total suavizado. Sem histórico, a projeção é a
+linear de app.avaliacao_orcamentos (média diária × dias restantes, contando
+o dia de hoje).
+"""
+
+from app import db
+from app.models import Transacao
+from datetime import datetime
+import calendar
+import numpy as np
+
+
+# Meses completos usados para aprender o perfil e a suavização
+MESES_HISTORICO = 6
+
+# Fator de suavização exponencial dos totais mensais (peso do mês mais recente)
+ALFA_SUAVIZACAO = 0.5
+
+# Meses de histórico equivalentes atribuídos ao perfil geral do usuário
+PESO_PERFIL_GERAL = 2
+
+
+# ========== LEITURA ==========
+def _primeiro_mes(mes, ano, meses_historico):
+    return np.datetime64(f'{ano:04d}-{mes:02d}', 'M') - meses_historico
+
+
+def consulta_gastos_diarios(usuario_id, mes, ano, categoria_ids, meses_historico=MESES_HISTORICO):
+    """SELECT (dia, categoria_id, soma) das despesas do histórico e do mês"""
+    inicio = _primeiro_mes(mes, ano, meses_historico)
+    fim = np.datetime64(f'{ano:04d}-{mes:02d}', 'M') + 1
+
+    dia = db.func.date(Transacao.data)
+    return db.select(
+        dia,
+        Transacao.categoria_id,
+        db.func.sum(Transacao.valor_centavos)
+    ).where(
+        Transacao.usuario_id == usuario_id,
+        Transacao.categoria_id.in_(categoria_ids),
+        Transacao.tipo == 'despesa',
+        Transacao.data >= inicio.astype('datetime64[s]').astype(datetime),
+        Transacao.data < fim.astype('datetime64[s]').astype(datetime)
+    ).group_by(dia, Transacao.categoria_id)
+
+
+def matriz_de_gastos(linhas, mes, ano, categoria_ids, meses_historico=MESES_HISTORICO):
+    """Matriz categorias × (histórico + mês atual) × 31 dias, em centavos"""
+    matriz = np.zeros((len(categoria_ids), meses_historico + 1, 31), dtype=np.int64)
+    if not linhas:
+        return matriz
+
+    inicio = _primeiro_mes(mes, ano, meses_historico)
+    dias = np.array([linha[0] for linha in linhas], dtype='datetime64[D]')
+    meses = dias.astype('datetime64[M]')
+    posicao = {categoria_id: i for i, categoria_id in enumerate(categoria_ids)}
+    linha_categoria = np.fromiter((posicao[linha[1]] for linha in linhas), dtype=np.int64, count=len(linhas))
+
+    matriz[
+        linha_categoria,
+        (meses - inicio).astype(np.int64),
+        (dias - meses.astype('datetime64[D]')).astype(np.int64)
+    ] = np.fromiter((linha[2] for linha in linhas), dtype=np.int64, count=len(linhas))
+    return matriz
+
+
+def carregar_gastos_diarios(usuario_id, mes, ano, categoria_ids, meses_historico=MESES_HISTORICO):
+    """Executar consulta_gastos_diarios e montar a matriz"""
+    linhas = db.session.execute(
+        consulta_gastos_diarios(usuario_id, mes, ano, categoria_ids, meses_historico)
+    ).all()
+    return matriz_de_gastos(linhas, mes, ano, categoria_ids, meses_historico)
+
+
+# ========== MODELOS ==========
+def fracao_do_mes(historico, dia, dias_no_mes):
+    """Fração do gasto mensal feita até `dia`, por categoria
+
+    Razão entre o acumulado até o dia e o total de cada mês do histórico,
+    somados, com o perfil geral (todas as categorias) como prévia.
+    """
+    linear = dia / dias_no_mes
+    if dia >= dias_no_mes:
+        return np.ones(historico.shape[0])
+
+    acumulado = historico[:, :, :dia].sum(axis=(1, 2)).astype(np.float64)
+    total = historico.sum(axis=(1, 2)).astype(np.float64)
+
+    geral = acumulado.sum() / total.sum() if total.sum() > 0 else linear
+
+    meses_com_gasto = (historico.sum(axis=2) > 0).sum(axis=1)
+    propria = np.divide(acumulado, total, out=np.zeros_like(total), where=total > 0)
+    return (meses_com_gasto * propria + PESO_PERFIL_GERAL * geral) / (meses_com_gasto + PESO_PERFIL_GERAL)
+
+
+def suavizar_totais(totais, alfa=ALFA_SUAVIZACAO):
+    """Suavização exponencial dos totais mensais (colunas do mais antigo ao mais recente)
+
+    Cada categoria começa no primeiro mês com gasto. Retorna (nível, tem_historico).
+    """
+    nivel = np.zeros(totais.shape[0])
+    iniciado = np.zeros(totais.shape[0], dtype=bool)
+    for coluna in totais.T:
+        nivel = np.where(iniciado, alfa * coluna + (1 - alfa) * nivel, coluna)
+        iniciado |= coluna > 0
+    return nivel, iniciado
+
+
+def projetar(gasto_atual, fracao, suavizado, tem_historico, dia, dias_no_mes):
+    """Projeção do fim do mês em centavos
+
+    Com histórico:
+      projeção = fracao × gasto / max(fracao, 1 / dias_no_mes)
+               + (1 − fracao) × (gasto + (1 − fracao) × suavizado)
+    O ritmo considera ao menos um dia do mês percorrido; com fracao = 0 a
+    projeção é gasto + suavizado.
+
+    Sem histórico, a mesma conta (e arredondamento) de calcular_projecao:
+      projeção = gasto + gasto × dias_restantes / dia
+    """
+    ritmo = gasto_atual / np.maximum(fracao, 1 / dias_no_mes)
+    historica = gasto_atual + (1 - fracao) * suavizado
+    projecao = np.rint(fracao * ritmo + (1 - fracao) * historica).astype(np.int64)
+
+    dias_restantes = dias_no_mes - dia + 1
+    linear = gasto_atual + (2 * gasto_atual * dias_restantes + dia) // (2 * dia)
+
+    return np.maximum(np.where(tem_historico, projecao, linear), gasto_atual)
+
+
+# ========== PREVISÃO EM LOTE ==========
+def prever_gastos(usuario_id, mes, ano, categoria_ids, hoje=None):
+    """Projetar o gasto de fim de mês de várias categorias com uma consulta
+
+    Retorna {categoria_id: projecao_centavos}. Fora do mês corrente a
+    projeção é o próprio gasto do mês.
+    """
+    categoria_ids = sorted(set(categoria_ids))
+    if not categoria_ids:
+        return {}
+
+    matriz = carregar_gastos_diarios(usuario_id, mes, ano, categoria_ids)
+    return prever_da_matriz(matriz, mes, ano, categoria_ids, hoje)
+
+
+def prever_da_matriz(matriz, mes, ano, categoria_ids, hoje=None):
+    """Projeções {categoria_id: centavos} a partir da matriz de gastos diários
+
+    categoria_ids na ordem das linhas da matriz (ordenados, sem repetição).
+    """
+    hoje = hoje or datetime.utcnow()
+    gasto_atual = matriz[:, -1, :].sum(axis=1)
+
+    if hoje.year != ano or hoje.month != mes:
+        return dict(zip(categoria_ids, gasto_atual.tolist()))
+
+    historico = matriz[:, :-1, :]
+    dias_no_mes = calendar.monthrange(ano, mes)[1]
+    fracao = fracao_do_mes(historico, hoje.day, dias_no_mes)
+    suavizado, tem_historico = suavizar_totais(historico.sum(axis=2))
+
+    projecoes = projetar(gasto_atual, fracao, suavizado, tem_historico, hoje.day, dias_no_mes)
+    return dict(zip(categoria_ids, projecoes.tolist()))
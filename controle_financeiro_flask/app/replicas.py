@@ -0,0 +1,114 @@
+"""
+Roteamento de leituras para réplicas do banco
+A sessão roteada envia os SELECTs de requisições somente leitura (GET/HEAD ou
+views marcadas com @somente_leitura) para um engine de réplica, escolhido em
+rodízio a cada requisição. Escritas, comandos fora de requisições e qualquer
+leitura feita depois de um flush na mesma requisição usam o banco principal,
+para que o usuário sempre veja o que acabou de gravar.
+
+As réplicas são configuradas por SQLALCHEMY_REPLICAS (lista de URIs) e
+precisam ser mantidas em sincronia com o principal por fora da aplicação
+(por exemplo, cópias periódicas com o comando .backup do sqlite3).
+
+Este módulo não importa `app` no nível do módulo: a classe da sessão é
+usada na criação de `db`.
+"""
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.sql import Select
+import itertools
+import threading
+
+
+# Métodos HTTP que não alteram dados
+METODOS_LEITURA = ('GET', 'HEAD', 'OPTIONS')
+
+
+def somente_leitura(f):
+    """Marcar uma view que só consulta dados, mesmo recebendo POST"""
+    f.somente_leitura = True
+    return f
+
+
+def _requisicao_somente_leitura():
+    if request.method in METODOS_LEITURA:
+        return True
+    view = current_app.view_functions.get(request.endpoint)
+    return getattr(view, 'somente_leitura', False)
+
+
+def replica_da_requisicao():
+    """Engine de réplica usado pela requisição atual (None sem réplicas)"""
+    replicas = current_app.extensions.get('replicas')
+    if not replicas:
+        return None
+    if 'replica' not in g:
+        g.replica = replicas.proxima()
+    return g.replica
+
+
+# ========== SESSÃO ==========
+class SessaoRoteada(Session):
+    """Sessão do Flask-SQLAlchemy que lê das réplicas quando é seguro"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._le_da_replica(clause):
+            replica = replica_da_requisicao()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _le_da_replica(self, clause):
+        return (
+            isinstance(clause, Select)
+            and has_request_context()
+            and not self._flushing
+            and not self.info.get('escreveu')
+            and _requisicao_somente_leitura()
+        )
+
+
+@event.listens_for(SessaoRoteada, 'after_flush')
+def _marcar_escrita(session, flush_context):
+    """Depois de gravar, o restante da requisição lê do banco principal"""
+    session.info['escreveu'] = True
+
+
+# ========== ENGINES ==========
+class Replicas:
+    """Engines de réplica com escolha em rodízio"""
+
+    def __init__(self, engines):
+        self.engines = list(engines)
+        self._ciclo = itertools.cycle(self.engines)
+        self._lock = threading.Lock()
+
+    def proxima(self):
+        with self._lock:
+            return next(self._ciclo)
+
+    def dispose(self):
+        for engine in self.engines:
+            engine.dispose()
+
+
+def init_replicas(app):
+    """Criar os engines de SQLALCHEMY_REPLICAS com o mesmo perfil do principal"""
+    from app.instrumentacao import instrumentar_engine
+    from app.perfil_sqlite import aplicar_pragmas, pragmas_configurados
+
+    uris = app.config.get('SQLALCHEMY_REPLICAS') or []
+    if not uris:
+        return
+
+    opcoes = app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {}
+    engines = []
+    for uri in uris:
+        engine = create_engine(uri, **opcoes)
+        aplicar_pragmas(engine, pragmas_configurados(app))
+        instrumentar_engine(engine)
+        engines.append(engine)
+
+    app.extensions['replicas'] = Replicas(engines)
@@ -3,13 +3,29 @@ Rotas da aplicação Flask para Controle Financeiro Pessoal - VERSÃO 2
 Implementa: Autenticação, Dashboard, Categorias, Transações, Edição, Busca e Filtros
 """
 
-from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
+from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify, Response, stream_with_context
 from app import db
-from app.models import Usuario, Categoria, Transacao, Receita, Despesa
+from app.models import Usuario, Categoria, Transacao, Receita, Despesa, ResumoMensal
+from app.replicas import somente_leitura
+from app.condicional import condicional
+from app.senhas import SenhasOcupadas
+from app.cache import cache_categorias
+from app.dinheiro import de_centavos
+from app.importacao import importar, detectar_formato, abrir_texto
+from app.lote import gravar_lote
+from app.busca_incremental import buscar_pagina
+from app.exportacao import exportar, FORMATOS as FORMATOS_EXPORTACAO
+from app.consultas import (
+    ler_filtros, ler_limite, consulta_transacoes, consulta_categorias_sugeridas, aplicar_cursor, montar_pagina, usa_relevancia
+)
+from app.validacoes import validar, primeiro_erro, validar_requisicao, ESQUEMA_JSON, VERSAO_ESQUEMA
 from datetime import datetime, timedelta
 from functools import wraps
 import calendar
-from sqlalchemy import or_, and_
+from sqlalchemy.orm import joinedload
+
+# Quantidade de transações exibidas por página no dashboard
+TRANSACOES_POR_PAGINA = 20
 
 # ========== BLUEPRINTS ==========
 auth_bp = Blueprint('auth', __name__)
@@ -65,7 +81,11 @@ def registro():
         
         # Criar novo usuário
         novo_usuario = Usuario(nome=nome, email=email)
-        novo_usuario.set_password(senha)
+        try:
+            novo_usuario.set_password(senha)
+        except SenhasOcupadas:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return render_template('registro.html'), 503, {'Retry-After': '1'}
         
         db.session.add(novo_usuario)
         db.session.commit()
@@ -89,7 +109,18 @@ def login():
         
         usuario = Usuario.query.filter_by(email=email).first()
         
-        if usuario and usuario.check_password(senha):
+        try:
+            senha_correta = usuario is not None and usuario.check_password(senha)
+            
+            # Regravar hashes antigos enquanto a senha em texto está disponível
+            if senha_correta and usuario.hash_desatualizado():
+                usuario.set_password(senha)
+                db.session.commit()
+        except SenhasOcupadas:
+            flash('Servidor ocupado. Tente novamente em instantes.', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
+        
+        if senha_correta:
             session['usuario_id'] = usuario.id
             session['usuario_nome'] = usuario.nome
             flash(f'Bem-vindo, {usuario.nome}!', 'success')
@@ -112,6 +143,7 @@ def logout():
 # ========== ROTAS DO DASHBOARD ==========
 @dashboard_bp.route('/')
 @login_required
+@condicional
 def home():
     """Rota principal - Dashboard com resumo mensal"""
     usuario_id = session.get('usuario_id')
@@ -126,32 +158,47 @@ def home():
     else:
         ultimo_dia_mes = datetime(hoje.year, hoje.month + 1, 1) - timedelta(seconds=1)
     
-    # Obter transações do mês
-    transacoes_mes = Transacao.query.filter(
+    # Página de transações recentes do mês, com o nome da categoria no mesmo SELECT
+    pagina = request.args.get('pagina', 1, type=int)
+    transacoes_mes = Transacao.query.options(joinedload(Transacao.categoria)).filter(
         Transacao.usuario_id == usuario_id,
         Transacao.data >= primeiro_dia_mes,
         Transacao.data <= ultimo_dia_mes
-    ).all()
-    
-    # Calcular totais
-    total_receitas = sum(t.valor for t in transacoes_mes if t.tipo == 'receita')
-    total_despesas = sum(t.valor for t in transacoes_mes if t.tipo == 'despesa')
-    saldo = total_receitas - total_despesas
-    
-    # Agrupar despesas por categoria
-    despesas_por_categoria = {}
-    for transacao in transacoes_mes:
-        if transacao.tipo == 'despesa':
-            categoria_nome = transacao.categoria.nome
-            if categoria_nome not in despesas_por_categoria:
-                despesas_por_categoria[categoria_nome] = 0
-            despesas_por_categoria[categoria_nome] += transacao.valor
+    ).order_by(Transacao.data.desc(), Transacao.id.desc()).paginate(
+        page=pagina,
+        per_page=TRANSACOES_POR_PAGINA,
+        error_out=False
+    )
     
-    # Ordenar por valor decrescente
-    despesas_por_categoria = dict(sorted(despesas_por_categoria.items(), key=lambda x: x[1], reverse=True))
+    # Totais do mês agrupados no banco a partir de resumo_mensal
+    totais_tipo = dict(db.session.query(
+        ResumoMensal.tipo,
+        db.func.sum(ResumoMensal.soma_centavos)
+    ).filter(
+        ResumoMensal.usuario_id == usuario_id,
+        ResumoMensal.ano == hoje.year,
+        ResumoMensal.mes == hoje.month
+    ).group_by(ResumoMensal.tipo).all())
+    
+    # Calcular totais (somas exatas em centavos, convertidas para exibição)
+    total_receitas = de_centavos(totais_tipo.get('receita', 0))
+    total_despesas = de_centavos(totais_tipo.get('despesa', 0))
+    saldo = de_centavos(totais_tipo.get('receita', 0) - totais_tipo.get('despesa', 0))
+    
+    # Agrupar despesas por categoria, ordenadas por valor decrescente
+    total_categoria = db.func.sum(ResumoMensal.soma_centavos)
+    despesas_por_categoria = {nome: de_centavos(centavos) for nome, centavos in db.session.query(
+        Categoria.nome,
+        total_categoria
+    ).join(ResumoMensal, ResumoMensal.categoria_id == Categoria.id).filter(
+        ResumoMensal.usuario_id == usuario_id,
+        ResumoMensal.ano == hoje.year,
+        ResumoMensal.mes == hoje.month,
+        ResumoMensal.tipo == 'despesa'
+    ).group_by(Categoria.nome).order_by(total_categoria.desc())}
     
     # Obter categorias do usuário
-    categorias = Categoria.query.filter_by(usuario_id=usuario_id).all()
+    categorias = cache_categorias().listar(usuario_id)
     
     # Informações do mês
     nome_mes = calendar.month_name[hoje.month]
@@ -275,47 +322,24 @@ def nova_receita():
     usuario_id = session.get('usuario_id')
     
     if request.method == 'POST':
-        descricao = request.form.get('descricao', '').strip()
-        valor = request.form.get('valor', '')
-        categoria_id = request.form.get('categoria_id', '')
-        data = request.form.get('data', '')
-        
-        # Validações
-        if not descricao or not valor or not categoria_id:
-            flash('Todos os campos são obrigatórios.', 'danger')
-            return redirect(url_for('transacoes.nova_receita'))
-        
-        if len(descricao) < 3:
-            flash('A descrição deve ter pelo menos 3 caracteres.', 'danger')
-            return redirect(url_for('transacoes.nova_receita'))
-        
-        try:
-            valor = float(valor)
-            if valor <= 0:
-                raise ValueError
-        except ValueError:
-            flash('O valor deve ser um número positivo.', 'danger')
+        # Validações (regras de app/validacoes.py, as mesmas do navegador)
+        valores, erros = validar('transacao', request.form)
+        if erros:
+            flash(primeiro_erro(erros), 'danger')
             return redirect(url_for('transacoes.nova_receita'))
         
         # Verificar se a categoria pertence ao usuário
-        categoria = Categoria.query.get(categoria_id)
-        if not categoria or categoria.usuario_id != usuario_id:
+        if not cache_categorias().pertence(usuario_id, valores['categoria_id']):
             flash('Categoria inválida.', 'danger')
             return redirect(url_for('transacoes.nova_receita'))
         
-        # Converter data
-        try:
-            data_obj = datetime.strptime(data, '%Y-%m-%d') if data else datetime.utcnow()
-        except ValueError:
-            data_obj = datetime.utcnow()
-        
         # Criar nova receita
         nova_receita = Receita(
-            descricao=descricao,
-            valor=valor,
-            categoria_id=categoria_id,
+            descricao=valores['descricao'],
+            valor=valores['valor'],
+            categoria_id=valores['categoria_id'],
             usuario_id=usuario_id,
-            data=data_obj
+            data=valores['data'] or datetime.utcnow()
         )
         
         db.session.add(nova_receita)
@@ -324,7 +348,7 @@ def nova_receita():
         flash('Receita registrada com sucesso!', 'success')
         return redirect(url_for('dashboard.home'))
     
-    categorias = Categoria.query.filter_by(usuario_id=usuario_id).all()
+    categorias = cache_categorias().listar(usuario_id)
     return render_template('nova_receita.html', categorias=categorias)
 
 
@@ -335,47 +359,24 @@ def nova_despesa():
     usuario_id = session.get('usuario_id')
     
     if request.method == 'POST':
-        descricao = request.form.get('descricao', '').strip()
-        valor = request.form.get('valor', '')
-        categoria_id = request.form.get('categoria_id', '')
-        data = request.form.get('data', '')
-        
-        # Validações
-        if not descricao or not valor or not categoria_id:
-            flash('Todos os campos são obrigatórios.', 'danger')
-            return redirect(url_for('transacoes.nova_despesa'))
-        
-        if len(descricao) < 3:
-            flash('A descrição deve ter pelo menos 3 caracteres.', 'danger')
-            return redirect(url_for('transacoes.nova_despesa'))
-        
-        try:
-            valor = float(valor)
-            if valor <= 0:
-                raise ValueError
-        except ValueError:
-            flash('O valor deve ser um número positivo.', 'danger')
+        # Validações (regras de app/validacoes.py, as mesmas do navegador)
+        valores, erros = validar('transacao', request.form)
+        if erros:
+            flash(primeiro_erro(erros), 'danger')
             return redirect(url_for('transacoes.nova_despesa'))
         
         # Verificar se a categoria pertence ao usuário
-        categoria = Categoria.query.get(categoria_id)
-        if not categoria or categoria.usuario_id != usuario_id:
+        if not cache_categorias().pertence(usuario_id, valores['categoria_id']):
             flash('Categoria inválida.', 'danger')
             return redirect(url_for('transacoes.nova_despesa'))
         
-        # Converter data
-        try:
-            data_obj = datetime.strptime(data, '%Y-%m-%d') if data else datetime.utcnow()
-        except ValueError:
-            data_obj = datetime.utcnow()
-        
         # Criar nova despesa
         nova_despesa = Despesa(
-            descricao=descricao,
-            valor=valor,
-            categoria_id=categoria_id,
+            descricao=valores['descricao'],
+            valor=valores['valor'],
+            categoria_id=valores['categoria_id'],
             usuario_id=usuario_id,
-            data=data_obj
+            data=valores['data'] or datetime.utcnow()
         )
         
         db.session.add(nova_despesa)
@@ -384,7 +385,7 @@ def nova_despesa():
         flash('Despesa registrada com sucesso!', 'success')
         return redirect(url_for('dashboard.home'))
     
-    categorias = Categoria.query.filter_by(usuario_id=usuario_id).all()
+    categorias = cache_categorias().listar(usuario_id)
     return render_template('nova_despesa.html', categorias=categorias)
 
 
@@ -402,52 +403,29 @@ def editar_transacao(transacao_id):
         return redirect(url_for('dashboard.home'))
     
     if request.method == 'POST':
-        descricao = request.form.get('descricao', '').strip()
-        valor = request.form.get('valor', '')
-        categoria_id = request.form.get('categoria_id', '')
-        data = request.form.get('data', '')
-        
-        # Validações
-        if not descricao or not valor or not categoria_id:
-            flash('Todos os campos são obrigatórios.', 'danger')
-            return redirect(url_for('transacoes.editar_transacao', transacao_id=transacao_id))
-        
-        if len(descricao) < 3:
-            flash('A descrição deve ter pelo menos 3 caracteres.', 'danger')
-            return redirect(url_for('transacoes.editar_transacao', transacao_id=transacao_id))
-        
-        try:
-            valor = float(valor)
-            if valor <= 0:
-                raise ValueError
-        except ValueError:
-            flash('O valor deve ser um número positivo.', 'danger')
+        # Validações (regras de app/validacoes.py, as mesmas do navegador)
+        valores, erros = validar('transacao', request.form)
+        if erros:
+            flash(primeiro_erro(erros), 'danger')
             return redirect(url_for('transacoes.editar_transacao', transacao_id=transacao_id))
         
         # Verificar se a categoria pertence ao usuário
-        categoria = Categoria.query.get(categoria_id)
-        if not categoria or categoria.usuario_id != usuario_id:
+        if not cache_categorias().pertence(usuario_id, valores['categoria_id']):
             flash('Categoria inválida.', 'danger')
             return redirect(url_for('transacoes.editar_transacao', transacao_id=transacao_id))
         
-        # Converter data
-        try:
-            data_obj = datetime.strptime(data, '%Y-%m-%d') if data else datetime.utcnow()
-        except ValueError:
-            data_obj = datetime.utcnow()
-        
         # Atualizar transação
-        transacao.descricao = descricao
-        transacao.valor = valor
-        transacao.categoria_id = categoria_id
-        transacao.data = data_obj
+        transacao.descricao = valores['descricao']
+        transacao.valor = valores['valor']
+        transacao.categoria_id = valores['categoria_id']
+        transacao.data = valores['data'] or datetime.utcnow()
         
         db.session.commit()
         
         flash('Transação atualizada com sucesso!', 'success')
         return redirect(url_for('dashboard.home'))
     
-    categorias = Categoria.query.filter_by(usuario_id=usuario_id).all()
+    categorias = cache_categorias().listar(usuario_id)
     
     # Formatar data para o input HTML
     data_formatada = transacao.data.strftime('%Y-%m-%d')
@@ -481,87 +459,82 @@ def deletar_transacao(transacao_id):
 
 
 # ========== NOVAS ROTAS - BUSCA E FILTRO ==========
-@dashboard_bp.route('/api/transacoes/buscar', methods=['POST'])
+@dashboard_bp.route('/api/transacoes/buscar', methods=['GET', 'POST'])
+@somente_leitura
 @login_required
+@condicional
 def buscar_transacoes():
-    """API para buscar e filtrar transações (AJAX)"""
+    """API para buscar e filtrar transações (AJAX)
+    
+    Pagina por cursor: a resposta traz 'proximo_cursor', que deve ser
+    reenviado em 'cursor' para obter a página seguinte. Com formato=ndjson
+    todas as transações filtradas são transmitidas, uma por linha. Com
+    ordem=relevancia a busca textual retorna apenas a primeira página,
+    ordenada pelo ranking do FTS5.
+    """
     usuario_id = session.get('usuario_id')
     
-    # Obter parâmetros de filtro
-    descricao = request.json.get('descricao', '').strip()
-    categoria_id = request.json.get('categoria_id', '')
-    tipo = request.json.get('tipo', '')  # 'receita', 'despesa' ou vazio
-    data_inicio = request.json.get('data_inicio', '')
-    data_fim = request.json.get('data_fim', '')
-    
-    # Construir query base
-    query = Transacao.query.filter_by(usuario_id=usuario_id)
-    
-    # Aplicar filtros
-    if descricao:
-        query = query.filter(Transacao.descricao.ilike(f'%{descricao}%'))
+    # Parâmetros via JSON (POST) ou query string (GET)
+    dados = request.get_json(silent=True) or request.args
+    filtros = ler_filtros(dados)
+    stmt = consulta_transacoes(usuario_id, filtros)
     
-    if categoria_id:
-        query = query.filter_by(categoria_id=categoria_id)
+    # Exportação em streaming, lendo o resultado em blocos
+    if dados.get('formato') == 'ndjson':
+        return Response(stream_with_context(exportar(stmt, 'jsonl')), mimetype='application/x-ndjson')
     
-    if tipo:
-        query = query.filter_by(tipo=tipo)
+    limite = ler_limite(dados)
     
-    if data_inicio:
+    cursor = None
+    if dados.get('cursor') and not usa_relevancia(filtros):
+        cursor = dados.get('cursor')
         try:
-            data_inicio_obj = datetime.strptime(data_inicio, '%Y-%m-%d')
-            query = query.filter(Transacao.data >= data_inicio_obj)
+            stmt = aplicar_cursor(stmt, cursor)
         except ValueError:
-            pass
+            return jsonify({'sucesso': False, 'erro': 'Cursor inválido'}), 400
     
-    if data_fim:
-        try:
-            data_fim_obj = datetime.strptime(data_fim, '%Y-%m-%d')
-            # Adicionar 1 dia para incluir todo o dia
-            data_fim_obj = data_fim_obj + timedelta(days=1)
-            query = query.filter(Transacao.data < data_fim_obj)
-        except ValueError:
-            pass
-    
-    # Executar query e ordenar
-    transacoes = query.order_by(Transacao.data.desc()).all()
-    
-    # Formatar resposta
-    resultado = []
-    for t in transacoes:
-        resultado.append({
-            'id': t.id,
-            'descricao': t.descricao,
-            'valor': f"{t.valor:.2f}",
-            'categoria': t.categoria.nome,
-            'tipo': t.tipo,
-            'data': t.data.strftime('%d/%m/%Y'),
-            'data_iso': t.data.strftime('%Y-%m-%d')
-        })
+    # Uma linha a mais para saber se existe próxima página; buscas que só
+    # estreitam a anterior são filtradas na sessão em memória
+    linhas = buscar_pagina(usuario_id, filtros, stmt, limite, cursor)
     
-    return jsonify({
-        'sucesso': True,
-        'total': len(resultado),
-        'transacoes': resultado
-    })
+    return jsonify(montar_pagina(linhas, limite, filtros))
+
+
+@dashboard_bp.route('/api/transacoes/exportar', methods=['GET'])
+@login_required
+def exportar_transacoes():
+    """Exportar o histórico filtrado em CSV (padrão) ou JSONL, em streaming
+    
+    Aceita os mesmos filtros de buscar_transacoes; sem filtros, exporta
+    todas as transações do usuário, mais recentes primeiro.
+    """
+    usuario_id = session.get('usuario_id')
+    formato = request.args.get('formato', 'csv')
+    
+    if formato not in FORMATOS_EXPORTACAO:
+        return jsonify({'sucesso': False, 'erro': 'Formato inválido (use csv ou jsonl)'}), 400
+    
+    filtros = ler_filtros(request.args)
+    filtros['ordem'] = 'data'
+    stmt = consulta_transacoes(usuario_id, filtros)
+    
+    nome_arquivo = f"transacoes_{datetime.utcnow().strftime('%Y%m%d')}.{formato}"
+    return Response(
+        stream_with_context(exportar(stmt, formato)),
+        mimetype=FORMATOS_EXPORTACAO[formato],
+        headers={'Content-Disposition': f'attachment; filename={nome_arquivo}'}
+    )
 
 
 @dashboard_bp.route('/api/categorias/sugeridas', methods=['GET'])
 @login_required
+@condicional
 def categorias_sugeridas():
     """API para obter categorias sugeridas baseado no histórico"""
     usuario_id = session.get('usuario_id')
     
     # Obter as 5 categorias mais usadas
-    categorias_frequentes = db.session.query(
-        Categoria.id,
-        Categoria.nome,
-        db.func.count(Transacao.id).label('uso')
-    ).join(Transacao).filter(
-        Categoria.usuario_id == usuario_id
-    ).group_by(Categoria.id).order_by(
-        db.func.count(Transacao.id).desc()
-    ).limit(5).all()
+    categorias_frequentes = db.session.execute(consulta_categorias_sugeridas(usuario_id)).all()
     
     resultado = [
         {'id': c[0], 'nome': c[1], 'uso': c[2]}
@@ -574,49 +547,95 @@ def categorias_sugeridas():
     })
 
 
-# ========== NOVAS ROTAS - VALIDAÇÕES EM TEMPO REAL ==========
-@transacoes_bp.route('/api/validar/descricao', methods=['POST'])
+# ========== IMPORTAÇÃO DE EXTRATOS ==========
+@transacoes_bp.route('/api/transacoes/importar', methods=['POST'])
 @login_required
-def validar_descricao():
-    """API para validar descrição em tempo real"""
-    descricao = request.json.get('descricao', '').strip()
+def importar_transacoes():
+    """API para importar um extrato CSV ou OFX enviado no campo 'arquivo'
+
+    Campos opcionais: formato (csv/ofx, padrão pela extensão), categoria_id
+    (usada nas linhas sem categoria; obrigatória para OFX) e codificacao.
+    """
+    usuario_id = session.get('usuario_id')
+    arquivo = request.files.get('arquivo')
     
-    erros = []
+    if not arquivo or not arquivo.filename:
+        return jsonify({'sucesso': False, 'erro': 'Envie o extrato no campo arquivo.'}), 400
     
-    if not descricao:
-        erros.append('A descrição é obrigatória')
-    elif len(descricao) < 3:
-        erros.append('A descrição deve ter pelo menos 3 caracteres')
-    elif len(descricao) > 255:
-        erros.append('A descrição não pode ter mais de 255 caracteres')
+    formato = request.form.get('formato') or detectar_formato(arquivo.filename)
     
-    return jsonify({
-        'valido': len(erros) == 0,
-        'erros': erros
-    })
+    try:
+        categoria_id = int(request.form.get('categoria_id') or 0) or None
+    except ValueError:
+        return jsonify({'sucesso': False, 'erro': 'Categoria inválida.'}), 400
+    
+    try:
+        texto = abrir_texto(arquivo.stream, request.form.get('codificacao') or 'utf-8-sig')
+        resultado = importar(usuario_id, texto, formato, categoria_id)
+    except (LookupError, ValueError) as erro:
+        return jsonify({'sucesso': False, 'erro': str(erro)}), 400
+    
+    return jsonify(dict(resultado, sucesso=not resultado['interrompida']))
 
 
-@transacoes_bp.route('/api/validar/valor', methods=['POST'])
+# ========== GRAVAÇÃO EM LOTE ==========
+@transacoes_bp.route('/api/transacoes/lote', methods=['POST'])
 @login_required
-def validar_valor():
-    """API para validar valor em tempo real"""
-    valor_str = request.json.get('valor', '')
+def lote_transacoes():
+    """API para criar, alterar e excluir várias transações com um commit
+
+    Corpo JSON: {"operacoes": [...], "atomico": false} (formato das
+    operações em app/lote.py). A resposta traz o resultado de cada operação
+    na mesma ordem; com atomico=true, nada é gravado se alguma for rejeitada.
+    """
+    usuario_id = session.get('usuario_id')
+    dados = request.get_json(silent=True)
     
-    erros = []
+    if not isinstance(dados, dict) or not isinstance(dados.get('operacoes'), list):
+        return jsonify({'sucesso': False, 'erro': 'Envie as operações em uma lista no campo operacoes.'}), 400
     
-    if not valor_str:
-        erros.append('O valor é obrigatório')
-    else:
-        try:
-            valor = float(valor_str)
-            if valor <= 0:
-                erros.append('O valor deve ser positivo')
-            elif valor > 999999.99:
-                erros.append('O valor é muito alto')
-        except ValueError:
-            erros.append('O valor deve ser um número válido')
+    try:
+        resultado = gravar_lote(usuario_id, dados['operacoes'], atomico=bool(dados.get('atomico')))
+    except ValueError as erro:
+        return jsonify({'sucesso': False, 'erro': str(erro)}), 400
     
-    return jsonify({
-        'valido': len(erros) == 0,
-        'erros': erros
-    })
+    return jsonify(dict(resultado, sucesso=resultado['rejeitadas'] == 0))
+
+
+# ========== VALIDAÇÕES ==========
+@transacoes_bp.app_context_processor
+def injetar_esquema_validacao():
+    """URLs do esquema de validação (versionada) e da validação remota, lidas por static/js/script.js"""
+    return {
+        'url_esquema_validacao': url_for('transacoes.esquema_validacao', versao=VERSAO_ESQUEMA),
+        'url_validar': url_for('transacoes.validar_formulario')
+    }
+
+
+@transacoes_bp.route('/api/validacoes/esquema-<versao>.json', methods=['GET'])
+def esquema_validacao(versao):
+    """Esquema de validação dos formulários (app/validacoes.py)
+
+    A URL contém a versão do esquema, então a resposta pode ficar em cache
+    indefinidamente; versões antigas são redirecionadas para a atual.
+    """
+    if versao != VERSAO_ESQUEMA:
+        return redirect(url_for('transacoes.esquema_validacao', versao=VERSAO_ESQUEMA))
+    
+    resposta = Response(ESQUEMA_JSON, mimetype='application/json')
+    resposta.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resposta
+
+
+@transacoes_bp.route('/api/validar', methods=['POST'])
+@login_required
+def validar_formulario():
+    """API para validar todos os campos de um formulário em uma chamada
+
+    Usada pelo navegador apenas quando o esquema não pôde ser carregado.
+    Corpo JSON: {"formulario": "transacao", "campos": {...}}.
+    """
+    try:
+        return jsonify(validar_requisicao(request.get_json(silent=True)))
+    except ValueError as erro:
+        return jsonify({'sucesso': False, 'erro': str(erro)}), 400
@@ -0,0 +1,50 @@
+"""
+Rotas de análises do histórico (séries temporais para gráficos)
+"""
+
+from flask import Blueprint, request, session, jsonify
+from app.routes import login_required
+from app.analises import serie, ler_data, periodo_padrao, JANELA_PADRAO
+from app.cache import cache_categorias
+from app.condicional import condicional
+from datetime import datetime
+
+analises_bp = Blueprint('analises', __name__)
+
+
+@analises_bp.route('/api/analytics/serie', methods=['GET'])
+@login_required
+@condicional
+def api_serie():
+    """API com a série de receitas, despesas, saldo e despesas por categoria
+
+    Parâmetros: inicio e fim (AAAA-MM-DD, AAAA-MM ou AAAA; padrão: últimos
+    12 meses), granularidade (dia, semana, mes ou ano; padrão mes) e janela
+    das médias móveis (padrão 3 períodos).
+    """
+    usuario_id = session.get('usuario_id')
+    inicio, fim = periodo_padrao(datetime.utcnow().date())
+    
+    try:
+        if request.args.get('inicio'):
+            inicio = ler_data(request.args['inicio'])
+        if request.args.get('fim'):
+            fim = ler_data(request.args['fim'], fim_do_periodo=True)
+        janela = int(request.args.get('janela') or JANELA_PADRAO)
+    except (TypeError, ValueError):
+        return jsonify({'sucesso': False, 'erro': 'Parâmetros inválidos'}), 400
+    
+    if janela < 1:
+        return jsonify({'sucesso': False, 'erro': 'A janela deve ser de pelo menos 1 período'}), 400
+    
+    try:
+        resultado = serie(
+            usuario_id, inicio, fim,
+            granularidade=request.args.get('granularidade', 'mes'),
+            janela=janela,
+            nomes_categorias=cache_categorias().mapa(usuario_id)
+        )
+    except ValueError as erro:
+        return jsonify({'sucesso': False, 'erro': str(erro)}), 400
+    
+    return jsonify(dict(resultado, sucesso=True))
@@ -5,9 +5,15 @@ Implementa CRUD completo para orçamentos com alertas e projeções
 
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash, jsonify
 from app import db
-from app.models import Usuario, Categoria, Transacao, Orcamento
-from datetime import datetime, timedelta
+from app.models import Orcamento
+from app.avaliacao_orcamentos import avaliar_orcamentos, totalizar, payload_resumo, payload_detalhes
+from app.alertas import carregar_alertas
+from app.cache import cache_orcamentos, cache_categorias
+from app.condicional import condicional
+from app.validacoes import validar, primeiro_erro
+from datetime import datetime
 from functools import wraps
+from sqlalchemy.orm import joinedload
 import calendar
 
 orcamentos_bp = Blueprint('orcamentos', __name__)
@@ -38,23 +44,18 @@ def listar_orcamentos():
     ano_atual = hoje.year
     
     # Obter orçamentos do mês atual
-    orcamentos = Orcamento.query.filter_by(
+    orcamentos = Orcamento.query.options(joinedload(Orcamento.categoria)).filter_by(
         usuario_id=usuario_id,
         mes=mes_atual,
         ano=ano_atual
     ).all()
     
     # Obter categorias do usuário
-    categorias = Categoria.query.filter_by(usuario_id=usuario_id).all()
+    categorias = cache_categorias().listar(usuario_id)
     
-    # Calcular resumo
-    total_limite = sum(o.limite for o in orcamentos)
-    total_gasto = sum(o.get_gasto_atual() for o in orcamentos)
-    
-    # Contar status
-    status_ok = len([o for o in orcamentos if o.get_status() == 'ok'])
-    status_aviso = len([o for o in orcamentos if o.get_status() == 'aviso'])
-    status_excedido = len([o for o in orcamentos if o.get_status() == 'excedido'])
+    # Avaliar todos os orçamentos com uma única consulta agrupada
+    resumos = avaliar_orcamentos(orcamentos, hoje)
+    totais = totalizar(resumos.values())
     
     # Informações do mês
     nome_mes = calendar.month_name[mes_atual]
@@ -62,12 +63,13 @@ def listar_orcamentos():
     return render_template(
         'orcamentos.html',
         orcamentos=orcamentos,
+        resumos=resumos,
         categorias=categorias,
-        total_limite=total_limite,
-        total_gasto=total_gasto,
-        status_ok=status_ok,
-        status_aviso=status_aviso,
-        status_excedido=status_excedido,
+        total_limite=totais['total_limite'],
+        total_gasto=totais['total_gasto'],
+        status_ok=totais['status_ok'],
+        status_aviso=totais['status_aviso'],
+        status_excedido=totais['status_excedido'],
         mes=nome_mes,
         ano=ano_atual,
         mes_numero=mes_atual
@@ -81,50 +83,20 @@ def criar_orcamento():
     usuario_id = session.get('usuario_id')
     
     if request.method == 'POST':
-        categoria_id = request.form.get('categoria_id', '')
-        limite = request.form.get('limite', '')
-        alerta_percentual = request.form.get('alerta_percentual', '80')
-        mes = request.form.get('mes', '')
-        ano = request.form.get('ano', '')
-        
-        # Validações
-        if not categoria_id or not limite or not mes or not ano:
-            flash('Todos os campos são obrigatórios.', 'danger')
+        # Validações (regras de app/validacoes.py, as mesmas do navegador)
+        valores, erros = validar('orcamento', request.form)
+        if erros:
+            flash(primeiro_erro(erros), 'danger')
             return redirect(url_for('orcamentos.criar_orcamento'))
         
-        try:
-            categoria_id = int(categoria_id)
-            limite = float(limite)
-            alerta_percentual = float(alerta_percentual)
-            mes = int(mes)
-            ano = int(ano)
-        except ValueError:
-            flash('Valores inválidos.', 'danger')
-            return redirect(url_for('orcamentos.criar_orcamento'))
+        categoria_id, mes, ano = valores['categoria_id'], valores['mes'], valores['ano']
         
         # Validar categoria
-        categoria = Categoria.query.get(categoria_id)
-        if not categoria or categoria.usuario_id != usuario_id:
+        nome_categoria = cache_categorias().nome(usuario_id, categoria_id)
+        if nome_categoria is None:
             flash('Categoria inválida.', 'danger')
             return redirect(url_for('orcamentos.criar_orcamento'))
         
-        # Validar valores
-        if limite <= 0:
-            flash('O limite deve ser positivo.', 'danger')
-            return redirect(url_for('orcamentos.criar_orcamento'))
-        
-        if alerta_percentual < 1 or alerta_percentual > 100:
-            flash('O percentual de alerta deve estar entre 1 e 100.', 'danger')
-            return redirect(url_for('orcamentos.criar_orcamento'))
-        
-        if mes < 1 or mes > 12:
-            flash('Mês inválido.', 'danger')
-            return redirect(url_for('orcamentos.criar_orcamento'))
-        
-        if ano < 2020 or ano > 2100:
-            flash('Ano inválido.', 'danger')
-            return redirect(url_for('orcamentos.criar_orcamento'))
-        
         # Verificar se já existe orçamento para esta categoria/mês/ano
         orcamento_existente = Orcamento.query.filter_by(
             usuario_id=usuario_id,
@@ -143,18 +115,18 @@ def criar_orcamento():
             categoria_id=categoria_id,
             mes=mes,
             ano=ano,
-            limite=limite,
-            alerta_percentual=alerta_percentual
+            limite=valores['limite'],
+            alerta_percentual=valores['alerta_percentual']
         )
         
         db.session.add(novo_orcamento)
         db.session.commit()
         
-        flash(f'Orçamento criado com sucesso para {categoria.nome}!', 'success')
+        flash(f'Orçamento criado com sucesso para {nome_categoria}!', 'success')
         return redirect(url_for('orcamentos.listar_orcamentos'))
     
     # Obter dados para o formulário
-    categorias = Categoria.query.filter_by(usuario_id=usuario_id).all()
+    categorias = cache_categorias().listar(usuario_id)
     hoje = datetime.utcnow()
     
     return render_template(
@@ -178,38 +150,21 @@ def editar_orcamento(orcamento_id):
         return redirect(url_for('orcamentos.listar_orcamentos'))
     
     if request.method == 'POST':
-        limite = request.form.get('limite', '')
-        alerta_percentual = request.form.get('alerta_percentual', '80')
-        
-        # Validações
-        if not limite:
-            flash('O limite é obrigatório.', 'danger')
-            return redirect(url_for('orcamentos.editar_orcamento', orcamento_id=orcamento_id))
-        
-        try:
-            limite = float(limite)
-            alerta_percentual = float(alerta_percentual)
-        except ValueError:
-            flash('Valores inválidos.', 'danger')
-            return redirect(url_for('orcamentos.editar_orcamento', orcamento_id=orcamento_id))
-        
-        if limite <= 0:
-            flash('O limite deve ser positivo.', 'danger')
-            return redirect(url_for('orcamentos.editar_orcamento', orcamento_id=orcamento_id))
-        
-        if alerta_percentual < 1 or alerta_percentual > 100:
-            flash('O percentual de alerta deve estar entre 1 e 100.', 'danger')
+        # Validações (regras de app/validacoes.py, as mesmas do navegador)
+        valores, erros = validar('orcamento_edicao', request.form)
+        if erros:
+            flash(primeiro_erro(erros), 'danger')
             return redirect(url_for('orcamentos.editar_orcamento', orcamento_id=orcamento_id))
         
         # Atualizar orçamento
-        orcamento.limite = limite
-        orcamento.alerta_percentual = alerta_percentual
+        orcamento.limite = valores['limite']
+        orcamento.alerta_percentual = valores['alerta_percentual']
         db.session.commit()
         
         flash('Orçamento atualizado com sucesso!', 'success')
         return redirect(url_for('orcamentos.listar_orcamentos'))
     
-    return render_template('editar_orcamento.html', orcamento=orcamento)
+    return render_template('editar_orcamento.html', orcamento=orcamento, resumo=orcamento.avaliar())
 
 
 @orcamentos_bp.route('/orcamentos/<int:orcamento_id>/deletar', methods=['POST'])
@@ -254,7 +209,7 @@ def historico_orcamentos():
             ano = hoje.year
     
     # Obter orçamentos do período
-    orcamentos = Orcamento.query.filter_by(
+    orcamentos = Orcamento.query.options(joinedload(Orcamento.categoria)).filter_by(
         usuario_id=usuario_id,
         mes=mes,
         ano=ano
@@ -270,19 +225,20 @@ def historico_orcamentos():
     ).all()
     
     # Calcular resumo
-    total_limite = sum(o.limite for o in orcamentos)
-    total_gasto = sum(o.get_gasto_atual() for o in orcamentos)
+    resumos = avaliar_orcamentos(orcamentos, hoje)
+    totais = totalizar(resumos.values())
     
     nome_mes = calendar.month_name[mes]
     
     return render_template(
         'historico_orcamentos.html',
         orcamentos=orcamentos,
+        resumos=resumos,
         mes=nome_mes,
         ano=ano,
         mes_numero=mes,
-        total_limite=total_limite,
-        total_gasto=total_gasto,
+        total_limite=totais['total_limite'],
+        total_gasto=totais['total_gasto'],
         meses_disponiveis=meses_disponiveis
     )
 
@@ -290,40 +246,28 @@ def historico_orcamentos():
 # ========== ROTAS DE API ==========
 @orcamentos_bp.route('/api/orcamentos/resumo', methods=['GET'])
 @login_required
+@condicional
 def api_resumo_orcamentos():
     """API para obter resumo de orçamentos"""
     usuario_id = session.get('usuario_id')
     
     hoje = datetime.utcnow()
     
-    # Obter orçamentos do mês atual
-    orcamentos = Orcamento.query.filter_by(
-        usuario_id=usuario_id,
-        mes=hoje.month,
-        ano=hoje.year
-    ).all()
-    
-    # Calcular resumo
-    total_limite = sum(o.limite for o in orcamentos)
-    total_gasto = sum(o.get_gasto_atual() for o in orcamentos)
-    total_restante = total_limite - total_gasto
-    
-    # Contar status
-    status_ok = len([o for o in orcamentos if o.get_status() == 'ok'])
-    status_aviso = len([o for o in orcamentos if o.get_status() == 'aviso'])
-    status_excedido = len([o for o in orcamentos if o.get_status() == 'excedido'])
+    def calcular():
+        # Obter orçamentos do mês atual
+        orcamentos = Orcamento.query.filter_by(
+            usuario_id=usuario_id,
+            mes=hoje.month,
+            ano=hoje.year
+        ).all()
+        
+        # Calcular resumo com uma única consulta agrupada
+        return payload_resumo(avaliar_orcamentos(orcamentos, hoje, projetar=False).values())
     
-    return jsonify({
-        'sucesso': True,
-        'total_limite': f"{total_limite:.2f}",
-        'total_gasto': f"{total_gasto:.2f}",
-        'total_restante': f"{total_restante:.2f}",
-        'percentual_usado': f"{(total_gasto / total_limite * 100) if total_limite > 0 else 0:.1f}",
-        'status_ok': status_ok,
-        'status_aviso': status_aviso,
-        'status_excedido': status_excedido,
-        'total_orcamentos': len(orcamentos)
-    })
+    # Polling frequente: reaproveitar o resumo até a próxima alteração do mês
+    return jsonify(cache_orcamentos().obter_ou_calcular(
+        'resumo_orcamentos', usuario_id, hoje.month, hoje.year, calcular
+    ))
 
 
 @orcamentos_bp.route('/api/orcamentos/<int:orcamento_id>/detalhes', methods=['GET'])
@@ -337,64 +281,19 @@ def api_detalhes_orcamento(orcamento_id):
     if orcamento.usuario_id != usuario_id:
         return jsonify({'sucesso': False, 'erro': 'Não autorizado'}), 403
     
-    gasto = orcamento.get_gasto_atual()
-    percentual = orcamento.get_percentual_usado()
-    status = orcamento.get_status()
-    projecao = orcamento.get_projecao_gasto()
-    
-    return jsonify({
-        'sucesso': True,
-        'categoria': orcamento.categoria.nome,
-        'limite': f"{orcamento.limite:.2f}",
-        'gasto': f"{gasto:.2f}",
-        'restante': f"{orcamento.get_restante():.2f}",
-        'percentual': f"{percentual:.1f}",
-        'status': status,
-        'projecao': f"{projecao:.2f}",
-        'dias_restantes': orcamento.get_dias_restantes_mes()
-    })
+    return jsonify(payload_detalhes(orcamento.categoria.nome, orcamento.avaliar()))
 
 
 @orcamentos_bp.route('/api/orcamentos/alertas', methods=['GET'])
 @login_required
+@condicional
 def api_alertas_orcamentos():
-    """API para obter alertas de orçamentos"""
+    """API para obter alertas de orçamentos (pré-calculados pelo worker de alertas)"""
     usuario_id = session.get('usuario_id')
     
     hoje = datetime.utcnow()
     
-    # Obter orçamentos do mês atual com status de aviso ou excedido
-    orcamentos = Orcamento.query.filter_by(
-        usuario_id=usuario_id,
-        mes=hoje.month,
-        ano=hoje.year
-    ).all()
-    
-    alertas = []
-    
-    for orcamento in orcamentos:
-        status = orcamento.get_status()
-        
-        if status == 'excedido':
-            gasto = orcamento.get_gasto_atual()
-            excesso = gasto - orcamento.limite
-            alertas.append({
-                'categoria': orcamento.categoria.nome,
-                'tipo': 'excedido',
-                'mensagem': f'Orçamento excedido em R$ {excesso:.2f}',
-                'valor': f"{excesso:.2f}"
-            })
-        elif status == 'aviso':
-            percentual = orcamento.get_percentual_usado()
-            alertas.append({
-                'categoria': orcamento.categoria.nome,
-                'tipo': 'aviso',
-                'mensagem': f'Atingiu {percentual:.0f}% do orçamento',
-                'valor': f"{percentual:.0f}%"
-            })
-    
-    return jsonify({
-        'sucesso': True,
-        'total_alertas': len(alertas),
-        'alertas': alertas
-    })
+    return jsonify(cache_orcamentos().obter_ou_calcular(
+        'alertas_orcamentos', usuario_id, hoje.month, hoje.year,
+        lambda: carregar_alertas(usuario_id, hoje)
+    ))
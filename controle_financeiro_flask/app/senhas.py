@@ -0,0 +1,125 @@
+"""
+Hash de senhas em um pool de threads limitado
+O PBKDF2 de cada login/registro consome centenas de milissegundos de CPU. Os
+cálculos são executados por um pool com no máximo SENHA_CONCORRENCIA threads;
+uma requisição que não consegue vaga em SENHA_TIMEOUT_FILA segundos recebe
+SenhasOcupadas (a rota responde 503), em vez de todas as threads do servidor
+ficarem presas em hashes enquanto o dashboard espera.
+
+SENHA_METODO define os parâmetros dos novos hashes (no formato do Werkzeug,
+ex.: 'pbkdf2:sha256:600000' ou 'scrypt:32768:8:1'). Hashes gravados com
+outros parâmetros são refeitos no próximo login bem-sucedido.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+import os
+import threading
+
+
+METODO_PADRAO = f'pbkdf2:sha256:{DEFAULT_PBKDF2_ITERATIONS}'
+
+# Hashes simultâneos (padrão: um por CPU)
+CONCORRENCIA_PADRAO = os.cpu_count() or 1
+
+# Segundos de espera por uma vaga no pool antes de recusar a requisição
+TIMEOUT_FILA_PADRAO = 5.0
+
+
+class SenhasOcupadas(RuntimeError):
+    """Nenhuma vaga no pool de hash dentro do tempo de espera"""
+
+
+def normalizar_metodo(metodo):
+    """Completar os parâmetros omitidos com os padrões do Werkzeug
+
+    'pbkdf2' e 'pbkdf2:sha256' equivalem a 'pbkdf2:sha256:600000', que é o
+    prefixo gravado no hash; assim a comparação em precisa_rehash não refaz
+    hashes que já usam os parâmetros padrão.
+    """
+    partes = metodo.split(':')
+    if partes[0] == 'pbkdf2':
+        partes += ['sha256', str(DEFAULT_PBKDF2_ITERATIONS)][len(partes) - 1:]
+    elif partes[0] == 'scrypt':
+        partes += ['32768', '8', '1'][len(partes) - 1:]
+    return ':'.join(partes)
+
+
+# ========== POOL ==========
+class PoolSenhas:
+    """Executor de hashes com concorrência e espera limitadas"""
+
+    def __init__(self, metodo=METODO_PADRAO, concorrencia=CONCORRENCIA_PADRAO, timeout_fila=TIMEOUT_FILA_PADRAO):
+        self.metodo = normalizar_metodo(metodo)
+        self.timeout_fila = timeout_fila
+        self.recusados = 0
+        self._executor = ThreadPoolExecutor(max_workers=concorrencia, thread_name_prefix='senhas')
+        # Vagas = threads do pool: nada fica parado na fila interna do executor
+        self._vagas = threading.BoundedSemaphore(concorrencia)
+
+    def executar(self, funcao, *args):
+        """Executar funcao(*args) no pool e aguardar o resultado"""
+        if not self._vagas.acquire(timeout=self.timeout_fila):
+            self.recusados += 1
+            raise SenhasOcupadas('Muitas operações de senha simultâneas')
+        try:
+            return self._executor.submit(funcao, *args).result()
+        finally:
+            self._vagas.release()
+
+    def gerar(self, senha):
+        return self.executar(generate_password_hash, senha, self.metodo)
+
+    def verificar(self, senha_hash, senha):
+        return self.executar(check_password_hash, senha_hash, senha)
+
+    def precisa_rehash(self, senha_hash):
+        """O hash gravado usa parâmetros diferentes de SENHA_METODO?"""
+        return senha_hash.split('$', 1)[0] != self.metodo
+
+    def exportar_metricas(self):
+        """Linhas no formato do Prometheus para /metrics"""
+        return [
+            '# HELP financeiro_senhas_recusadas_total Operações de senha recusadas por falta de vaga no pool.',
+            '# TYPE financeiro_senhas_recusadas_total counter',
+            f'financeiro_senhas_recusadas_total {self.recusados}'
+        ]
+
+
+_pool_padrao = None
+
+
+def pool_senhas():
+    """Pool da app atual; fora de uma app, um pool com a configuração padrão"""
+    global _pool_padrao
+    if has_app_context() and 'senhas' in current_app.extensions:
+        return current_app.extensions['senhas']
+    if _pool_padrao is None:
+        _pool_padrao = PoolSenhas()
+    return _pool_padrao
+
+
+def gerar_hash(senha):
+    return pool_senhas().gerar(senha)
+
+
+def verificar_hash(senha_hash, senha):
+    return pool_senhas().verificar(senha_hash, senha)
+
+
+def precisa_rehash(senha_hash):
+    return pool_senhas().precisa_rehash(senha_hash)
+
+
+def init_senhas(app):
+    """Criar o pool de hash com SENHA_METODO, SENHA_CONCORRENCIA e SENHA_TIMEOUT_FILA"""
+    pool = PoolSenhas(
+        app.config.get('SENHA_METODO', METODO_PADRAO),
+        app.config.get('SENHA_CONCORRENCIA', CONCORRENCIA_PADRAO),
+        app.config.get('SENHA_TIMEOUT_FILA', TIMEOUT_FILA_PADRAO)
+    )
+    app.extensions['senhas'] = pool
+
+    if 'metricas' in app.extensions:
+        app.extensions['metricas'].adicionar_coletor(pool.exportar_metricas)
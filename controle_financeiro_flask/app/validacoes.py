@@ -0,0 +1,214 @@
+"""
+Regras de validação dos formulários, em um esquema declarativo
+O mesmo esquema valida os formulários no servidor (rotas de transações e
+orçamentos, gravação em lote, /api/validar) e é servido ao navegador como
+um documento JSON versionado, avaliado localmente por static/js/script.js a
+cada tecla, sem requisições. A versão é o hash do próprio documento, então
+a URL muda sempre que uma regra muda e o navegador pode guardá-lo em cache
+indefinidamente.
+
+Cada campo tem um tipo (texto, numero, inteiro ou data) e uma lista de
+regras avaliadas em ordem, parando no primeiro erro:
+1. 'obrigatorio': valor vazio (após remover espaços) é erro; sem essa regra,
+   o campo vazio recebe o 'padrao' (ou None) e as demais regras não se aplicam;
+2. a conversão para o tipo, com a mensagem 'mensagem_tipo';
+3. as regras sobre o valor convertido: min_caracteres/max_caracteres
+   (texto, em caracteres Unicode), maior_que, minimo e maximo (números).
+Os 'avisos' usam as mesmas regras, mas apenas informam o usuário.
+"""
+
+from datetime import datetime
+import hashlib
+import json
+import math
+import re
+
+
+CAMPOS = {
+    'descricao': {
+        'tipo': 'texto',
+        'regras': [
+            {'regra': 'obrigatorio', 'mensagem': 'A descrição é obrigatória'},
+            {'regra': 'min_caracteres', 'valor': 3, 'mensagem': 'A descrição deve ter pelo menos 3 caracteres'},
+            {'regra': 'max_caracteres', 'valor': 255, 'mensagem': 'A descrição não pode ter mais de 255 caracteres'},
+        ]
+    },
+    'valor': {
+        'tipo': 'numero',
+        'mensagem_tipo': 'O valor deve ser um número válido',
+        'regras': [
+            {'regra': 'obrigatorio', 'mensagem': 'O valor é obrigatório'},
+            {'regra': 'maior_que', 'valor': 0, 'mensagem': 'O valor deve ser positivo'},
+            {'regra': 'maximo', 'valor': 999999.99, 'mensagem': 'O valor é muito alto'},
+        ],
+        'avisos': [
+            {'regra': 'maximo', 'valor': 10000, 'mensagem': '⚠️ Atenção: Este é um valor muito alto'},
+        ]
+    },
+    'categoria_id': {
+        'tipo': 'inteiro',
+        'mensagem_tipo': 'Categoria inválida',
+        'regras': [
+            {'regra': 'obrigatorio', 'mensagem': 'A categoria é obrigatória'},
+        ]
+    },
+    'data': {
+        'tipo': 'data',
+        'mensagem_tipo': 'Data inválida',
+        'regras': []
+    },
+    'limite': {
+        'tipo': 'numero',
+        'mensagem_tipo': 'O limite deve ser um número válido',
+        'regras': [
+            {'regra': 'obrigatorio', 'mensagem': 'O limite é obrigatório'},
+            {'regra': 'maior_que', 'valor': 0, 'mensagem': 'O limite deve ser positivo'},
+            {'regra': 'maximo', 'valor': 999999.99, 'mensagem': 'O limite é muito alto'},
+        ]
+    },
+    'alerta_percentual': {
+        'tipo': 'numero',
+        'padrao': 80,
+        'mensagem_tipo': 'O percentual de alerta deve ser um número',
+        'regras': [
+            {'regra': 'minimo', 'valor': 1, 'mensagem': 'O percentual de alerta deve estar entre 1 e 100'},
+            {'regra': 'maximo', 'valor': 100, 'mensagem': 'O percentual de alerta deve estar entre 1 e 100'},
+        ]
+    },
+    'mes': {
+        'tipo': 'inteiro',
+        'mensagem_tipo': 'Mês inválido',
+        'regras': [
+            {'regra': 'obrigatorio', 'mensagem': 'O mês é obrigatório'},
+            {'regra': 'minimo', 'valor': 1, 'mensagem': 'Mês inválido'},
+            {'regra': 'maximo', 'valor': 12, 'mensagem': 'Mês inválido'},
+        ]
+    },
+    'ano': {
+        'tipo': 'inteiro',
+        'mensagem_tipo': 'Ano inválido',
+        'regras': [
+            {'regra': 'obrigatorio', 'mensagem': 'O ano é obrigatório'},
+            {'regra': 'minimo', 'valor': 2020, 'mensagem': 'Ano inválido'},
+            {'regra': 'maximo', 'valor': 2100, 'mensagem': 'Ano inválido'},
+        ]
+    },
+}
+
+# Campos de cada formulário, na ordem em que os erros são informados
+FORMULARIOS = {
+    'transacao': ['descricao', 'valor', 'categoria_id', 'data'],
+    'orcamento': ['categoria_id', 'limite', 'alerta_percentual', 'mes', 'ano'],
+    'orcamento_edicao': ['limite', 'alerta_percentual'],
+}
+
+# Documento servido ao navegador e sua versão (muda junto com as regras)
+ESQUEMA_JSON = json.dumps({'campos': CAMPOS, 'formularios': FORMULARIOS}, sort_keys=True, ensure_ascii=False)
+VERSAO_ESQUEMA = hashlib.sha1(ESQUEMA_JSON.encode('utf-8')).hexdigest()[:12]
+
+# Formatos aceitos (os mesmos do avaliador em static/js/script.js)
+NUMERO = re.compile(r'^[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?$', re.ASCII)
+INTEIRO = re.compile(r'^[-+]?\d+$', re.ASCII)
+DATA = re.compile(r'^\d{4}-\d{2}-\d{2}$', re.ASCII)
+
+
+# ========== AVALIAÇÃO ==========
+def _converter(tipo, texto):
+    """Converter o texto não vazio no tipo do campo (ValueError se inválido)"""
+    if tipo == 'texto':
+        return texto
+    if tipo == 'numero':
+        if not NUMERO.match(texto):
+            raise ValueError(texto)
+        numero = float(texto)
+        if not math.isfinite(numero):
+            raise ValueError(texto)
+        return numero
+    if tipo == 'inteiro':
+        if not INTEIRO.match(texto):
+            raise ValueError(texto)
+        return int(texto)
+    if tipo == 'data':
+        if not DATA.match(texto):
+            raise ValueError(texto)
+        return datetime.strptime(texto, '%Y-%m-%d')
+    raise ValueError(f'Tipo desconhecido: {tipo}')
+
+
+def _viola(regra, valor):
+    nome, limite = regra['regra'], regra.get('valor')
+    if nome == 'min_caracteres':
+        return len(valor) < limite
+    if nome == 'max_caracteres':
+        return len(valor) > limite
+    if nome == 'maior_que':
+        return valor <= limite
+    if nome == 'minimo':
+        return valor < limite
+    if nome == 'maximo':
+        return valor > limite
+    raise ValueError(f'Regra desconhecida: {nome}')
+
+
+def validar_campo(nome, valor):
+    """Validar um campo do esquema; retorna (valor convertido, [erros])"""
+    campo = CAMPOS[nome]
+    texto = valor.strip() if isinstance(valor, str) else ('' if valor is None else str(valor))
+    regras = campo['regras']
+
+    if not texto:
+        obrigatorio = next((r for r in regras if r['regra'] == 'obrigatorio'), None)
+        if obrigatorio:
+            return None, [obrigatorio['mensagem']]
+        return campo.get('padrao'), []
+
+    try:
+        convertido = _converter(campo['tipo'], texto)
+    except (TypeError, ValueError):
+        return None, [campo['mensagem_tipo']]
+
+    for regra in regras:
+        if regra['regra'] != 'obrigatorio' and _viola(regra, convertido):
+            return None, [regra['mensagem']]
+    return convertido, []
+
+
+def validar(campos, dados):
+    """Validar os campos (nome de formulário ou lista de campos) de dados
+
+    Retorna (valores convertidos, {campo: [erros]}) com apenas os campos
+    inválidos no segundo dicionário.
+    """
+    if isinstance(campos, str):
+        campos = FORMULARIOS[campos]
+
+    valores, erros = {}, {}
+    for nome in campos:
+        valores[nome], erros_campo = validar_campo(nome, dados.get(nome))
+        if erros_campo:
+            erros[nome] = erros_campo
+    return valores, erros
+
+
+def primeiro_erro(erros):
+    """Primeira mensagem de erro (para flash), com ponto final"""
+    for mensagens in erros.values():
+        return mensagens[0] + '.'
+    return None
+
+
+def validar_requisicao(dados):
+    """Resposta de /api/validar para o corpo {"formulario", "campos"}
+
+    Sem formulario, valida os campos enviados que existem no esquema.
+    ValueError se o formulário não existe.
+    """
+    dados = dados if isinstance(dados, dict) else {}
+    campos = dados.get('campos') if isinstance(dados.get('campos'), dict) else {}
+    formulario = dados.get('formulario')
+
+    if formulario is not None and formulario not in FORMULARIOS:
+        raise ValueError('Formulário desconhecido')
+
+    _, erros = validar(formulario or [nome for nome in campos if nome in CAMPOS], campos)
+    return {'valido': len(erros) == 0, 'erros': erros}
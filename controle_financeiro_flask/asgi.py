@@ -0,0 +1,11 @@
+"""
+Ponto de entrada ASGI: API JSON assíncrona sobre a app Flask
+
+Executar com: uvicorn asgi:app
+(as rotas fora da API assíncrona exigem o pacote asgiref; ver app/api_async.py)
+"""
+
+from app import create_app
+from app.api_async import criar_api_assincrona
+
+app = criar_api_assincrona(create_app())
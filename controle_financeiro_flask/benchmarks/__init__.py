@@ -0,0 +1,5 @@
+"""
+Benchmarks do Controle Financeiro Pessoal
+Gera uma massa de dados determinística e mede as rotas da aplicação pelo
+test client do Flask. Executar com: python -m benchmarks.rotas --help
+"""
@@ -0,0 +1,71 @@
+"""
+Comparação entre dois relatórios de benchmarks.rotas
+Mostra, por rota, a variação de p50/p95, consultas e pico de memória e
+termina com código 1 quando alguma rota piorou além da tolerância.
+
+Uso: python -m benchmarks.comparar antes.json depois.json [--tolerancia 20]
+"""
+
+import argparse
+import json
+import sys
+
+
+METRICAS = ('p50_ms', 'p95_ms', 'consultas', 'memoria_pico_kb')
+
+
+def variacao(antes, depois):
+    """Variação percentual de antes para depois"""
+    if not antes:
+        return 0.0 if not depois else float('inf')
+    return (depois - antes) / antes * 100
+
+
+def comparar(antes, depois, tolerancia):
+    """Retornar as linhas da comparação e a lista de regressões"""
+    linhas = []
+    regressoes = []
+    for rota in sorted(set(antes['rotas']) & set(depois['rotas'])):
+        a, d = antes['rotas'][rota], depois['rotas'][rota]
+        colunas = []
+        for metrica in METRICAS:
+            delta = variacao(a[metrica], d[metrica])
+            colunas.append(f'{metrica}={a[metrica]}→{d[metrica]} ({delta:+.0f}%)')
+            # Consultas a mais são regressão mesmo abaixo da tolerância
+            if (metrica == 'consultas' and d[metrica] > a[metrica]) or (
+                    metrica != 'consultas' and delta > tolerancia):
+                regressoes.append((rota, metrica, delta))
+        linhas.append(f'{rota:45} ' + '  '.join(colunas))
+    return linhas, regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Comparar dois relatórios de benchmark')
+    parser.add_argument('antes')
+    parser.add_argument('depois')
+    parser.add_argument('--tolerancia', type=float, default=20.0,
+                        help='Piora percentual aceita em latência e memória')
+    args = parser.parse_args(argv)
+
+    with open(args.antes, encoding='utf-8') as arquivo:
+        antes = json.load(arquivo)
+    with open(args.depois, encoding='utf-8') as arquivo:
+        depois = json.load(arquivo)
+
+    if antes.get('parametros') != depois.get('parametros'):
+        print('Aviso: os relatórios foram gerados com parâmetros diferentes.', file=sys.stderr)
+
+    print(f"{antes.get('commit')} → {depois.get('commit')}")
+    linhas, regressoes = comparar(antes, depois, args.tolerancia)
+    for linha in linhas:
+        print(linha)
+
+    if regressoes:
+        print('\nRegressões:')
+        for rota, metrica, delta in regressoes:
+            print(f'  {rota}: {metrica} {delta:+.0f}%')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
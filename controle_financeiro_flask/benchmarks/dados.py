@@ -0,0 +1,143 @@
+"""
+Gerador determinístico de dados sintéticos
+Cria usuários, categorias, receitas/despesas distribuídas ao longo de vários
+anos e orçamentos mensais. A mesma semente gera sempre o mesmo banco, para que
+resultados de commits diferentes possam ser comparados.
+"""
+
+from app import db
+from app.models import Usuario, Categoria, Transacao, Orcamento
+from app.agregados import comandos_reconstrucao
+from datetime import datetime, timedelta
+from werkzeug.security import generate_password_hash
+import random
+
+
+# Senha de todos os usuários gerados
+SENHA_PADRAO = 'benchmark123'
+
+# Inserções por comando executemany
+TAMANHO_LOTE = 10000
+
+DESCRICOES_DESPESA = [
+    'Supermercado', 'Padaria', 'Farmácia', 'Combustível', 'Aluguel', 'Energia elétrica',
+    'Internet', 'Restaurante', 'Cinema', 'Academia', 'Uber', 'Manutenção do carro'
+]
+DESCRICOES_RECEITA = ['Salário', 'Freelance', 'Dividendos', 'Reembolso', 'Venda']
+NOMES_CATEGORIA = [
+    'Alimentação', 'Transporte', 'Moradia', 'Saúde', 'Lazer', 'Educação',
+    'Salário', 'Investimentos', 'Vestuário', 'Serviços', 'Viagens', 'Outros'
+]
+
+
+def email_usuario(indice):
+    """Email do usuário gerado na posição indice (começando em 0)"""
+    return f'usuario{indice}@benchmark.local'
+
+
+def _inserir_em_lotes(conn, tabela, linhas):
+    """Inserir um iterável de dicionários em lotes de TAMANHO_LOTE"""
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= TAMANHO_LOTE:
+            conn.execute(tabela.insert(), lote)
+            lote = []
+    if lote:
+        conn.execute(tabela.insert(), lote)
+
+
+def gerar(engine, usuarios=2, categorias=8, transacoes=100000, anos=3, meses_orcamento=12, semente=42, hoje=None):
+    """Popular o banco com a massa sintética e retornar um resumo do que foi criado
+
+    As transações são repartidas igualmente entre os usuários, com datas
+    uniformes nos últimos `anos` anos. Cada categoria de cada usuário recebe
+    um orçamento por mês nos últimos `meses_orcamento` meses.
+    """
+    aleatorio = random.Random(semente)
+    hoje = hoje or datetime.utcnow().replace(microsecond=0)
+    inicio = hoje - timedelta(days=365 * anos)
+    segundos = int((hoje - inicio).total_seconds())
+
+    senha_hash = generate_password_hash(SENHA_PADRAO)
+
+    with engine.begin() as conn:
+        _inserir_em_lotes(conn, Usuario.__table__, (
+            {
+                'nome': f'Usuário {i}',
+                'email': email_usuario(i),
+                'senha_hash': senha_hash,
+                'data_criacao': inicio
+            }
+            for i in range(usuarios)
+        ))
+        usuario_ids = list(conn.execute(
+            db.select(Usuario.id).where(Usuario.email.like('%@benchmark.local')).order_by(Usuario.id)
+        ).scalars())
+
+        _inserir_em_lotes(conn, Categoria.__table__, (
+            {
+                'nome': NOMES_CATEGORIA[j % len(NOMES_CATEGORIA)] + ('' if j < len(NOMES_CATEGORIA) else f' {j}'),
+                'usuario_id': usuario_id,
+                'data_criacao': inicio
+            }
+            for usuario_id in usuario_ids
+            for j in range(categorias)
+        ))
+        categorias_por_usuario = {}
+        for categoria_id, usuario_id in conn.execute(
+            db.select(Categoria.id, Categoria.usuario_id).where(Categoria.usuario_id.in_(usuario_ids)).order_by(Categoria.id)
+        ):
+            categorias_por_usuario.setdefault(usuario_id, []).append(categoria_id)
+
+        def linhas_transacoes():
+            for i in range(transacoes):
+                usuario_id = usuario_ids[i % len(usuario_ids)]
+                receita = aleatorio.random() < 0.2
+                descricoes = DESCRICOES_RECEITA if receita else DESCRICOES_DESPESA
+                yield {
+                    'descricao': f'{aleatorio.choice(descricoes)} {aleatorio.randint(1, 500)}',
+                    'valor_centavos': round(aleatorio.uniform(5, 3000 if receita else 400) * 100),
+                    'data': inicio + timedelta(seconds=aleatorio.randrange(segundos)),
+                    'tipo': 'receita' if receita else 'despesa',
+                    'usuario_id': usuario_id,
+                    'categoria_id': aleatorio.choice(categorias_por_usuario[usuario_id])
+                }
+
+        _inserir_em_lotes(conn, Transacao.__table__, linhas_transacoes())
+
+        def periodos():
+            ano, mes = hoje.year, hoje.month
+            for _ in range(meses_orcamento):
+                yield mes, ano
+                mes, ano = (12, ano - 1) if mes == 1 else (mes - 1, ano)
+
+        _inserir_em_lotes(conn, Orcamento.__table__, (
+            {
+                'usuario_id': usuario_id,
+                'categoria_id': categoria_id,
+                'mes': mes,
+                'ano': ano,
+                'limite_centavos': aleatorio.randrange(300, 3000, 50) * 100,
+                'alerta_percentual': 80.0,
+                'data_criacao': inicio,
+                'data_atualizacao': inicio
+            }
+            for usuario_id in usuario_ids
+            for categoria_id in categorias_por_usuario[usuario_id]
+            for mes, ano in periodos()
+        ))
+
+        # Inserções em massa não passam pelos eventos da sessão
+        remover, inserir = comandos_reconstrucao()
+        conn.execute(remover)
+        conn.execute(inserir)
+
+    return {
+        'usuarios': len(usuario_ids),
+        'categorias_por_usuario': categorias,
+        'transacoes': transacoes,
+        'anos': anos,
+        'meses_orcamento': meses_orcamento,
+        'semente': semente
+    }
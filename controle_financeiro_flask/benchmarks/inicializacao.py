@@ -0,0 +1,122 @@
+"""
+Benchmark do tempo de inicialização
+Cada medição roda em um processo Python novo (como um worker pré-fork ou um
+comando da CLI): mede a importação do pacote app, o create_app sobre um banco
+já migrado e a primeira requisição, com os blueprints carregados na criação
+da app e na primeira requisição (BLUEPRINTS_PREGUICOSOS). Informa as medianas
+e o tempo total do processo, em JSON.
+
+Uso:
+    python -m benchmarks.inicializacao --repeticoes 10 --saida inicio.json
+"""
+
+from app import create_app
+from benchmarks.rotas import percentil, versao_codigo
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+
+# Executado em cada processo filho; imprime as medições em JSON
+SCRIPT_FILHO = '''
+import json, sys, time
+inicio = time.perf_counter()
+from app import create_app
+importado = time.perf_counter()
+app = create_app({config!r}, perfil={perfil!r})
+criado = time.perf_counter()
+modulos = len(sys.modules)
+status = app.test_client().get('/login').status_code
+respondido = time.perf_counter()
+print(json.dumps({{
+    'import_ms': (importado - inicio) * 1000,
+    'create_app_ms': (criado - importado) * 1000,
+    'primeira_requisicao_ms': (respondido - criado) * 1000,
+    'modulos_apos_create_app': modulos,
+    'status': status
+}}))
+'''
+
+# Cenários: (nome, configuração extra)
+CENARIOS = (
+    ('blueprints na criação da app', {'BLUEPRINTS_PREGUICOSOS': False}),
+    ('blueprints na primeira requisição', {'BLUEPRINTS_PREGUICOSOS': True}),
+)
+
+
+def medir(caminho_banco, perfil, extra):
+    """Executar um processo filho e retornar as medições e o tempo total"""
+    config = dict(extra, SQLALCHEMY_DATABASE_URI=f'sqlite:///{caminho_banco}', MIGRAR_AO_INICIAR=False)
+    inicio = time.perf_counter()
+    resultado = subprocess.run(
+        [sys.executable, '-c', SCRIPT_FILHO.format(config=config, perfil=perfil)],
+        capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    total = (time.perf_counter() - inicio) * 1000
+    medicoes = json.loads(resultado.stdout.strip().splitlines()[-1])
+    medicoes['processo_ms'] = total
+    return medicoes
+
+
+def _resumo(amostras):
+    resumo = {}
+    for chave in ('import_ms', 'create_app_ms', 'primeira_requisicao_ms', 'processo_ms'):
+        valores = sorted(a[chave] for a in amostras)
+        resumo[chave] = {'p50': round(percentil(valores, 50), 2), 'max': round(valores[-1], 2)}
+    resumo['modulos_apos_create_app'] = amostras[-1]['modulos_apos_create_app']
+    resumo['status_primeira_requisicao'] = amostras[-1]['status']
+    return resumo
+
+
+def executar(args):
+    diretorio = tempfile.mkdtemp(prefix='benchmark_inicio_')
+    caminho_banco = os.path.join(diretorio, 'benchmark.db')
+
+    # Banco já migrado: a inicialização só compara a versão do esquema
+    create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}'})
+
+    resultados = {}
+    for nome, extra in CENARIOS:
+        amostras = [medir(caminho_banco, args.perfil, extra) for _ in range(args.repeticoes)]
+        resultados[nome] = _resumo(amostras)
+        if args.verbose:
+            r = resultados[nome]
+            print(f"{nome:35} import={r['import_ms']['p50']:7.1f}ms create_app={r['create_app_ms']['p50']:7.1f}ms "
+                  f"1a requisição={r['primeira_requisicao_ms']['p50']:7.1f}ms processo={r['processo_ms']['p50']:7.1f}ms",
+                  file=sys.stderr)
+
+    return {
+        'commit': versao_codigo(),
+        'data_execucao': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'parametros': {'perfil': args.perfil, 'repeticoes': args.repeticoes},
+        'cenarios': resultados
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark da inicialização do Controle Financeiro')
+    parser.add_argument('--perfil', default='producao', help='Perfil de configuração (app/configuracao.py)')
+    parser.add_argument('--repeticoes', type=int, default=10, help='Processos medidos por cenário')
+    parser.add_argument('--saida', default=None, help='Gravar o JSON neste arquivo em vez da saída padrão')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Mostrar o progresso em stderr')
+    args = parser.parse_args(argv)
+
+    relatorio = json.dumps(executar(args), indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(relatorio + '\n')
+    else:
+        print(relatorio)
+
+
+if __name__ == '__main__':
+    main()
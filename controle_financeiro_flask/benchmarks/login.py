@@ -0,0 +1,156 @@
+"""
+Benchmark de uma rajada de logins
+Várias threads fazem login sem parar enquanto outra thread, já autenticada,
+consulta o dashboard e a API de resumo. Para cada valor de
+SENHA_CONCORRENCIA informado, mede os logins por segundo, a latência dos
+logins e os percentis das outras rotas durante a rajada, em JSON.
+
+Uso:
+    python -m benchmarks.login --concorrencia 1 2 8 --threads-login 16
+"""
+
+from app import create_app, db
+from benchmarks.dados import gerar, email_usuario, SENHA_PADRAO
+from benchmarks.rotas import percentil, versao_codigo
+from datetime import datetime
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import threading
+import time
+
+
+# Rotas consultadas pelo usuário já autenticado durante a rajada
+ROTAS_LEITURA = ('/', '/api/orcamentos/resumo')
+
+
+def _resumo(latencias):
+    latencias = sorted(latencias)
+    return {
+        'requisicoes': len(latencias),
+        'p50_ms': round(percentil(latencias, 50), 3),
+        'p99_ms': round(percentil(latencias, 99), 3)
+    }
+
+
+def rajada(caminho_banco, concorrencia, args):
+    """Executar a rajada com o pool limitado a `concorrencia` hashes simultâneos"""
+    app = create_app({
+        'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}',
+        'SENHA_CONCORRENCIA': concorrencia,
+        'SENHA_TIMEOUT_FILA': args.timeout_fila
+    })
+    with app.app_context():
+        from app.models import Usuario
+        usuario = Usuario.query.filter_by(email=email_usuario(0)).one()
+
+    parar = threading.Event()
+    logins = []
+    status_login = {}
+    leituras = {rota: [] for rota in ROTAS_LEITURA}
+    lock = threading.Lock()
+
+    def fazer_logins(indice):
+        cliente = app.test_client()
+        dados = {'email': email_usuario(indice % args.usuarios), 'senha': SENHA_PADRAO}
+        while not parar.is_set():
+            inicio = time.perf_counter()
+            resposta = cliente.post('/login', data=dados)
+            duracao = (time.perf_counter() - inicio) * 1000
+            with lock:
+                logins.append(duracao)
+                status_login[resposta.status_code] = status_login.get(resposta.status_code, 0) + 1
+
+    def ler_rotas():
+        cliente = app.test_client()
+        with cliente.session_transaction() as sessao:
+            sessao['usuario_id'] = usuario.id
+            sessao['usuario_nome'] = usuario.nome
+        while not parar.is_set():
+            for rota in ROTAS_LEITURA:
+                inicio = time.perf_counter()
+                cliente.get(rota).close()
+                leituras[rota].append((time.perf_counter() - inicio) * 1000)
+            time.sleep(args.intervalo_leitura)
+
+    threads = [threading.Thread(target=fazer_logins, args=(i,)) for i in range(args.threads_login)]
+    threads.append(threading.Thread(target=ler_rotas))
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duracao)
+    parar.set()
+    for thread in threads:
+        thread.join()
+    decorrido = time.perf_counter() - inicio
+
+    sucesso = status_login.get(302, 0)
+    return {
+        'logins_por_segundo': round(sucesso / decorrido, 2),
+        'login': dict(_resumo(logins), status={str(k): v for k, v in sorted(status_login.items())}),
+        'rotas': {rota: _resumo(valores) for rota, valores in leituras.items()}
+    }
+
+
+def executar(args):
+    diretorio = tempfile.mkdtemp(prefix='benchmark_login_')
+    caminho_banco = os.path.join(diretorio, 'benchmark.db')
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}'})
+    with app.app_context():
+        gerar(db.engine, usuarios=args.usuarios, transacoes=args.transacoes, semente=args.semente)
+
+    resultados = {}
+    for concorrencia in args.concorrencia:
+        resultados[str(concorrencia)] = rajada(caminho_banco, concorrencia, args)
+        if args.verbose:
+            r = resultados[str(concorrencia)]
+            rotas = ' '.join(f"{rota} p99={v['p99_ms']:.1f}ms" for rota, v in r['rotas'].items())
+            print(f"concorrencia={concorrencia:3} logins/s={r['logins_por_segundo']:7.2f} "
+                  f"login p99={r['login']['p99_ms']:9.1f}ms {rotas}", file=sys.stderr)
+
+    return {
+        'commit': versao_codigo(),
+        'data_execucao': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'parametros': {
+            'threads_login': args.threads_login,
+            'duracao_s': args.duracao,
+            'timeout_fila_s': args.timeout_fila,
+            'usuarios': args.usuarios,
+            'transacoes': args.transacoes
+        },
+        'concorrencia': resultados
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de logins simultâneos do Controle Financeiro')
+    parser.add_argument('--concorrencia', type=int, nargs='+', default=[1, os.cpu_count() or 1, 16],
+                        help='Valores de SENHA_CONCORRENCIA a comparar')
+    parser.add_argument('--threads-login', type=int, default=16, help='Threads fazendo login ao mesmo tempo')
+    parser.add_argument('--duracao', type=float, default=10.0, help='Segundos de rajada por configuração')
+    parser.add_argument('--timeout-fila', type=float, default=5.0, help='SENHA_TIMEOUT_FILA')
+    parser.add_argument('--intervalo-leitura', type=float, default=0.05,
+                        help='Pausa (s) entre as consultas do usuário autenticado')
+    parser.add_argument('--usuarios', type=int, default=4)
+    parser.add_argument('--transacoes', type=int, default=20000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=None, help='Gravar o JSON neste arquivo em vez da saída padrão')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Mostrar o progresso em stderr')
+    args = parser.parse_args(argv)
+
+    relatorio = json.dumps(executar(args), indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(relatorio + '\n')
+    else:
+        print(relatorio)
+
+
+if __name__ == '__main__':
+    main()
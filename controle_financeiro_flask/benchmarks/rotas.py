@@ -0,0 +1,260 @@
+"""
+Benchmark das rotas da aplicação
+Cria um banco temporário com benchmarks.dados, autentica um usuário gerado e
+executa cada cenário pelo test client do Flask. Para cada rota informa os
+percentis de latência (p50/p95/p99), a quantidade de consultas SQL por
+requisição e o pico de memória alocada, em JSON.
+
+Uso:
+    python -m benchmarks.rotas --transacoes 1000000 --saida resultado.json
+    python -m benchmarks.comparar antes.json depois.json
+"""
+
+from app import create_app, db
+from benchmarks.dados import gerar, email_usuario, SENHA_PADRAO
+from datetime import datetime
+from sqlalchemy import event
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+# ========== CENÁRIOS ==========
+def cenarios(hoje, categoria_id, transacao_id, orcamento_id):
+    """Lista de (nome, metodo, url, função que gera os kwargs da requisição)
+
+    A função recebe o número da repetição, para que os cenários de criação
+    usem dados diferentes a cada chamada.
+    """
+    data = hoje.strftime('%Y-%m-%d')
+
+    def sem_dados(i):
+        return {}
+
+    def nova_transacao(i):
+        return {'data': {
+            'descricao': f'Benchmark {i}',
+            'valor': f'{10 + i % 90}.50',
+            'categoria_id': str(categoria_id),
+            'data': data
+        }}
+
+    def editar_transacao(i):
+        return {'data': {
+            'descricao': f'Supermercado editado {i}',
+            'valor': f'{20 + i % 50}.00',
+            'categoria_id': str(categoria_id),
+            'data': data
+        }}
+
+    def criar_orcamento(i):
+        # Períodos futuros distintos para não repetir categoria/mês/ano
+        return {'data': {
+            'categoria_id': str(categoria_id),
+            'limite': '1500',
+            'alerta_percentual': '80',
+            'mes': str(i % 12 + 1),
+            'ano': str(hoje.year + 1 + i // 12)
+        }}
+
+    def editar_orcamento(i):
+        return {'data': {'limite': f'{1000 + i}', 'alerta_percentual': '75'}}
+
+    def login(i):
+        return {'data': {'email': email_usuario(0), 'senha': SENHA_PADRAO}}
+
+    return [
+        ('auth.login', 'post', '/login', login),
+        ('dashboard.home', 'get', '/', sem_dados),
+        ('dashboard.home pagina 5', 'get', '/?pagina=5', sem_dados),
+        ('dashboard.buscar_transacoes', 'get', '/api/transacoes/buscar', sem_dados),
+        ('dashboard.buscar_transacoes descricao', 'get', '/api/transacoes/buscar?descricao=super', sem_dados),
+        ('dashboard.buscar_transacoes filtros', 'post', '/api/transacoes/buscar',
+         lambda i: {'json': {'tipo': 'despesa', 'categoria_id': categoria_id, 'data_inicio': f'{hoje.year}-01-01'}}),
+        ('dashboard.buscar_transacoes ndjson', 'get', '/api/transacoes/buscar?formato=ndjson', sem_dados),
+        ('dashboard.categorias_sugeridas', 'get', '/api/categorias/sugeridas', sem_dados),
+        ('categorias.listar_categorias', 'get', '/categorias', sem_dados),
+        ('transacoes.nova_receita', 'get', '/receita/nova', sem_dados),
+        ('transacoes.nova_receita POST', 'post', '/receita/nova', nova_transacao),
+        ('transacoes.nova_despesa POST', 'post', '/despesa/nova', nova_transacao),
+        ('transacoes.editar_transacao', 'get', f'/transacao/{transacao_id}/editar', sem_dados),
+        ('transacoes.editar_transacao POST', 'post', f'/transacao/{transacao_id}/editar', editar_transacao),
+        ('transacoes.validar_formulario', 'post', '/api/validar',
+         lambda i: {'json': {'formulario': 'transacao', 'campos': {'descricao': 'Supermercado', 'valor': '123.45',
+                                                                   'categoria_id': str(categoria_id)}}}),
+        ('orcamentos.listar_orcamentos', 'get', '/orcamentos', sem_dados),
+        ('orcamentos.historico_orcamentos', 'get', '/orcamentos/historico', sem_dados),
+        ('orcamentos.api_resumo_orcamentos', 'get', '/api/orcamentos/resumo', sem_dados),
+        ('orcamentos.api_alertas_orcamentos', 'get', '/api/orcamentos/alertas', sem_dados),
+        ('orcamentos.api_detalhes_orcamento', 'get', f'/api/orcamentos/{orcamento_id}/detalhes', sem_dados),
+        ('orcamentos.criar_orcamento', 'get', '/orcamentos/criar', sem_dados),
+        ('orcamentos.criar_orcamento POST', 'post', '/orcamentos/criar', criar_orcamento),
+        ('orcamentos.editar_orcamento', 'get', f'/orcamentos/{orcamento_id}/editar', sem_dados),
+        ('orcamentos.editar_orcamento POST', 'post', f'/orcamentos/{orcamento_id}/editar', editar_orcamento),
+        ('analises.api_serie', 'get', '/api/analytics/serie', sem_dados),
+        ('analises.api_serie 3 anos por semana', 'get',
+         f'/api/analytics/serie?granularidade=semana&inicio={hoje.year - 3}-{hoje.month:02d}', sem_dados),
+    ]
+
+
+# ========== MEDIÇÃO ==========
+def percentil(valores, p):
+    """Percentil pelo método do posto mais próximo (valores já ordenados)"""
+    if not valores:
+        return 0.0
+    posicao = max(int(round(p / 100 * len(valores) + 0.5)) - 1, 0)
+    return valores[min(posicao, len(valores) - 1)]
+
+
+def medir(cliente, contador, metodo, url, gerar_kwargs, repeticoes, aquecimento, sequencia):
+    """Executar um cenário e retornar latências, consultas e pico de memória"""
+    chamar = getattr(cliente, metodo)
+
+    for _ in range(aquecimento):
+        chamar(url, **gerar_kwargs(next(sequencia))).close()
+
+    latencias = []
+    consultas = []
+    status = set()
+    for _ in range(repeticoes):
+        kwargs = gerar_kwargs(next(sequencia))
+        contador['consultas'] = 0
+        inicio = time.perf_counter()
+        resposta = chamar(url, **kwargs)
+        resposta.get_data()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(contador['consultas'])
+        status.add(resposta.status_code)
+        resposta.close()
+
+    # O rastreamento de memória deixa a execução mais lenta: medir à parte
+    tracemalloc.start()
+    resposta = chamar(url, **gerar_kwargs(next(sequencia)))
+    resposta.get_data()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resposta.close()
+
+    latencias.sort()
+    return {
+        'p50_ms': round(percentil(latencias, 50), 3),
+        'p95_ms': round(percentil(latencias, 95), 3),
+        'p99_ms': round(percentil(latencias, 99), 3),
+        'media_ms': round(sum(latencias) / len(latencias), 3),
+        'consultas': max(consultas),
+        'memoria_pico_kb': round(pico / 1024, 1),
+        'status': sorted(status)
+    }
+
+
+def versao_codigo():
+    """Commit atual do repositório, quando disponível"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def executar(args):
+    """Gerar o banco, executar todos os cenários e retornar o relatório"""
+    diretorio = tempfile.mkdtemp(prefix='benchmark_financeiro_')
+    caminho_banco = args.banco or os.path.join(diretorio, 'benchmark.db')
+
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}'})
+    hoje = datetime.utcnow().replace(microsecond=0)
+
+    contador = {'consultas': 0}
+    with app.app_context():
+        inicio = time.perf_counter()
+        parametros = gerar(
+            db.engine,
+            usuarios=args.usuarios,
+            categorias=args.categorias,
+            transacoes=args.transacoes,
+            anos=args.anos,
+            meses_orcamento=args.meses_orcamento,
+            semente=args.semente,
+            hoje=hoje
+        )
+        tempo_geracao = time.perf_counter() - inicio
+
+        @event.listens_for(db.engine, 'before_cursor_execute')
+        def contar(conn, cursor, statement, parameters, context, executemany):
+            contador['consultas'] += 1
+
+        # Alvos das rotas com id: primeiros registros do usuário 0
+        from app.models import Usuario, Categoria, Transacao, Orcamento
+        usuario = Usuario.query.filter_by(email=email_usuario(0)).one()
+        categoria_id = Categoria.query.filter_by(usuario_id=usuario.id).order_by(Categoria.id).first().id
+        transacao_id = Transacao.query.filter_by(usuario_id=usuario.id).order_by(Transacao.id).first().id
+        orcamento_id = Orcamento.query.filter_by(usuario_id=usuario.id).order_by(Orcamento.id).first().id
+
+    cliente = app.test_client()
+    with cliente.session_transaction() as sessao:
+        sessao['usuario_id'] = usuario.id
+        sessao['usuario_nome'] = usuario.nome
+
+    sequencia = itertools.count()
+    resultados = {}
+    for nome, metodo, url, gerar_kwargs in cenarios(hoje, categoria_id, transacao_id, orcamento_id):
+        if args.filtro and args.filtro not in nome:
+            continue
+        resultados[nome] = medir(
+            cliente, contador, metodo, url, gerar_kwargs,
+            args.repeticoes, args.aquecimento, sequencia
+        )
+        if args.verbose:
+            r = resultados[nome]
+            print(f"{nome:45} p50={r['p50_ms']:9.2f}ms p95={r['p95_ms']:9.2f}ms "
+                  f"consultas={r['consultas']:3} pico={r['memoria_pico_kb']:9.1f}KB", file=sys.stderr)
+
+    return {
+        'commit': versao_codigo(),
+        'data_execucao': datetime.utcnow().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'parametros': dict(parametros, repeticoes=args.repeticoes, aquecimento=args.aquecimento),
+        'tempo_geracao_s': round(tempo_geracao, 2),
+        'rotas': resultados
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark das rotas do Controle Financeiro')
+    parser.add_argument('--usuarios', type=int, default=2)
+    parser.add_argument('--categorias', type=int, default=8, help='Categorias por usuário')
+    parser.add_argument('--transacoes', type=int, default=100000, help='Total de receitas e despesas')
+    parser.add_argument('--anos', type=int, default=3, help='Período coberto pelas transações')
+    parser.add_argument('--meses-orcamento', type=int, default=12, help='Meses com orçamento por categoria')
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=50, help='Requisições medidas por rota')
+    parser.add_argument('--aquecimento', type=int, default=3, help='Requisições descartadas por rota')
+    parser.add_argument('--filtro', default='', help='Executar apenas as rotas cujo nome contém este texto')
+    parser.add_argument('--banco', default=None, help='Arquivo SQLite a criar (padrão: diretório temporário)')
+    parser.add_argument('--saida', default=None, help='Gravar o JSON neste arquivo em vez da saída padrão')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Mostrar o progresso em stderr')
+    args = parser.parse_args(argv)
+
+    if args.banco and os.path.exists(args.banco):
+        parser.error(f'{args.banco} já existe; informe um arquivo novo')
+
+    relatorio = json.dumps(executar(args), indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(relatorio + '\n')
+    else:
+        print(relatorio)
+
+
+if __name__ == '__main__':
+    main()
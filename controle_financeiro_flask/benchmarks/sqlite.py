@@ -0,0 +1,150 @@
+"""
+Benchmark dos perfis do SQLite (app/perfil_sqlite.py)
+Para cada perfil cria um banco com benchmarks.dados e mede, com vários
+processos worker simultâneos, a vazão de leituras (busca de transações e
+totais do mês) e de escritas (novas despesas pela sessão do ORM, com
+resumo_mensal), além dos erros "database is locked".
+
+Uso: python -m benchmarks.sqlite --perfis padrao producao --processos 4
+"""
+
+from app import create_app, db
+from app.consultas import consulta_transacoes, ler_filtros
+from app.models import Despesa, Categoria, Usuario, ResumoMensal
+from benchmarks.dados import gerar, email_usuario
+from datetime import datetime
+from sqlalchemy.exc import OperationalError
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+
+def _leitura(usuario_id, hoje, i):
+    """Uma página da busca e os totais do mês, como no dashboard"""
+    filtros = ler_filtros({'descricao': '' if i % 2 else 'super'})
+    db.session.execute(consulta_transacoes(usuario_id, filtros).limit(50)).all()
+    db.session.query(ResumoMensal.tipo, db.func.sum(ResumoMensal.soma)).filter(
+        ResumoMensal.usuario_id == usuario_id,
+        ResumoMensal.ano == hoje.year,
+        ResumoMensal.mes == hoje.month
+    ).group_by(ResumoMensal.tipo).all()
+
+
+def _escrita(usuario_id, categoria_id, hoje, i):
+    """Uma nova despesa com commit próprio, como em /despesa/nova"""
+    db.session.add(Despesa(
+        descricao=f'Benchmark {i}', valor=10.0 + i % 50,
+        categoria_id=categoria_id, usuario_id=usuario_id, data=hoje
+    ))
+    db.session.commit()
+
+
+def _operacao(nome, usuario_id, categoria_id, hoje, i):
+    if nome == 'leitura' or (nome == 'misto' and i % 10):
+        # Na carga mista, uma escrita a cada dez operações
+        _leitura(usuario_id, hoje, i)
+    else:
+        _escrita(usuario_id, categoria_id, hoje, i)
+
+
+def _trabalhador(config, nome, alvo, inicio, fim, indice, fila):
+    """Processo worker: abre a própria app e executa até o fim da janela"""
+    app = create_app(config)
+    usuario_id, categoria_id, hoje = alvo
+    feitas = 0
+    falhas = 0
+    with app.app_context():
+        while time.time() < inicio:
+            time.sleep(0.001)
+        while time.time() < fim:
+            try:
+                _operacao(nome, usuario_id, categoria_id, hoje, indice * 1000000 + feitas)
+                feitas += 1
+            except OperationalError:
+                db.session.rollback()
+                falhas += 1
+        db.session.remove()
+    fila.put((feitas, falhas))
+
+
+def _carga(config, nome, alvo, processos, duracao):
+    """Executar a operação em `processos` workers simultâneos por `duracao` segundos"""
+    contexto = multiprocessing.get_context('spawn')
+    fila = contexto.Queue()
+    # Janela comum a todos os workers, depois do tempo de inicialização
+    inicio = time.time() + 3 + 0.5 * processos
+    fim = inicio + duracao
+
+    lista = [
+        contexto.Process(target=_trabalhador, args=(config, nome, alvo, inicio, fim, i, fila))
+        for i in range(processos)
+    ]
+    for processo in lista:
+        processo.start()
+    resultados = [fila.get() for _ in lista]
+    for processo in lista:
+        processo.join()
+
+    operacoes = sum(feitas for feitas, _ in resultados)
+    return {
+        'operacoes': operacoes,
+        'por_segundo': round(operacoes / duracao, 1),
+        'erros_lock': sum(falhas for _, falhas in resultados)
+    }
+
+
+def medir_perfil(perfil, args, diretorio):
+    """Medir leituras, escritas e carga mista para um perfil"""
+    caminho = os.path.join(diretorio, f'{perfil}.db')
+    config = {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho}', 'PERFIL_SQLITE': perfil}
+    app = create_app(config)
+    hoje = datetime.utcnow().replace(microsecond=0)
+
+    with app.app_context():
+        gerar(db.engine, usuarios=2, transacoes=args.transacoes, semente=args.semente, hoje=hoje)
+        usuario_id = Usuario.query.filter_by(email=email_usuario(0)).one().id
+        categoria_id = Categoria.query.filter_by(usuario_id=usuario_id).order_by(Categoria.id).first().id
+        journal = db.session.execute(db.text('PRAGMA journal_mode')).scalar()
+        db.session.remove()
+        db.engine.dispose()
+
+    alvo = (usuario_id, categoria_id, hoje)
+    resultado = {'journal_mode': journal}
+    for nome in ('leitura', 'escrita', 'misto'):
+        resultado[nome] = _carga(config, nome, alvo, args.processos, args.duracao)
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Vazão de leitura e escrita por perfil do SQLite')
+    parser.add_argument('--perfis', nargs='+', default=['padrao', 'producao'])
+    parser.add_argument('--processos', type=int, default=4, help='Workers simultâneos')
+    parser.add_argument('--duracao', type=float, default=5.0, help='Segundos por medição')
+    parser.add_argument('--transacoes', type=int, default=100000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--saida', default=None, help='Gravar o JSON neste arquivo em vez da saída padrão')
+    args = parser.parse_args(argv)
+
+    diretorio = tempfile.mkdtemp(prefix='benchmark_sqlite_')
+    relatorio = {
+        'parametros': {'processos': args.processos, 'duracao_s': args.duracao, 'transacoes': args.transacoes},
+        'perfis': {}
+    }
+    for perfil in args.perfis:
+        print(f'Medindo perfil {perfil}...', file=sys.stderr)
+        relatorio['perfis'][perfil] = medir_perfil(perfil, args, diretorio)
+
+    texto = json.dumps(relatorio, indent=2, ensure_ascii=False)
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            arquivo.write(texto + '\n')
+    else:
+        print(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,14 +6,13 @@
 // ========== CONFIGURAÇÕES GLOBAIS ==========
 const CONFIG = {
     debounceDelay: 300,
-    alertAutoCloseTiming: 5000,
-    maxValor: 999999.99,
-    minValor: 0.01
+    alertAutoCloseTiming: 5000
 };
 
 // ========== INICIALIZAÇÃO ==========
 document.addEventListener('DOMContentLoaded', function() {
     inicializarValidacoes();
+    inicializarValidacaoFormularios();
     inicializarAlertas();
     inicializarTooltips();
     inicializarMascaras();
@@ -42,108 +41,193 @@ function inicializarValidacoes() {
             }
         });
     });
+}
 
-    // Validação em tempo real para descrição
-    const descricaoInputs = document.querySelectorAll('input[name="descricao"]');
-    descricaoInputs.forEach(input => {
-        input.addEventListener('input', validarDescricaoRealTime);
-    });
+// ========== ESQUEMA DE VALIDAÇÃO ==========
+// Regras de app/validacoes.py, avaliadas localmente a cada tecla. O esquema
+// é baixado uma vez por versão (a URL muda quando as regras mudam).
+let esquemaValidacao = null;
 
-    // Validação em tempo real para valor
-    const valorInputs = document.querySelectorAll('input[name="valor"]');
-    valorInputs.forEach(input => {
-        input.addEventListener('input', validarValorRealTime);
-    });
-}
+const FORMATOS = {
+    numero: /^[-+]?(\d+(\.\d*)?|\.\d+)([eE][-+]?\d+)?$/,
+    inteiro: /^[-+]?\d+$/,
+    data: /^\d{4}-\d{2}-\d{2}$/
+};
 
-// ========== VALIDAÇÃO DE DESCRIÇÃO EM TEMPO REAL ==========
-function validarDescricaoRealTime(event) {
-    const input = event.target;
-    const valor = input.value.trim();
-    const feedback = input.nextElementSibling;
+function carregarEsquemaValidacao() {
+    const url = document.body.dataset.esquemaValidacao;
+    if (!url) {
+        return Promise.resolve(null);
+    }
 
-    let valido = true;
-    let mensagem = '';
-
-    if (!valor) {
-        mensagem = 'A descrição é obrigatória';
-        valido = false;
-    } else if (valor.length < 3) {
-        mensagem = 'Mínimo 3 caracteres';
-        valido = false;
-    } else if (valor.length > 255) {
-        mensagem = 'Máximo 255 caracteres';
-        valido = false;
+    const salvo = recuperarDoStorage('esquemaValidacao');
+    if (salvo && salvo.url === url) {
+        esquemaValidacao = salvo.esquema;
+        return Promise.resolve(esquemaValidacao);
     }
 
-    if (valido) {
-        input.classList.remove('is-invalid');
-        input.classList.add('is-valid');
-        if (feedback && feedback.classList.contains('invalid-feedback')) {
-            feedback.style.display = 'none';
-        }
-    } else {
-        input.classList.remove('is-valid');
-        input.classList.add('is-invalid');
-        if (feedback && feedback.classList.contains('invalid-feedback')) {
-            feedback.textContent = mensagem;
-            feedback.style.display = 'block';
+    return fetch(url)
+        .then(resposta => resposta.ok ? resposta.json() : null)
+        .then(esquema => {
+            esquemaValidacao = esquema;
+            if (esquema) {
+                salvarNoStorage('esquemaValidacao', { url: url, esquema: esquema });
+            }
+            return esquema;
+        })
+        .catch(() => null);
+}
+
+function converterCampo(tipo, texto) {
+    if (tipo === 'texto') {
+        return { ok: true, valor: texto };
+    }
+    if (tipo === 'numero') {
+        const numero = Number(texto);
+        return { ok: FORMATOS.numero.test(texto) && Number.isFinite(numero), valor: numero };
+    }
+    if (tipo === 'inteiro') {
+        return { ok: FORMATOS.inteiro.test(texto), valor: parseInt(texto, 10) };
+    }
+    if (tipo === 'data') {
+        if (!FORMATOS.data.test(texto)) {
+            return { ok: false };
         }
+        const [ano, mes, dia] = texto.split('-').map(Number);
+        const data = new Date(ano, mes - 1, dia);
+        const ok = data.getFullYear() === ano && data.getMonth() === mes - 1 && data.getDate() === dia;
+        return { ok: ok, valor: data };
     }
+    return { ok: false };
+}
 
-    // Atualizar contador de caracteres se existir
-    const counter = document.getElementById('descricaoCounter');
-    if (counter) {
-        counter.textContent = valor.length;
+function violaRegra(regra, valor) {
+    switch (regra.regra) {
+        case 'min_caracteres': return Array.from(valor).length < regra.valor;
+        case 'max_caracteres': return Array.from(valor).length > regra.valor;
+        case 'maior_que': return valor <= regra.valor;
+        case 'minimo': return valor < regra.valor;
+        case 'maximo': return valor > regra.valor;
+        default: return false;
     }
 }
 
-// ========== VALIDAÇÃO DE VALOR EM TEMPO REAL ==========
-function validarValorRealTime(event) {
-    const input = event.target;
-    const valor = input.value;
-    const feedback = input.closest('.mb-3')?.querySelector('.invalid-feedback');
-    const aviso = input.closest('.mb-3')?.querySelector('small.text-muted');
+// Mesma avaliação de validar_campo (app/validacoes.py): { erros, avisos }
+function validarCampo(nome, valor) {
+    const campo = esquemaValidacao.campos[nome];
+    const texto = (valor ?? '').toString().trim();
+    const obrigatorio = campo.regras.find(regra => regra.regra === 'obrigatorio');
 
-    let valido = true;
-    let mensagem = '';
-    let avisoTexto = '';
+    if (!texto) {
+        return { erros: obrigatorio ? [obrigatorio.mensagem] : [], avisos: [] };
+    }
 
-    if (!valor) {
-        mensagem = 'O valor é obrigatório';
-        valido = false;
-    } else {
-        const valorNum = parseFloat(valor);
-        if (isNaN(valorNum) || valorNum <= 0) {
-            mensagem = 'O valor deve ser positivo';
-            valido = false;
-        } else if (valorNum > CONFIG.maxValor) {
-            mensagem = 'O valor é muito alto';
-            valido = false;
-        } else if (valorNum > 10000) {
-            avisoTexto = '⚠️ Atenção: Este é um valor muito alto';
-        }
+    const convertido = converterCampo(campo.tipo, texto);
+    if (!convertido.ok) {
+        return { erros: [campo.mensagem_tipo], avisos: [] };
     }
 
-    const inputGroup = input.closest('.input-group') || input;
-    if (valido) {
-        inputGroup.classList.remove('is-invalid');
-        inputGroup.classList.add('is-valid');
-        if (feedback) {
-            feedback.style.display = 'none';
-        }
-    } else {
-        inputGroup.classList.remove('is-valid');
-        inputGroup.classList.add('is-invalid');
-        if (feedback) {
-            feedback.textContent = mensagem;
-            feedback.style.display = 'block';
-        }
+    const violada = campo.regras.find(regra => regra.regra !== 'obrigatorio' && violaRegra(regra, convertido.valor));
+    if (violada) {
+        return { erros: [violada.mensagem], avisos: [] };
+    }
+
+    const avisos = (campo.avisos || []).filter(regra => violaRegra(regra, convertido.valor));
+    return { erros: [], avisos: avisos.map(regra => regra.mensagem) };
+}
+
+function mostrarResultadoCampo(input, erros, avisos = []) {
+    const valido = erros.length === 0;
+    input.classList.toggle('is-invalid', !valido);
+    input.classList.toggle('is-valid', valido);
+
+    const ancora = input.closest('.input-group') || input;
+    let feedback = input.closest('.mb-3')?.querySelector('.invalid-feedback');
+    if (!feedback) {
+        feedback = document.createElement('div');
+        feedback.className = 'invalid-feedback';
+        ancora.insertAdjacentElement('afterend', feedback);
     }
+    feedback.textContent = erros[0] || '';
+    feedback.style.display = valido ? 'none' : 'block';
 
+    const aviso = document.getElementById(input.id + 'Aviso');
     if (aviso) {
-        aviso.textContent = avisoTexto;
+        aviso.textContent = avisos.join(' ');
+    }
+    return valido;
+}
+
+function camposDoFormulario(form) {
+    const nomes = esquemaValidacao ? esquemaValidacao.formularios[form.dataset.formulario] || [] : [];
+    return nomes.map(nome => form.elements[nome]).filter(Boolean);
+}
+
+// Validar todos os campos localmente; retorna true se o formulário é válido
+function validarFormulario(form) {
+    let valido = true;
+    camposDoFormulario(form).forEach(input => {
+        const resultado = validarCampo(input.name, input.value);
+        valido = mostrarResultadoCampo(input, resultado.erros, resultado.avisos) && valido;
+    });
+    return valido;
+}
+
+// Sem o esquema (falha de rede): uma única chamada valida o formulário inteiro
+function validarFormularioRemoto(form) {
+    const campos = {};
+    new FormData(form).forEach((valor, nome) => { campos[nome] = valor; });
+
+    return fetch(document.body.dataset.validarUrl, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ formulario: form.dataset.formulario, campos: campos })
+    })
+        .then(resposta => resposta.json())
+        .then(resultado => {
+            Object.keys(campos).forEach(nome => {
+                const input = form.elements[nome];
+                if (input && input.id) {
+                    mostrarResultadoCampo(input, resultado.erros[nome] || []);
+                }
+            });
+            return resultado.valido;
+        });
+}
+
+function inicializarValidacaoFormularios() {
+    const forms = document.querySelectorAll('form[data-formulario]');
+    if (!forms.length) {
+        return;
     }
+
+    carregarEsquemaValidacao().then(() => {
+        forms.forEach(form => {
+            camposDoFormulario(form).forEach(input => {
+                const evento = input.tagName === 'SELECT' ? 'change' : 'input';
+                input.addEventListener(evento, () => {
+                    const resultado = validarCampo(input.name, input.value);
+                    mostrarResultadoCampo(input, resultado.erros, resultado.avisos);
+                });
+            });
+        });
+    });
+
+    forms.forEach(form => {
+        form.addEventListener('submit', function(event) {
+            if (esquemaValidacao) {
+                if (!validarFormulario(form)) {
+                    event.preventDefault();
+                }
+                return;
+            }
+
+            event.preventDefault();
+            validarFormularioRemoto(form)
+                .then(valido => { if (valido) { form.submit(); } })
+                .catch(() => form.submit());
+        });
+    });
 }
 
 // ========== ALERTAS AUTO-FECHÁVEIS ==========
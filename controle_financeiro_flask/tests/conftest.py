@@ -0,0 +1,52 @@
+"""
+Fixtures compartilhadas dos testes
+A app usa o perfil 'teste' com um arquivo SQLite temporário (em vez do banco
+em memória), criado pelas migrações na inicialização, para que os testes
+possam abrir conexões próprias ao mesmo banco.
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, db  # noqa: E402
+from app.models import Usuario  # noqa: E402
+
+
+EMAIL = 'teste@exemplo.com'
+SENHA = '123456'
+
+
+@pytest.fixture
+def caminho_banco(tmp_path):
+    return str(tmp_path / 'controle_financeiro.db')
+
+
+@pytest.fixture
+def app(caminho_banco):
+    app = create_app({'SQLALCHEMY_DATABASE_URI': f'sqlite:///{caminho_banco}'}, perfil='teste')
+    with app.app_context():
+        usuario = Usuario(nome='Teste', email=EMAIL)
+        usuario.set_password(SENHA)
+        db.session.add(usuario)
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def usuario_id(app):
+    with app.app_context():
+        return db.session.execute(db.select(Usuario.id).filter_by(email=EMAIL)).scalar()
+
+
+@pytest.fixture
+def cliente(app):
+    cliente = app.test_client()
+    resposta = cliente.post('/login', data={'email': EMAIL, 'senha': SENHA})
+    assert resposta.status_code == 302
+    return cliente
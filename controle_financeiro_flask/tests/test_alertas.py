@@ -0,0 +1,68 @@
+"""
+Recálculo dos alertas de orçamento após as escritas (app.alertas)
+O ouvinte @ao_confirmar entrega os usuários alterados ao trabalhador da app,
+que regrava a linha de alertas na versão atual dos dados.
+"""
+
+from app import db
+from app.alertas import TrabalhadorAlertas
+from app.models import AlertasOrcamento, Categoria, Despesa, Orcamento, Usuario
+from datetime import datetime
+import time
+
+import pytest
+
+
+@pytest.fixture
+def trabalhador(app):
+    """Trabalhador da app, como com ALERTAS_NA_ESCRITA"""
+    trabalhador = TrabalhadorAlertas(app, intervalo_completo=None)
+    app.extensions['trabalhador_alertas'] = trabalhador
+    yield trabalhador
+    trabalhador.encerrar()
+    if trabalhador._thread is not None:
+        trabalhador._thread.join(5)
+
+
+def versoes(app, usuario_id):
+    """(versão dos alertas gravados, versão dos dados) do usuário"""
+    with app.app_context():
+        alertas = AlertasOrcamento.query.filter_by(usuario_id=usuario_id).first()
+        return alertas and alertas.versao_dados, db.session.get(Usuario, usuario_id).versao_dados
+
+
+def aguardar_recalculo(app, usuario_id, limite=5):
+    fim = time.monotonic() + limite
+    while time.monotonic() < fim:
+        gravada, atual = versoes(app, usuario_id)
+        if gravada == atual:
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_escrita_recalcula_alertas(app, usuario_id, trabalhador):
+    hoje = datetime.utcnow()
+    with app.app_context():
+        categoria = Categoria(nome='Mercado', usuario_id=usuario_id)
+        db.session.add(categoria)
+        db.session.flush()
+        db.session.add(Orcamento(
+            usuario_id=usuario_id, categoria_id=categoria.id, mes=hoje.month, ano=hoje.year, limite=100
+        ))
+        db.session.commit()
+        categoria_id = categoria.id
+
+    assert aguardar_recalculo(app, usuario_id)
+    with app.app_context():
+        assert AlertasOrcamento.query.filter_by(usuario_id=usuario_id).one().dados == []
+
+        db.session.add(Despesa(
+            descricao='Compras', valor=150, categoria_id=categoria_id, usuario_id=usuario_id, data=hoje
+        ))
+        db.session.commit()
+
+    assert aguardar_recalculo(app, usuario_id)
+    with app.app_context():
+        alertas = AlertasOrcamento.query.filter_by(usuario_id=usuario_id).one()
+        assert [alerta['tipo'] for alerta in alertas.dados] == ['excedido']
@@ -0,0 +1,35 @@
+"""
+Parâmetros de período de /api/analytics/serie (app.analises.ler_data)
+"""
+
+from app.analises import ler_data
+from datetime import date
+
+import pytest
+
+
+@pytest.mark.parametrize('texto, fim_do_periodo, esperado', [
+    ('2024-02-10', False, date(2024, 2, 10)),
+    ('2024-02', False, date(2024, 2, 1)),
+    ('2024-02', True, date(2024, 2, 29)),
+    ('2024-12', True, date(2024, 12, 31)),
+    ('2024', False, date(2024, 1, 1)),
+    ('2024', True, date(2024, 12, 31)),
+])
+def test_ler_data(texto, fim_do_periodo, esperado):
+    assert ler_data(texto, fim_do_periodo) == esperado
+
+
+@pytest.mark.parametrize('texto', ['2024-13', '2024-00', '2024-13-01', '2024-02-30', '2024-1-2-3', 'abc'])
+@pytest.mark.parametrize('fim_do_periodo', [False, True])
+def test_ler_data_rejeita_datas_inexistentes(texto, fim_do_periodo):
+    with pytest.raises(ValueError):
+        ler_data(texto, fim_do_periodo)
+
+
+@pytest.mark.parametrize('parametro', ['inicio', 'fim'])
+def test_serie_rejeita_mes_invalido(cliente, parametro):
+    resposta = cliente.get(f'/api/analytics/serie?{parametro}=2024-13')
+
+    assert resposta.status_code == 400
+    assert resposta.get_json() == {'sucesso': False, 'erro': 'Parâmetros inválidos'}
@@ -0,0 +1,107 @@
+"""
+Planos de consulta das telas mais acessadas (EXPLAIN QUERY PLAN)
+As consultas executadas pelo dashboard, pela busca de transações e pelas
+telas de orçamentos são capturadas durante a requisição e reexplicadas no
+banco migrado, com os mesmos parâmetros, para garantir que usam os índices
+compostos da migração 3 em vez de varrer as tabelas.
+"""
+
+from app import db
+from app.models import Categoria, Despesa, Receita, Orcamento
+from datetime import datetime, timedelta
+from sqlalchemy import event
+import re
+import sqlite3
+
+import pytest
+
+
+@pytest.fixture
+def dados(app, usuario_id):
+    """Algumas transações no mês atual e no anterior e um orçamento"""
+    hoje = datetime.utcnow()
+    with app.app_context():
+        categoria = Categoria(nome='Mercado', usuario_id=usuario_id)
+        db.session.add(categoria)
+        db.session.flush()
+        for i in range(20):
+            classe = Despesa if i % 3 else Receita
+            db.session.add(classe(
+                descricao=f'Lançamento {i}', valor=10 + i, categoria_id=categoria.id,
+                usuario_id=usuario_id, data=hoje - timedelta(days=i * 3)
+            ))
+        db.session.add(Orcamento(
+            usuario_id=usuario_id, categoria_id=categoria.id, mes=hoje.month, ano=hoje.year, limite=500
+        ))
+        db.session.commit()
+
+
+def planos_da_requisicao(app, caminho_banco, cliente, metodo, url, tabela, **kwargs):
+    """[(sql, [linhas do plano])] dos SELECTs em `tabela` executados pela requisição"""
+    capturadas = []
+
+    def capturar(conn, cursor, sql, parametros, contexto, executemany):
+        if sql.lstrip().upper().startswith('SELECT') and re.search(rf'\bFROM {tabela}\b', sql):
+            capturadas.append((sql, parametros))
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', capturar)
+    try:
+        resposta = getattr(cliente, metodo)(url, **kwargs)
+    finally:
+        event.remove(engine, 'before_cursor_execute', capturar)
+    assert resposta.status_code == 200
+
+    conexao = sqlite3.connect(caminho_banco)
+    try:
+        return [
+            (sql, [linha[3] for linha in conexao.execute('EXPLAIN QUERY PLAN ' + sql, parametros)])
+            for sql, parametros in capturadas
+        ]
+    finally:
+        conexao.close()
+
+
+def usa_indice(plano, tabela, indice):
+    return any(re.match(rf'SEARCH {tabela} USING (COVERING )?INDEX {indice} ', linha) for linha in plano)
+
+
+def test_dashboard_usa_indice_usuario_data(app, caminho_banco, cliente, dados):
+    planos = planos_da_requisicao(app, caminho_banco, cliente, 'get', '/', 'transacoes')
+
+    assert planos, 'o dashboard não consultou transacoes'
+    for sql, plano in planos:
+        assert usa_indice(plano, 'transacoes', 'ix_transacoes_usuario_data'), (sql, plano)
+
+
+def test_busca_usa_indice_usuario_data(app, caminho_banco, cliente, dados):
+    planos = planos_da_requisicao(
+        app, caminho_banco, cliente, 'post', '/api/transacoes/buscar', 'transacoes', json={'tipo': 'despesa'}
+    )
+
+    assert len(planos) == 1
+    sql, plano = planos[0]
+    assert usa_indice(plano, 'transacoes', 'ix_transacoes_usuario_data'), (sql, plano)
+    assert not any(linha.startswith('USE TEMP B-TREE FOR ORDER BY') for linha in plano), plano
+
+
+def test_orcamentos_usam_indices(app, caminho_banco, cliente, dados):
+    planos = planos_da_requisicao(app, caminho_banco, cliente, 'get', '/orcamentos', 'orcamentos')
+    assert planos
+    for sql, plano in planos:
+        assert usa_indice(plano, 'orcamentos', 'ix_orcamentos_usuario_mes_ano'), (sql, plano)
+
+    # Gasto por categoria do mês e do histórico (projeção)
+    planos = planos_da_requisicao(app, caminho_banco, cliente, 'get', '/orcamentos', 'transacoes')
+    assert planos
+    for sql, plano in planos:
+        assert usa_indice(plano, 'transacoes', 'ix_transacoes_usuario_categoria_tipo_data'), (sql, plano)
+
+
+def test_resumo_de_orcamentos_usa_indice(app, caminho_banco, cliente, dados):
+    planos = planos_da_requisicao(app, caminho_banco, cliente, 'get', '/api/orcamentos/resumo', 'orcamentos')
+
+    assert planos
+    for sql, plano in planos:
+        assert usa_indice(plano, 'orcamentos', 'ix_orcamentos_usuario_mes_ano'), (sql, plano)
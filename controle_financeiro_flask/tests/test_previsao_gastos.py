@@ -0,0 +1,60 @@
+"""
+Projeção de fim de mês da previsão em lote (app.previsao_gastos)
+Sem histórico a projeção deve coincidir com a linear de
+avaliacao_orcamentos.calcular_projecao; com histórico e nenhum gasto
+esperado até hoje (fração 0), o gasto atual soma-se ao total suavizado.
+"""
+
+from app.avaliacao_orcamentos import calcular_dias_restantes, calcular_projecao
+from app.previsao_gastos import MESES_HISTORICO, prever_da_matriz, projetar
+from datetime import datetime
+import numpy as np
+
+import pytest
+
+
+@pytest.mark.parametrize('dia', [1, 10, 15, 30])
+def test_sem_historico_coincide_com_projecao_linear(dia):
+    hoje = datetime(2024, 4, dia, 12)
+    categoria_ids = [1, 2, 3]
+    matriz = np.zeros((3, MESES_HISTORICO + 1, 31), dtype=np.int64)
+    matriz[0, -1, 0] = 12345
+    matriz[1, -1, :dia] = 777
+    matriz[2, -1, dia - 1] = 1
+
+    projecoes = prever_da_matriz(matriz, 4, 2024, categoria_ids, hoje)
+
+    dias_restantes = calcular_dias_restantes(4, 2024, hoje)
+    for i, categoria_id in enumerate(categoria_ids):
+        gasto = int(matriz[i, -1].sum())
+        assert projecoes[categoria_id] == calcular_projecao(gasto, 4, 2024, hoje, dias_restantes)
+
+
+def test_fracao_zero_soma_gasto_e_suavizado():
+    gasto = np.array([5000, 0])
+    suavizado = np.array([30000.0, 30000.0])
+
+    projecao = projetar(gasto, np.zeros(2), suavizado, np.array([True, True]), 3, 30)
+
+    assert projecao.tolist() == [35000, 30000]
+
+
+def test_fracao_zero_na_matriz():
+    # Histórico com todo o gasto no fim do mês e um gasto já no dia 2
+    hoje = datetime(2024, 4, 3, 12)
+    matriz = np.zeros((1, MESES_HISTORICO + 1, 31), dtype=np.int64)
+    matriz[0, :-1, 27] = 20000
+    matriz[0, -1, 1] = 4000
+
+    assert prever_da_matriz(matriz, 4, 2024, [7], hoje) == {7: 24000}
+
+
+def test_fracao_positiva_pesa_ritmo_e_historico():
+    gasto = np.array([10000])
+    fracao = np.array([0.5])
+    suavizado = np.array([16000.0])
+
+    projecao = projetar(gasto, fracao, suavizado, np.array([True]), 15, 30)
+
+    # 0,5 × 20000 + 0,5 × (10000 + 0,5 × 16000)
+    assert projecao.tolist() == [19000]